@@ -5,48 +5,86 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from browser_use import Agent, Controller
 from langchain_openai import ChatOpenAI
 from services.sheets_service import SheetsService
+import argparse
 import asyncio
+import threading
+from typing import List, Optional, Set
 from dotenv import load_dotenv
 import csv
 
 load_dotenv()
 
+OUTPUT_FILE = 'browser_use/reddit_categories.csv'
+
+
+class BufferedCategoryWriter:
+    """
+    Collects category URLs from every agent and appends them to one CSV.
+
+    URLs already in the file (or saved by another agent) are skipped, and rows
+    are written in batches instead of reopening the file for each URL.
+    """
+
+    def __init__(self, path: str, flush_every: int = 10):
+        self.path = path
+        self.flush_every = flush_every
+        self.seen_urls: Set[str] = set()
+        self.collected_categories: Set[str] = set()
+        self._buffer: List[List[str]] = []
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, newline='') as f:
+                for row in csv.reader(f):
+                    if len(row) >= 2:
+                        self.collected_categories.add(row[0])
+                        self.seen_urls.add(row[1])
+
+    def add(self, category: str, url: str) -> bool:
+        """Buffer a row; returns False if the URL was already saved."""
+        with self._lock:
+            if url in self.seen_urls:
+                return False
+            self.seen_urls.add(url)
+            self.collected_categories.add(category)
+            self._buffer.append([category, url])
+            if len(self._buffer) >= self.flush_every:
+                self._flush_locked()
+        return True
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        with open(self.path, 'a', newline='') as f:
+            csv.writer(f).writerows(self._buffer)
+        self._buffer = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+
 # Initialize controller
 controller = Controller()
+writer: Optional[BufferedCategoryWriter] = None
 
 @controller.action('Save Reddit category URLs to file')
 def save_category_url(category: str, url: str):
-    with open('browser_use/reddit_categories.csv', 'a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([category, url])
+    if not writer.add(category, url):
+        return f'URL for {category} was already saved'
     return f'Saved URL for {category}'
 
-async def main():
-    # Initialize services
-    sheets_service = SheetsService()
-    genres, themes, mechanics = sheets_service.categories
-    
-    # Combine all categories
-    all_categories = genres + themes + mechanics
-    
-    # Define start and end categories
-    start_category = "Aliens"
-    end_category = "Card-Based / Diceless"
-    
-    # Get slice of categories between start and end (inclusive)
-    start_index = all_categories.index(start_category)
-    end_index = all_categories.index(end_category) + 1
-    categories_to_process = all_categories[start_index:end_index]
-    
-    # Create a structured task with filtered categories
-    task = f"""
+
+def build_task(categories: List[str]) -> str:
+    """Create the agent task for one shard of categories."""
+    return f"""
     ### Reddit TTRPG Category Search Task
 
-    **Objective:** 
+    **Objective:**
     Search Reddit for various TTRPG categories and collect post URLs that have active comments.
 
     ### Categories to Search:
-    {', '.join(categories_to_process)}
+    {', '.join(categories)}
 
     ### Steps:
     1. Start at https://www.reddit.com
@@ -60,20 +98,72 @@ async def main():
     - Only collect posts that are not Archived ("Archived post. New comments cannot be posted and votes cannot be cast.")
     - If a category search yields no results, note it and continue to the next
     """
-    
-    # Initialize agent with the comprehensive task and controller
+
+
+def shard_categories(categories: List[str], shards: int) -> List[List[str]]:
+    """Split categories round-robin into at most `shards` non-empty groups."""
+    groups = [categories[i::shards] for i in range(shards)]
+    return [group for group in groups if group]
+
+
+async def run_shard(index: int, categories: List[str], steps_per_category: int):
+    """Run one agent over a shard of categories."""
     agent = Agent(
         llm=ChatOpenAI(model="gpt-4o"),
-        task=task,
+        task=build_task(categories),
         controller=controller
     )
-    
-    # Run the agent
     try:
-        await agent.run(max_steps=1000)
-        print("Processing complete. Results saved to reddit_categories.csv")
+        await agent.run(max_steps=steps_per_category * len(categories))
+        print(f"Shard {index} complete ({len(categories)} categories)")
     except Exception as e:
-        print(f"Error during execution: {e}")
+        print(f"Error in shard {index}: {e}")
+    finally:
+        writer.flush()
+
+
+async def main():
+    global writer
+
+    parser = argparse.ArgumentParser(description='Collect Reddit post URLs for each TTRPG category.')
+    parser.add_argument('--shards', type=int, default=4, help='Number of agents to run concurrently (default: 4)')
+    parser.add_argument('--steps-per-category', type=int, default=15, help='Agent step budget per category (default: 15)')
+    parser.add_argument('--start', help='First category to process (inclusive)')
+    parser.add_argument('--end', help='Last category to process (inclusive)')
+    parser.add_argument('--output', default=OUTPUT_FILE, help=f'CSV file to append results to (default: {OUTPUT_FILE})')
+    args = parser.parse_args()
+
+    # Initialize services
+    sheets_service = SheetsService()
+    genres, themes, mechanics = sheets_service.categories
+
+    # Combine all categories
+    all_categories = genres + themes + mechanics
+
+    # Get slice of categories between start and end (inclusive)
+    start_index = all_categories.index(args.start) if args.start else 0
+    end_index = all_categories.index(args.end) + 1 if args.end else len(all_categories)
+
+    writer = BufferedCategoryWriter(args.output)
+    categories_to_process = [
+        category for category in all_categories[start_index:end_index]
+        if category not in writer.collected_categories
+    ]
+    if not categories_to_process:
+        print("All categories have already been collected")
+        return
+
+    shards = shard_categories(categories_to_process, args.shards)
+    print(f"Processing {len(categories_to_process)} categories across {len(shards)} agents")
+
+    try:
+        await asyncio.gather(*(
+            run_shard(i, shard, args.steps_per_category)
+            for i, shard in enumerate(shards, 1)
+        ))
+        print(f"Processing complete. Results saved to {args.output}")
+    finally:
+        writer.flush()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
@@ -1,12 +1,22 @@
 # Export constants for easier imports
 from .constants import (
     GPT_MODEL,
+    FAST_GPT_MODEL,
+    MODEL_ROUTES,
+    MODEL_PRICES,
+    PROMPT_BUDGETS,
     SERVICE_ACCOUNT_FILE,
+    SHEETS_REQUESTS_PER_MINUTE,
     openai_client,
 )
 
 __all__ = [
     'GPT_MODEL',
+    'FAST_GPT_MODEL',
+    'MODEL_ROUTES',
+    'MODEL_PRICES',
+    'PROMPT_BUDGETS',
     'SERVICE_ACCOUNT_FILE',
+    'SHEETS_REQUESTS_PER_MINUTE',
     'openai_client',
-]
\ No newline at end of file
+]
@@ -8,11 +8,54 @@ load_dotenv()
 
 # Initialize constants
 GPT_MODEL = "gpt-4o"
+FAST_GPT_MODEL = "gpt-4o-mini"
 SERVICE_ACCOUNT_FILE = 'ttrpg-games-212e54b63af3.json'
 
+# Sheets API requests per minute (the per-user quota is 60); paced before each
+# call, on top of the adaptive concurrency limit that reacts to 429s
+SHEETS_REQUESTS_PER_MINUTE = float(os.getenv('SHEETS_REQUESTS_PER_MINUTE', 60))
+
+# Model tier and output limit for each LLM task. Calls go to `model` first and
+# are retried once on `escalate_to` only when the output fails validation.
+MODEL_ROUTES = {
+    'summary':              {'model': FAST_GPT_MODEL, 'max_tokens': 200,  'escalate_to': GPT_MODEL},
+    'full_text':            {'model': GPT_MODEL,      'max_tokens': 1000, 'escalate_to': None},
+    'category':             {'model': FAST_GPT_MODEL, 'max_tokens': 60,   'escalate_to': GPT_MODEL},
+    'potential_categories': {'model': FAST_GPT_MODEL, 'max_tokens': 50,   'escalate_to': GPT_MODEL},
+    # Summary and categories in one JSON response; failed fields are regenerated on their own routes
+    'combined':             {'model': FAST_GPT_MODEL, 'max_tokens': 320,  'escalate_to': None},
+    # Batched tasks: max_tokens is per game and is multiplied by the batch size
+    'category_batch':             {'model': FAST_GPT_MODEL, 'max_tokens': 60, 'escalate_to': GPT_MODEL},
+    'potential_categories_batch': {'model': FAST_GPT_MODEL, 'max_tokens': 50, 'escalate_to': GPT_MODEL},
+    'relationship_blurb':   {'model': FAST_GPT_MODEL, 'max_tokens': 200,  'escalate_to': GPT_MODEL},
+    'extract_reviews':      {'model': FAST_GPT_MODEL, 'max_tokens': 3000, 'escalate_to': None},
+    'summarize_reviews':    {'model': FAST_GPT_MODEL, 'max_tokens': 500,  'escalate_to': GPT_MODEL},
+}
+
+# Input token budgets for each task's prompt: 'total' for the whole prompt and a
+# limit for each variable input, which is compacted when it is over (see
+# services.prompt_builder)
+PROMPT_BUDGETS = {
+    'summary':              {'total': 1500, 'notes': 600},
+    'full_text':            {'total': 1200, 'notes': 600},
+    'research':             {'total': 1200, 'notes': 600},
+    'combined':             {'total': 3500, 'notes': 600},
+    'category':             {'total': 2500},
+    'potential_categories': {'total': 2500},
+    'relationship_blurb':   {'total': 400},
+    'extract_reviews':      {'total': 12000, 'page_text': 11500},
+    'summarize_reviews':    {'total': 4000, 'reviews': 3600},
+}
+
+# USD per million (input, output) tokens, used to track the spend of a run
+MODEL_PRICES = {
+    GPT_MODEL:      (2.50, 10.00),
+    FAST_GPT_MODEL: (0.15, 0.60),
+}
+
 # Initialize the client
 custom_httpx_client = httpx.Client(proxy=None)
 openai_client = OpenAI(
     api_key=os.getenv('OPENAI_API_KEY'),
     http_client=custom_httpx_client
-)
\ No newline at end of file
+)
@@ -0,0 +1,266 @@
+"""
+Synthetic directory catalogs of any size, modelled on the bundled CSV.
+
+The bundled directory has a few dozen games; scaling work (snapshot
+indexing, related-games retrieval, diff-only writes, bulk writes) needs
+catalogs of thousands to millions of rows that still look like the real
+one. CatalogProfile measures the source catalog and generate_catalog
+samples new games from it:
+
+- categories per game follow the source count histogram, drawn by source
+  frequency from the categories schema
+- the share of titles that collide after normalize_title matches the source
+  (or an explicit rate), by emitting spelling variants of recent titles
+- fullText and summary lengths are drawn from the source length
+  distributions, assembled from source sections and sentences with the
+  new title substituted in
+- flags (verified, premium, ...) keep their source frequencies
+
+Games are generated one at a time, so write_catalog streams 1M-row catalogs
+to disk without holding them in memory:
+
+    python -m loadtest.catalog_generator --size 1000000 --output catalog.csv
+"""
+import argparse
+import csv
+import random
+import re
+import sys
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from utils.title_index import normalize_title
+
+SOURCE_CSV = 'TTRPG Directory - dashboard&directory.csv'
+
+# Columns of generated games, in directory order; related items are left to the pipeline
+GAME_FIELDS = [
+    'title', 'url', 'imgUrl', 'page', 'text', 'fullText', 'Category', 'Potential Category',
+    'Rank', 'Hide', 'isFree', 'isTopRated', 'verified', 'premium',
+]
+FLAG_FIELDS = ['Hide', 'isFree', 'isTopRated', 'verified', 'premium']
+CATEGORY_TYPES = ('genres', 'themes', 'mechanics')
+
+SECTION_PATTERN = re.compile(r'<section>.*?</section>', re.DOTALL)
+SENTENCE_PATTERN = re.compile(r'[^.!?]+[.!?]+\s*')
+
+
+def split_categories(value: str) -> List[str]:
+    return [name.strip() for name in value.split(';') if name.strip()]
+
+
+class CatalogProfile:
+    """Distributions measured from a source catalog, used to sample new games."""
+
+    def __init__(self, games: List[Dict[str, str]], categories: Optional[List[Dict[str, str]]] = None):
+        """
+        Args:
+            games: Source directory rows
+            categories: The categories worksheet (title, type); derived from the
+                games' Category column when not given
+        """
+        if not games:
+            raise ValueError("Source catalog has no games")
+        self.games = games
+
+        self.category_counts = Counter(name for game in games for name in split_categories(game['Category']))
+        if categories is None:
+            # Type is assigned round-robin by frequency; the directory itself doesn't record it
+            categories = [
+                {'title': name, 'type': CATEGORY_TYPES[i % len(CATEGORY_TYPES)]}
+                for i, (name, _) in enumerate(self.category_counts.most_common())
+            ]
+        self.categories = categories
+        # Schema categories the source never uses still get picked occasionally
+        self.category_names = [category['title'] for category in categories]
+        self.category_weights = [self.category_counts.get(name, 0) or 0.5 for name in self.category_names]
+
+        self.categories_per_game = [len(split_categories(game['Category'])) for game in games]
+        self.potential_per_game = [len(split_categories(game.get('Potential Category', ''))) for game in games]
+        self.full_text_lengths = [len(game['fullText']) for game in games if game['fullText']]
+        self.summary_lengths = [len(game['text']) for game in games if game['text']]
+        self.flag_rates = {
+            field: sum(game.get(field, '').upper() == 'TRUE' for game in games) / len(games)
+            for field in FLAG_FIELDS
+        }
+
+        # Text fragments keyed by their source title, so it can be replaced with the new one
+        self.sections = [
+            (game['title'], section) for game in games for section in SECTION_PATTERN.findall(game['fullText'])
+        ]
+        self.sentences = [
+            (game['title'], sentence.strip()) for game in games for sentence in SENTENCE_PATTERN.findall(game['text'])
+        ]
+
+        self.title_words = Counter(word for game in games for word in game['title'].split())
+        self.title_lengths = [len(game['title'].split()) for game in games]
+        keys = [normalize_title(game['title']) for game in games]
+        self.collision_rate = (len(keys) - len(set(keys))) / len(keys)
+
+    @classmethod
+    def from_csv(cls, source_csv: str = SOURCE_CSV, categories_csv: Optional[str] = None) -> 'CatalogProfile':
+        """
+        Measure a directory export.
+
+        Args:
+            source_csv: Directory CSV (the dashboard&directory export)
+            categories_csv: Categories worksheet export with title and type columns
+        """
+        with open(source_csv, newline='', encoding='utf-8') as f:
+            games = list(csv.DictReader(f))
+        categories = None
+        if categories_csv:
+            with open(categories_csv, newline='', encoding='utf-8') as f:
+                categories = [{'title': row['title'], 'type': row['type']} for row in csv.DictReader(f)]
+        return cls(games, categories)
+
+
+def _vary_title(title: str, rng: random.Random) -> str:
+    """A different spelling of a title that normalize_title still maps to the same key."""
+    variants = [
+        title.upper(),
+        title.lower(),
+        f"The {title}" if not title.lower().startswith('the ') else title[4:],
+        title.replace(' and ', ' & ') if ' and ' in title else f"{title}!",
+        title.replace(' ', ': ', 1) if ' ' in title else f"{title}.",
+        title.replace('e', 'é', 1) if 'e' in title else f"'{title}'",
+    ]
+    return rng.choice(variants)
+
+
+def _fill(fragments: List[Any], target: int, title: str, rng: random.Random, joiner: str) -> str:
+    parts: List[str] = []
+    length = 0
+    while length < target:
+        source_title, fragment = rng.choice(fragments)
+        fragment = fragment.replace(source_title, title)
+        # Stop short when that lands closer to the target than overshooting would
+        if parts and length + len(fragment) - target > target - length:
+            break
+        parts.append(fragment)
+        length += len(fragment) + len(joiner)
+    return joiner.join(parts)
+
+
+def _sample_length(lengths: List[int], rng: random.Random) -> int:
+    # Resample the source lengths with a little jitter so sizes aren't limited to the source values
+    return max(1, int(rng.choice(lengths) * rng.uniform(0.9, 1.1)))
+
+
+def generate_catalog(
+    profile: CatalogProfile,
+    size: int,
+    seed: int = 0,
+    collision_rate: Optional[float] = None,
+    keep_source: bool = True
+) -> Iterator[Dict[str, str]]:
+    """
+    Yield `size` synthetic games.
+
+    Args:
+        profile: Distributions to sample from
+        size: Number of games
+        seed: Random seed; the same seed gives the same catalog
+        collision_rate: Share of titles that duplicate an earlier title after
+            normalization (defaults to the source catalog's rate)
+        keep_source: Start the catalog with the source games themselves
+    """
+    rng = random.Random(seed)
+    if collision_rate is None:
+        collision_rate = profile.collision_rate
+    vocabulary = list(profile.title_words)
+    vocabulary_weights = [profile.title_words[word] for word in vocabulary]
+    # Collisions copy a recent title, the way re-listed and re-edited games show up
+    recent_titles: deque = deque(maxlen=1000)
+
+    for i in range(size):
+        template = profile.games[i % len(profile.games)] if keep_source else rng.choice(profile.games)
+        if keep_source and i < len(profile.games):
+            game = {field: template.get(field, '') for field in GAME_FIELDS}
+            game['Rank'] = str(i + 1)
+            recent_titles.append(game['title'])
+            yield game
+            continue
+
+        page = ''
+        if recent_titles and rng.random() < collision_rate:
+            title = _vary_title(rng.choice(recent_titles), rng)
+            page = f"-{i}"  # Colliding titles still get their own page
+        else:
+            words = rng.choices(vocabulary, vocabulary_weights, k=rng.choice(profile.title_lengths))
+            # The serial number keeps generated titles distinct without remembering them all
+            title = f"{' '.join(words)} {i}"
+        recent_titles.append(title)
+        page = re.sub(r'[^a-z0-9]', '', normalize_title(title)) + page
+
+        category_count = min(rng.choice(profile.categories_per_game), len(profile.category_names))
+        potential_count = min(rng.choice(profile.potential_per_game), len(profile.category_names))
+
+        yield {
+            'title': title,
+            'url': template['url'],
+            'imgUrl': template['imgUrl'],
+            'page': page,
+            'text': _fill(profile.sentences, _sample_length(profile.summary_lengths, rng), title, rng, ' '),
+            'fullText': '<article>\n    ' + _fill(
+                profile.sections, _sample_length(profile.full_text_lengths, rng), title, rng, '\n    '
+            ) + '\n</article>',
+            'Category': '; '.join(_sample_distinct(profile, category_count, rng)),
+            'Potential Category': '; '.join(_sample_distinct(profile, potential_count, rng)),
+            'Rank': str(i + 1),
+            **{field: 'TRUE' if rng.random() < rate else 'FALSE' for field, rate in profile.flag_rates.items()},
+        }
+
+
+def _sample_distinct(profile: CatalogProfile, count: int, rng: random.Random) -> List[str]:
+    chosen: List[str] = []
+    while len(chosen) < count:
+        name = rng.choices(profile.category_names, profile.category_weights)[0]
+        if name not in chosen:
+            chosen.append(name)
+    return chosen
+
+
+def write_catalog(path: str, games: Iterable[Dict[str, str]]) -> int:
+    """Stream games to a directory CSV; returns the number of rows written."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=GAME_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for game in games:
+            writer.writerow(game)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic directory catalog modelled on a source CSV.')
+    parser.add_argument('--size', type=int, required=True, help='Number of games to generate')
+    parser.add_argument('--output', required=True, help='Directory CSV to write ("-" for stdout)')
+    parser.add_argument('--source', default=SOURCE_CSV, help='Directory CSV to model (default: the bundled export)')
+    parser.add_argument('--categories', help='Categories worksheet CSV (title,type); derived from the source if omitted')
+    parser.add_argument('--categories-output', help='Also write the categories worksheet used to this CSV')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--collision-rate', type=float,
+                        help="Share of titles duplicating an earlier one after normalization (default: the source's rate)")
+    args = parser.parse_args()
+
+    profile = CatalogProfile.from_csv(args.source, args.categories)
+    games = generate_catalog(profile, args.size, args.seed, args.collision_rate)
+    if args.output == '-':
+        writer = csv.DictWriter(sys.stdout, fieldnames=GAME_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(games)
+    else:
+        count = write_catalog(args.output, games)
+        print(f"Wrote {count} games to {args.output}", file=sys.stderr)
+
+    if args.categories_output:
+        with open(args.categories_output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['title', 'type'])
+            writer.writeheader()
+            writer.writerows(profile.categories)
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
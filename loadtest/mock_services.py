@@ -0,0 +1,559 @@
+"""
+Local HTTP stand-ins for every external service the pipeline calls.
+
+One server answers on a single port:
+
+    /v1/chat/completions             OpenAI chat completions (streamed as server-sent events on request)
+    /serper/search                   Serper search
+    /research                        Deep Research API
+    /v4/spreadsheets/...             Sheets values API (metadata, batchGet, batchUpdate, append)
+    /drivethrurpg/product/<slug>     DriveThruRPG product pages, with ETag revalidation
+    /admin/seed, /admin/stats        Harness control
+
+Each service has a latency model and quotas like the real one, and answers
+429 with Retry-After once a quota is exhausted. Latencies and quota windows
+are multiplied by --time-scale so a long run can be compressed.
+
+Run on its own with:
+    python -m loadtest.mock_services --port 8765
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class ServiceModel:
+    """Latency, quota and failure settings for one stand-in."""
+
+    def __init__(
+        self,
+        name: str,
+        median_latency: float,
+        per_token_latency: float = 0.0,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        error_rate: float = 0.0,
+        time_scale: float = 1.0
+    ):
+        self.name = name
+        self.median_latency = median_latency
+        self.per_token_latency = per_token_latency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.error_rate = error_rate
+        self.time_scale = time_scale
+        self._window = 60.0 * time_scale
+        self._requests: Deque[float] = deque()
+        self._tokens: Deque[Tuple[float, int]] = deque()
+        self._token_total = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def admit(self, tokens: int = 0) -> Optional[float]:
+        """
+        Take a request against the quotas.
+
+        Returns:
+            None if admitted, otherwise seconds until the quota frees up
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._requests and self._requests[0] <= now - self._window:
+                self._requests.popleft()
+            while self._tokens and self._tokens[0][0] <= now - self._window:
+                self._token_total -= self._tokens.popleft()[1]
+
+            if self.max_concurrency is not None and self._in_flight >= self.max_concurrency:
+                return self.median_latency * self.time_scale
+            if self.requests_per_minute is not None and len(self._requests) >= self.requests_per_minute:
+                return self._requests[0] + self._window - now
+            if self.tokens_per_minute is not None and self._token_total + tokens > self.tokens_per_minute:
+                return self._tokens[0][0] + self._window - now if self._tokens else self._window
+
+            self._requests.append(now)
+            if tokens:
+                self._tokens.append((now, tokens))
+                self._token_total += tokens
+            self._in_flight += 1
+            return None
+
+    def done(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def latency(self, tokens: int = 0) -> float:
+        # Lognormal around the median gives the long tail real APIs have
+        base = self.median_latency * math.exp(random.gauss(0, 0.5))
+        return (base + tokens * self.per_token_latency) * self.time_scale
+
+
+class Stats:
+    """Per-route counters and service-time samples, reported by /admin/stats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, route: str, status: int, latency: float) -> None:
+        with self._lock:
+            self.counts[route][str(status)] += 1
+            self.latencies[route].append(latency)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            report = {}
+            for route, counts in self.counts.items():
+                samples = sorted(self.latencies[route])
+                report[route] = {
+                    'statuses': dict(counts),
+                    'requests': sum(counts.values()),
+                    'p50': percentile(samples, 50),
+                    'p95': percentile(samples, 95),
+                    'p99': percentile(samples, 99),
+                }
+            return report
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def column_letter(col: int) -> str:
+    letters = ''
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def column_number(letters: str) -> int:
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+RANGE_PATTERN = re.compile(r"^(?:'?(?P<sheet>[^'!]+)'?!)?(?P<c1>[A-Z]*)(?P<r1>\d*)(?::(?P<c2>[A-Z]*)(?P<r2>\d*))?$")
+
+
+class Grid:
+    """An in-memory worksheet: a list of rows of strings."""
+
+    def __init__(self, rows: Optional[List[List[str]]] = None):
+        self.rows = [list(row) for row in rows or []]
+        self.lock = threading.Lock()
+
+    def _bounds(self, match) -> Tuple[int, int, int, int]:
+        width = max((len(row) for row in self.rows), default=0)
+        c1 = column_number(match['c1']) if match['c1'] else 1
+        r1 = int(match['r1']) if match['r1'] else 1
+        if match['c2'] is None and match['r2'] is None:
+            # A single cell
+            return r1, r1, c1, c1
+        c2 = column_number(match['c2']) if match['c2'] else max(width, c1)
+        r2 = int(match['r2']) if match['r2'] else len(self.rows)
+        return r1, r2, c1, c2
+
+    def get(self, match, major_dimension: str = 'ROWS') -> List[List[str]]:
+        with self.lock:
+            r1, r2, c1, c2 = self._bounds(match)
+            rows = []
+            for row in self.rows[r1 - 1:r2]:
+                values = row[c1 - 1:c2]
+                while values and values[-1] == '':
+                    values.pop()
+                rows.append(values)
+        while rows and not rows[-1]:
+            rows.pop()
+        if major_dimension != 'COLUMNS':
+            return rows
+        width = max((len(row) for row in rows), default=0)
+        columns = [[row[i] if i < len(row) else '' for row in rows] for i in range(width)]
+        for column in columns:
+            while column and column[-1] == '':
+                column.pop()
+        return columns
+
+    def set(self, match, values: List[List[Any]]) -> None:
+        with self.lock:
+            r1, _, c1, _ = self._bounds(match)
+            for dr, row_values in enumerate(values):
+                row_index = r1 - 1 + dr
+                while len(self.rows) <= row_index:
+                    self.rows.append([])
+                row = self.rows[row_index]
+                for dc, value in enumerate(row_values):
+                    col_index = c1 - 1 + dc
+                    row.extend([''] * (col_index + 1 - len(row)))
+                    row[col_index] = '' if value is None else str(value)
+
+    def append(self, values: List[List[Any]]) -> int:
+        with self.lock:
+            start = len(self.rows) + 1
+            self.rows.extend([['' if value is None else str(value) for value in row] for row in values])
+            return start
+
+
+# Words used to assemble generated text
+VOCABULARY = (
+    "adventure campaign dice narrative players table rules setting horror fantasy heroes dungeon crew "
+    "mystery mechanics tactics story combat exploration characters world danger magic investigation"
+).split()
+
+
+def sentence(seed: str, words: int = 14) -> str:
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + '.'
+
+
+class ChatResponder:
+    """Produces responses that pass the pipeline's validators for each prompt it sends."""
+
+    def __init__(self):
+        self.categories: List[str] = []
+        self.category_sets: Dict[str, List[str]] = {}
+
+    def set_categories(self, rows: List[Dict[str, str]]) -> None:
+        self.category_sets = defaultdict(list)
+        for row in rows:
+            self.category_sets[row['type'].strip().lower()].append(row['title'])
+        self.categories = [row['title'] for row in rows]
+
+    def pick_categories(self, seed: str) -> List[str]:
+        rng = random.Random(seed)
+        picked = []
+        for kind, count in (('genres', 1), ('themes', 2), ('mechanics', 2)):
+            options = self.category_sets.get(kind) or self.categories
+            picked.extend(rng.sample(options, min(count, len(options))))
+        return picked
+
+    @staticmethod
+    def article(seed: str) -> str:
+        sections = ''.join(
+            f"<section><h2>{heading}</h2><p>{sentence(seed + heading, 60)}</p></section>"
+            for heading in ('Theme and Setting', 'Core Mechanics', 'What Makes It Unique', 'Target Audience')
+        )
+        return f"<article>{sections}</article>"
+
+    def respond(self, messages: List[Dict[str, str]], json_mode: bool) -> str:
+        system = next((m['content'] for m in messages if m['role'] == 'system'), '')
+        prompt = messages[-1]['content']
+        seed = hashlib.md5(prompt.encode('utf-8')).hexdigest()
+
+        if json_mode and 'Respond with JSON only, as one object' in prompt:
+            # Combined generation: one object with the requested fields
+            values = {
+                'summary': ' '.join(sentence(f"{seed}{i}", 22) for i in range(2)),
+                'full_text': self.article(seed),
+                'category': self.pick_categories(seed),
+                'potential_categories': [f"Mock Tag {random.Random(seed).randint(1, 500)}"],
+            }
+            return json.dumps({field: value for field, value in values.items() if f'- "{field}":' in prompt})
+        if json_mode:
+            ids = [int(number) for number in re.findall(r'^(\d+)\. ', prompt, re.MULTILINE)]
+            field = re.search(r'"id": <number>, "(\w+)"', prompt).group(1)
+            games = []
+            for game_id in ids:
+                if field == 'categories':
+                    values = self.pick_categories(f"{seed}{game_id}")
+                else:
+                    values = [f"Mock Tag {random.Random(f'{seed}{game_id}').randint(1, 500)}"]
+                games.append({'id': game_id, field: values})
+            return json.dumps({'games': games})
+
+        if system.startswith('You categorize'):
+            return '; '.join(self.pick_categories(seed))
+        if 'potential categories' in system or 'potential categories' in prompt:
+            rng = random.Random(seed)
+            return f"Mock Tag {rng.randint(1, 500)}; Mock Tag {rng.randint(501, 1000)}"
+        if 'Extract all user reviews' in prompt:
+            return '\n'.join(sentence(f"{seed}{i}") for i in range(5))
+        if 'Summarize the following user reviews' in prompt:
+            return ' '.join(sentence(f"{seed}{i}", 18) for i in range(3))
+        if 'formatted in HTML' in prompt:
+            return self.article(seed)
+        return ' '.join(sentence(f"{seed}{i}", 22) for i in range(2))
+
+
+class MockServices:
+    """State shared by every request handler."""
+
+    def __init__(self, time_scale: float = 1.0, error_rate: float = 0.002):
+        self.time_scale = time_scale
+        self.models = {
+            # Tier-3-like limits for gpt-4o-class models
+            'openai': ServiceModel('openai', 0.5, per_token_latency=0.012, requests_per_minute=5000,
+                                   tokens_per_minute=800000, error_rate=error_rate, time_scale=time_scale),
+            'serper': ServiceModel('serper', 0.4, requests_per_minute=3000, error_rate=error_rate, time_scale=time_scale),
+            # Deep research is slow and runs only a few jobs at a time
+            'research': ServiceModel('research', 25.0, max_concurrency=8, error_rate=error_rate, time_scale=time_scale),
+            # Per-project read and write quotas of the Sheets API
+            'sheets_read': ServiceModel('sheets_read', 0.25, requests_per_minute=300, error_rate=error_rate, time_scale=time_scale),
+            'sheets_write': ServiceModel('sheets_write', 0.6, requests_per_minute=300, error_rate=error_rate, time_scale=time_scale),
+            'drivethrurpg': ServiceModel('drivethrurpg', 1.2, max_concurrency=16, error_rate=error_rate, time_scale=time_scale),
+        }
+        self.stats = Stats()
+        self.chat = ChatResponder()
+        self.sheets: Dict[str, Grid] = {'Sheet1': Grid(), 'categories': Grid()}
+
+    def seed(self, payload: Dict[str, Any]) -> None:
+        self.sheets = {
+            'Sheet1': Grid(payload['rows']),
+            'categories': Grid([['title', 'type']] + [[row['title'], row['type']] for row in payload['categories']]),
+        }
+        self.chat.set_categories(payload['categories'])
+        self.stats = Stats()
+
+    def sheet_summary(self) -> Dict[str, Any]:
+        """How many rows have each column filled, to spot writes that never landed."""
+        grid = self.sheets['Sheet1']
+        with grid.lock:
+            header, rows = grid.rows[0], grid.rows[1:]
+            filled = {
+                name: sum(1 for row in rows if i < len(row) and row[i].strip())
+                for i, name in enumerate(header) if name
+            }
+        return {'rows': len(rows), 'filled': filled}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    services: MockServices = None
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def _send(self, status: int, body: Any = None, headers: Optional[Dict[str, str]] = None, raw: bool = False) -> None:
+        data = body.encode('utf-8') if raw else json.dumps(body if body is not None else {}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html' if raw else 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _serve(
+        self,
+        service: str,
+        route: str,
+        handler,
+        tokens: int = 0,
+        stream: bool = False,
+        include_usage: bool = False
+    ) -> None:
+        """Apply the service's quota, latency and error model around a handler."""
+        model = self.services.models[service]
+        start = time.monotonic()
+        wait = model.admit(tokens)
+        if wait is not None:
+            self._send(429, {'error': {'message': f'{service} rate limit exceeded', 'type': 'rate_limit_exceeded'}},
+                       {'Retry-After': str(max(1, math.ceil(wait))), 'retry-after-ms': str(int(wait * 1000))})
+            self.services.stats.record(route, 429, time.monotonic() - start)
+            return
+        try:
+            status, body, headers, raw = handler()
+            failed = random.random() < model.error_rate
+            if stream and status == 200 and not failed:
+                self._send_events(body, model, route, start, include_usage)
+                return
+            time.sleep(model.latency(tokens))
+            if failed:
+                status, body, headers, raw = 503, {'error': {'message': 'backend unavailable'}}, {}, False
+        finally:
+            model.done()
+        self._send(status, body, headers, raw)
+        self.services.stats.record(route, status, time.monotonic() - start)
+
+    def _send_events(self, completion: Dict[str, Any], model: ServiceModel, route: str, start: float, include_usage: bool) -> None:
+        """
+        Send a chat completion as server-sent events, one word per chunk.
+
+        The first chunk arrives after the service's base latency and the
+        rest at its per-token rate, so time to first token can be measured.
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(data: str) -> None:
+            payload = f"data: {data}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(payload):x}\r\n".encode('ascii') + payload + b"\r\n")
+            self.wfile.flush()
+
+        chunk = {key: completion[key] for key in ('id', 'created', 'model')}
+        chunk['object'] = 'chat.completion.chunk'
+        time.sleep(model.latency())
+        self.services.stats.record(f"{route}.first_token", 200, time.monotonic() - start)
+        for piece in re.findall(r'\S+\s*', completion['choices'][0]['message']['content']):
+            event(json.dumps({**chunk, 'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]}))
+            time.sleep(model.per_token_latency * model.time_scale)
+        event(json.dumps({**chunk, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}))
+        if include_usage:
+            event(json.dumps({**chunk, 'choices': [], 'usage': completion['usage']}))
+        event('[DONE]')
+        self.wfile.write(b"0\r\n\r\n")
+        self.services.stats.record(route, 200, time.monotonic() - start)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = unquote(url.path)
+        query = parse_qs(url.query)
+
+        if path == '/admin/stats':
+            self._send(200, {'routes': self.services.stats.report(), 'sheet': self.services.sheet_summary()})
+        elif path.startswith('/drivethrurpg/product/'):
+            self._serve('drivethrurpg', 'drivethrurpg', lambda: self._product_page(path.rsplit('/', 1)[-1]))
+        elif path.endswith('/values:batchGet'):
+            self._serve('sheets_read', 'sheets.batchGet', lambda: self._batch_get(query))
+        elif path.startswith('/v4/spreadsheets/'):
+            titles = list(self.services.sheets)
+            self._serve('sheets_read', 'sheets.metadata',
+                        lambda: (200, {'sheets': [{'properties': {'title': title}} for title in titles]}, {}, False))
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        path = unquote(urlparse(self.path).path)
+        body = self._body()
+
+        if path == '/admin/seed':
+            self.services.seed(body)
+            self._send(200, {'rows': len(body['rows'])})
+        elif path == '/v1/chat/completions':
+            max_tokens = int(body.get('max_tokens') or 500)
+            self._serve('openai', 'openai', lambda: self._chat(body), tokens=max_tokens, stream=bool(body.get('stream')),
+                        include_usage=bool((body.get('stream_options') or {}).get('include_usage')))
+        elif path == '/serper/search':
+            self._serve('serper', 'serper', lambda: self._search(body))
+        elif path == '/research':
+            self._serve('research', 'research', lambda: self._research(body))
+        elif path.endswith('/values:batchUpdate'):
+            self._serve('sheets_write', 'sheets.batchUpdate', lambda: self._batch_update(body))
+        elif path.endswith(':append'):
+            range_name = path.rsplit('/values/', 1)[-1][:-len(':append')]
+            self._serve('sheets_write', 'sheets.append', lambda: self._append(range_name, body))
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def _chat(self, body):
+        json_mode = (body.get('response_format') or {}).get('type') == 'json_object'
+        content = self.services.chat.respond(body['messages'], json_mode)
+        prompt_tokens = sum(len(m['content']) for m in body['messages']) // 4
+        completion_tokens = len(content) // 4
+        return 200, {
+            'id': 'chatcmpl-mock',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }, {}, False
+
+    def _search(self, body):
+        query = body.get('q', '').replace(' site:drivethrurpg.com', '')
+        slug = re.sub(r'[^a-z0-9]+', '-', query.lower()).strip('-')
+        host = self.headers.get('Host')
+        return 200, {'organic': [{'title': query, 'link': f"http://{host}/drivethrurpg/product/{slug}"}]}, {}, False
+
+    def _research(self, body):
+        title = body.get('query', '')
+        sections = ''.join(
+            f"<h2>{heading}</h2><p>{sentence(title + heading, 80)}</p>"
+            for heading in ('Theme and Setting', 'Core Mechanics', 'What Makes It Unique', 'Target Audience')
+        )
+        return 200, sections, {}, True
+
+    def _product_page(self, slug: str):
+        etag = f'"{hashlib.md5(slug.encode()).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            return 304, '', {'ETag': etag}, True
+        reviews = ''.join(f"<div class='review'><p>{sentence(slug + str(i), 40)}</p></div>" for i in range(12))
+        page = f"<html><body><h1>{slug}</h1><div class='reviews'>{reviews}</div></body></html>"
+        return 200, page, {'ETag': etag}, True
+
+    def _grid_and_match(self, range_name: str):
+        match = RANGE_PATTERN.match(range_name)
+        if not match:
+            raise ValueError(f"Unsupported range {range_name}")
+        return self.services.sheets.get(match['sheet'] or 'Sheet1', self.services.sheets['Sheet1']), match
+
+    def _batch_get(self, query):
+        major_dimension = query.get('majorDimension', ['ROWS'])[0]
+        value_ranges = []
+        for range_name in query.get('ranges', []):
+            grid, match = self._grid_and_match(range_name)
+            value_ranges.append({'range': range_name, 'majorDimension': major_dimension,
+                                 'values': grid.get(match, major_dimension)})
+        return 200, {'valueRanges': value_ranges}, {}, False
+
+    def _batch_update(self, body):
+        for entry in body.get('data', []):
+            grid, match = self._grid_and_match(entry['range'])
+            grid.set(match, entry['values'])
+        return 200, {'totalUpdatedCells': sum(len(entry['values']) for entry in body.get('data', []))}, {}, False
+
+    def _append(self, range_name, body):
+        grid, _ = self._grid_and_match(range_name)
+        start = grid.append(body.get('values', []))
+        return 200, {'updates': {'updatedRange': f"A{start}"}}, {}, False
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on purpose, e.g. snapshot revalidation skipping the body
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def serve(port: int = 0, time_scale: float = 1.0, error_rate: float = 0.002) -> ThreadingHTTPServer:
+    """Start the stand-ins on a background thread and return the server."""
+    handler = type('BoundHandler', (Handler,), {'services': MockServices(time_scale, error_rate)})
+    server = MockServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, name='mock-services', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run local stand-ins for OpenAI, Serper, research, Sheets and DriveThruRPG.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--time-scale', type=float, default=1.0, help='Multiplier for latencies and quota windows')
+    parser.add_argument('--error-rate', type=float, default=0.002, help='Fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    server = serve(args.port, args.time_scale, args.error_rate)
+    print(f"Mock services listening on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Load test for process_games against local stand-ins of every external service.
+
+Starts loadtest.mock_services in its own process, then for each catalog size
+runs the real pipeline (TTRPGBlurbWriter.process_games with write-behind
+writes) in a fresh child process so memory and module state are measured per
+size. Reports throughput, per-game latency percentiles, peak memory, the
+stand-ins' request/429 counts and the most common failures.
+
+    python -m loadtest.run_load_test --sizes 1000,10000,100000 --workers 16 --time-scale 0.02
+
+Only the browser is replaced: review pages are fetched from the stand-in with
+a plain GET instead of Selenium or crawl4ai.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import requests
+from loadtest.catalog_generator import SOURCE_CSV, CatalogProfile, generate_catalog
+from loadtest.mock_services import percentile
+
+# Column layout of the directory sheet, matching SheetsService.COLUMN_MAPPING
+SHEET_HEADER = [
+    'title', 'url', 'imgUrl', 'page', 'reviewsUrl', 'reviewSummary', 'text', 'fullText', 'notes',
+    'Category', 'Potential Category', 'Rank', 'Hide', 'isFree', 'isTopRated', 'verified', 'premium',
+] + [f"related_item_{n}_{field}" for n in range(1, 4) for field in ('title', 'imgUrl', 'page', 'fullText')]
+# Columns filled in before the pipeline runs; Category too, since related games
+# are picked from the categories already in the sheet
+UNPROCESSED_FIELDS = {'title', 'url', 'imgUrl', 'page', 'Category', 'Rank', 'Hide', 'isFree', 'isTopRated', 'verified', 'premium'}
+
+
+def build_catalog(
+    size: int,
+    source_csv: str = SOURCE_CSV,
+    collision_rate: Optional[float] = None
+) -> Tuple[List[List[str]], List[Dict[str, str]]]:
+    """
+    Sheet rows (header first) for `size` games and the categories worksheet.
+
+    Games come from catalog_generator, modelled on the bundled directory.
+    Generated columns other than Category are left empty, as for games
+    that haven't been processed yet.
+    """
+    profile = CatalogProfile.from_csv(source_csv)
+    rows = [SHEET_HEADER]
+    for game in generate_catalog(profile, size, collision_rate=collision_rate):
+        rows.append([game.get(name, '') if name in UNPROCESSED_FIELDS else '' for name in SHEET_HEADER])
+    return rows, profile.categories
+
+
+class FailureCounter(logging.Handler):
+    """Counts warnings and errors by message shape, with game names and numbers masked."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.counts: Counter = Counter()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage().strip().splitlines()[0]
+        message = re.sub(r"\b(for|processing|Processing|to|from|at) [^:]*", r"\1 <game>", message)
+        message = re.sub(r"\d+(\.\d+)?", "N", message)
+        self.counts[f"{record.levelname}: {message[:120]}"] += 1
+
+
+def run_size(
+    size: int,
+    base_url: str,
+    workers: int,
+    batch_size: int,
+    time_limit: float,
+    combined: bool = False,
+    collision_rate: Optional[float] = None,
+    profile_dir: Optional[str] = None,
+    time_scale: float = 1.0
+) -> Dict[str, Any]:
+    """Run the pipeline over a catalog of `size` games; runs inside a child process."""
+    # Point every client at the stand-ins before the services are imported
+    os.environ.update({
+        'OPENAI_BASE_URL': f"{base_url}/v1",
+        'OPENAI_API_KEY': 'loadtest',
+        'SERPER_API_URL': f"{base_url}/serper/search",
+        'SERPER_API_KEY': 'loadtest',
+        'RESEARCH_API_URL': f"{base_url}/research",
+        # Pace Sheets to the stand-in's 300/minute quota, whose minute is scaled too
+        'SHEETS_REQUESTS_PER_MINUTE': str(300 / time_scale),
+    })
+    rows, categories = build_catalog(size, collision_rate=collision_rate)
+    requests.post(f"{base_url}/admin/seed", json={'rows': rows, 'categories': categories}).raise_for_status()
+
+    os.chdir(tempfile.mkdtemp(prefix=f'loadtest-{size}-'))
+    import main
+    from loadtest.sheets_client import RemoteSpreadsheet
+    from services.model_router import model_router
+    from services.scheduler import RunBudget
+    from services.scraper_service import ScraperService
+    from services.sheets_service import SheetsService
+    from services.snapshot_store import HTML
+    from utils.concurrency import coalesced_counts
+    from utils.profiling import start_profiling, stop_profiling
+
+    failures = FailureCounter()
+    root = logging.getLogger()
+    root.handlers = [failures]
+    root.setLevel(logging.WARNING)
+    SheetsService.spreadsheet_opener = staticmethod(lambda: RemoteSpreadsheet(base_url))
+
+    latencies: List[float] = []
+    failed: List[str] = []
+
+    class LoadTestWriter(main.TTRPGBlurbWriter):
+        def fetch_review_text(self, url):
+            text, validators = self._current_snapshot_text(url)
+            if text:
+                return text
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+            self.snapshot_store.put(url, response.text, HTML, validators)
+            return ScraperService().get_visible_text(response.text)
+
+        def process_game(self, title, column=None):
+            start = time.monotonic()
+            try:
+                super().process_game(title, column)
+            except Exception:
+                failed.append(title)
+                raise
+            finally:
+                latencies.append(time.monotonic() - start)
+
+    titles = [row[0] for row in rows[1:]]
+    if profile_dir:
+        start_profiling(os.path.join(profile_dir, str(size)))
+    started = time.monotonic()
+    writer = LoadTestWriter(fetcher='selenium', write_behind=True, combined=combined)
+    try:
+        writer.process_games(titles, None, batch_size, RunBudget(time_budget=time_limit), None, workers)
+    finally:
+        writer.close()
+    elapsed = time.monotonic() - started
+    profiler = stop_profiling()
+
+    stats = requests.get(f"{base_url}/admin/stats").json()
+    filled = stats['sheet']['filled']
+    return {
+        'size': size,
+        'attempted': len(latencies),
+        'failed': len(failed),
+        'seconds': elapsed,
+        'games_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(sorted(latencies), 50),
+        'p95': percentile(sorted(latencies), 95),
+        'p99': percentile(sorted(latencies), 99),
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024),
+        'rows_with_summary': filled.get('text', 0),
+        'rows_with_full_text': filled.get('fullText', 0),
+        'rows_with_reviews': filled.get('reviewSummary', 0),
+        'model_calls': dict(model_router.usage),
+        'estimated_cost': model_router.cost,
+        'coalesced': coalesced_counts(),
+        'routes': stats['routes'],
+        'failures': failures.counts.most_common(10),
+        'profile': profiler.format_report() if profiler else None,
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    print(f"\n{'games':>8} {'done':>8} {'failed':>7} {'games/s':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'RSS MB':>7} {'written':>8}")
+    for r in results:
+        print(f"{r['size']:>8} {r['attempted']:>8} {r['failed']:>7} {r['games_per_second']:>8.2f} "
+              f"{r['p50']:>7.2f} {r['p95']:>7.2f} {r['p99']:>7.2f} {r['peak_rss_mb']:>7.0f} {r['rows_with_summary']:>8}")
+
+    for r in results:
+        print(f"\n{r['size']} games: {r['seconds']:.0f}s, model calls {r['model_calls']}, about ${r['estimated_cost']:.2f}")
+        if r['coalesced']:
+            print(f"  Duplicate in-flight requests merged: {r['coalesced']}")
+        for route, route_stats in sorted(r['routes'].items()):
+            statuses = ', '.join(f"{status}={count}" for status, count in sorted(route_stats['statuses'].items()))
+            print(f"  {route:<20} {route_stats['requests']:>8} requests ({statuses}), "
+                  f"service time p50 {route_stats['p50']:.2f}s p99 {route_stats['p99']:.2f}s")
+        if r['profile']:
+            print('  ' + r['profile'].replace('\n', '\n  '))
+        if r['failures']:
+            print("  Most common warnings and errors:")
+            for message, count in r['failures']:
+                print(f"    {count:>6}  {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test process_games against local service stand-ins.')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Comma-separated catalog sizes (default: 1000,10000,100000)')
+    parser.add_argument('--workers', type=int, default=16, help='Games processed concurrently (default: 16)')
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--time-scale', type=float, default=0.02,
+                        help='Multiplier for stand-in latencies and quota windows (default: 0.02)')
+    parser.add_argument('--error-rate', type=float, default=0.002, help='Fraction of stand-in requests answered with 503')
+    parser.add_argument('--time-limit', type=float, default=900, help='Seconds each size may run before stopping (default: 900)')
+    parser.add_argument('--port', type=int, default=0, help='Port for the stand-ins (default: any free port)')
+    parser.add_argument('--combined', action='store_true', help='Run the pipeline with combined single-request generation')
+    parser.add_argument('--collision-rate', type=float,
+                        help='Share of titles that duplicate an earlier one after normalization (default: as in the bundled CSV)')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='Profile each run and write its stage profiles to DIR/<size> (see utils.profiling)')
+    parser.add_argument('--output', help='Also write the results as JSON to this file')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_size(args.child, args.base_url, args.workers, args.batch_size, args.time_limit,
+                          args.combined, args.collision_rate, args.profile, args.time_scale)
+        print(json.dumps(result))
+        return 0
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    mocks = subprocess.Popen(
+        [sys.executable, '-m', 'loadtest.mock_services', '--port', str(args.port),
+         '--time-scale', str(args.time_scale), '--error-rate', str(args.error_rate)],
+        cwd=repo_root, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        base_url = mocks.stdout.readline().strip().rsplit(' ', 1)[-1]
+        results = []
+        for size in (int(size) for size in args.sizes.split(',')):
+            print(f"Running {size} games...", flush=True)
+            child = subprocess.run(
+                [sys.executable, '-m', 'loadtest.run_load_test', '--child', str(size), '--base-url', base_url,
+                 '--workers', str(args.workers), '--batch-size', str(args.batch_size), '--time-limit', str(args.time_limit),
+                 '--time-scale', str(args.time_scale)]
+                + (['--combined'] if args.combined else [])
+                + (['--collision-rate', str(args.collision_rate)] if args.collision_rate is not None else [])
+                + (['--profile', os.path.abspath(args.profile)] if args.profile else []),
+                cwd=repo_root, stdout=subprocess.PIPE, text=True
+            )
+            if child.returncode != 0:
+                print(f"  {size} games: run failed with exit code {child.returncode}")
+                continue
+            results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+        print_report(results)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+    finally:
+        mocks.terminate()
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
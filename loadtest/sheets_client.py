@@ -0,0 +1,92 @@
+"""
+A minimal gspread-compatible client for the Sheets stand-in.
+
+Implements the Spreadsheet/Worksheet calls SheetsService makes, over the
+same values API shapes the real Sheets API uses, so the harness exercises
+the pipeline's real request pattern. Install it with:
+
+    SheetsService.spreadsheet_opener = staticmethod(lambda: RemoteSpreadsheet(base_url))
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+import requests
+from loadtest.mock_services import column_letter
+
+session = requests.Session()
+session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=256))
+
+
+def _check(response: requests.Response) -> Dict[str, Any]:
+    # HTTPError carries the response, so the retry policy sees the status and Retry-After
+    response.raise_for_status()
+    return response.json()
+
+
+class Cell(NamedTuple):
+    value: Optional[str]
+
+
+class RemoteSpreadsheet:
+    """Opening costs one metadata request, like gspread's Client.open."""
+
+    def __init__(self, base_url: str, spreadsheet_id: str = 'loadtest'):
+        self.url = f"{base_url}/v4/spreadsheets/{spreadsheet_id}"
+        self.titles = [sheet['properties']['title'] for sheet in _check(session.get(self.url))['sheets']]
+
+    @property
+    def sheet1(self) -> 'RemoteWorksheet':
+        return RemoteWorksheet(self.url, self.titles[0])
+
+    def worksheet(self, title: str) -> 'RemoteWorksheet':
+        if title not in self.titles:
+            raise ValueError(f"No worksheet named {title}")
+        return RemoteWorksheet(self.url, title)
+
+
+class RemoteWorksheet:
+    def __init__(self, spreadsheet_url: str, title: str):
+        self.spreadsheet_url = spreadsheet_url
+        self.title = title
+
+    def _range(self, range_name: str) -> str:
+        return f"'{self.title}'!{range_name}"
+
+    def batch_get(self, ranges: List[str], major_dimension: str = 'ROWS') -> List[List[List[str]]]:
+        response = session.get(
+            f"{self.spreadsheet_url}/values:batchGet",
+            params={'ranges': [self._range(name) for name in ranges], 'majorDimension': major_dimension}
+        )
+        return [value_range.get('values', []) for value_range in _check(response)['valueRanges']]
+
+    def col_values(self, col: int) -> List[str]:
+        letter = column_letter(col)
+        columns = self.batch_get([f"{letter}1:{letter}"], major_dimension='COLUMNS')[0]
+        return columns[0] if columns else []
+
+    def row_values(self, row: int) -> List[str]:
+        rows = self.batch_get([f"{row}:{row}"])[0]
+        return rows[0] if rows else []
+
+    def cell(self, row: int, col: int) -> Cell:
+        rows = self.batch_get([f"{column_letter(col)}{row}"])[0]
+        return Cell(rows[0][0] if rows and rows[0] else None)
+
+    def get_all_records(self) -> List[Dict[str, Any]]:
+        rows = self.batch_get(['A1:'])[0]
+        if not rows:
+            return []
+        header = rows[0]
+        return [dict(zip(header, row + [''] * (len(header) - len(row)))) for row in rows[1:]]
+
+    def batch_update(self, data: List[Dict[str, Any]], value_input_option: str = 'RAW') -> Dict[str, Any]:
+        payload = {
+            'valueInputOption': value_input_option,
+            'data': [{'range': self._range(entry['range']), 'values': entry['values']} for entry in data],
+        }
+        return _check(session.post(f"{self.spreadsheet_url}/values:batchUpdate", json=payload))
+
+    def append_rows(self, values: List[List[Any]], value_input_option: str = 'RAW') -> Dict[str, Any]:
+        return _check(session.post(
+            f"{self.spreadsheet_url}/values/{self._range('A1')}:append",
+            params={'valueInputOption': value_input_option},
+            json={'values': values}
+        ))
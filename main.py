@@ -2,12 +2,26 @@ import argparse
 import time
 import logging
 import os
-from typing import Optional, Tuple, List, Dict, Any
-from services.openai_service import OpenAIService
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, List, Dict, Any
+from services.openai_service import OpenAIService, COMBINED_FIELDS
 from services.sheets_service import SheetsService
 from services.scraper_service import ScraperService
 from services.serper_service import SerperService
 from services.research_service import ResearchService
+from services.model_router import model_router
+from services.prompt_builder import PromptBudget, overruns as prompt_overruns
+from services.queue_service import LeaseHeartbeat, open_queue, default_worker_id
+from services.sheet_writer import SheetWriteBehind
+from services.related_games_service import RelatedGamesGraph, RelatedGamesService, split_categories
+from services.category_stats import CategoryStats
+from utils.title_index import normalize_title
+from services.export_service import ExportService, load_pages
+from services.scheduler import PriorityScheduler, RunBudget
+from services.snapshot_store import SnapshotStore, Snapshot, HTML, MARKDOWN
+from utils.concurrency import coalesced_counts, get_limiter
+from utils.profiling import profile_stage, start_profiling, stop_profiling
 
 # Set up logging
 logging.basicConfig(format='%(message)s', level=logging.INFO)
@@ -22,16 +36,250 @@ else:
 class TTRPGBlurbWriter:
     """Main class for managing TTRPG content generation and updates."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        fetcher: str = 'crawl4ai',
+        write_behind: bool = False,
+        dry_run: bool = False,
+        snapshot_dir: str = 'snapshots',
+        combined: bool = False
+    ):
         self.openai_service = OpenAIService()
         self.sheets_service = SheetsService()
         self.serper_service = SerperService()
         self.research_service = ResearchService()
+        # Values generated ahead of time by batched requests, keyed by column then title
+        self._prefetched: Dict[str, Dict[str, str]] = {}
+        self._category_stats: Optional[CategoryStats] = None
+        self._category_stats_lock = threading.Lock()
+        self._related_graph: Optional[RelatedGamesGraph] = None
+        self._related_graph_lock = threading.Lock()
+        self.crawler_service = None
+        if fetcher == 'crawl4ai':
+            # Imported here so the Selenium fetcher works without crawl4ai installed
+            from services.crawler_service import CrawlerService
+            self.crawler_service = CrawlerService()
+        # Buffers spreadsheet writes on a background thread so generation never waits on Sheets
+        self.sheet_writer = SheetWriteBehind() if write_behind and not dry_run else None
+        self.dry_run = dry_run
+        # Every fetched review page is kept so extraction can be rerun offline
+        self.snapshot_store = SnapshotStore(snapshot_dir)
+        # Generate summary and categories with one request per game
+        self.combined = combined
+
+    def close(self) -> None:
+        """Release long-lived resources and flush any buffered spreadsheet writes."""
+        if self.crawler_service:
+            self.crawler_service.close()
+        if self.sheet_writer:
+            self.sheet_writer.close()
+
+    def get_category_stats(self) -> CategoryStats:
+        """Category co-occurrence statistics for the directory, built once and kept up to date."""
+        if self._category_stats is None:
+            # Workers needing the stats at the same time wait for one build
+            with self._category_stats_lock:
+                if self._category_stats is None:
+                    self._category_stats = CategoryStats.from_rows(
+                        self.sheets_service.get_all_games(['title', 'Category', 'Potential Category']),
+                        self.openai_service.categories
+                    )
+        return self._category_stats
+
+    def get_related_graph(self) -> RelatedGamesGraph:
+        """Catalog-wide related-games graph, built once per run."""
+        if self._related_graph is None:
+            with self._related_graph_lock:
+                if self._related_graph is None:
+                    self._related_graph = RelatedGamesGraph(
+                        self.sheets_service.get_all_games(['title', 'Category', 'imgUrl', 'page'])
+                    )
+        return self._related_graph
+
+    def prefetch_review_pages(self, games: List[str]) -> None:
+        """
+        Look up DriveThruRPG URLs for several games and render their pages concurrently.
+
+        Only used with the crawl4ai fetcher; the markdown is consumed (and
+        released) by generate_review_summary as each game is processed.
+        """
+        if not self.crawler_service:
+            return
+        urls = self._prefetched.setdefault('reviews_url', {})
+        for title in games:
+            if title not in urls:
+                urls[title] = self.serper_service.get_drivethrurpg_url(title)
+        batch_urls = [urls[title] for title in games if urls[title]]
+        pages = self._prefetched.setdefault('review_pages', {})
+        to_crawl = {}
+        for url in batch_urls:
+            text, validators = self._current_snapshot_text(url)
+            if text:
+                pages[url] = text
+            else:
+                to_crawl[url] = validators
+        logger.info(f"Crawling {len(to_crawl)} DriveThruRPG pages "
+                    f"({len(batch_urls) - len(to_crawl)} unchanged since their last snapshot)...")
+        try:
+            for url, markdown in self.crawler_service.fetch_many(list(to_crawl)).items():
+                pages[url] = markdown
+                if markdown:
+                    self.snapshot_store.put(url, markdown, MARKDOWN, to_crawl[url])
+        except Exception as e:
+            logger.error(f"Error crawling review pages: {str(e)}")
+
+    def snapshot_text(self, snapshot: Snapshot) -> Optional[str]:
+        """The text review extraction runs on, from a stored page."""
+        content = self.snapshot_store.content(snapshot)
+        if content and snapshot.kind == HTML:
+            return ScraperService().get_visible_text(content)
+        return content
+
+    def _current_snapshot_text(self, url: str) -> Tuple[Optional[str], Optional[Dict[str, Optional[str]]]]:
+        """
+        Reuse the stored page when the server says it hasn't changed.
+
+        Returns:
+            The page text and None if the snapshot is current, otherwise None
+            and the validators to store with the fresh fetch
+        """
+        validators = self.snapshot_store.revalidate(url)
+        if validators is None:
+            text = self.snapshot_text(self.snapshot_store.latest(url))
+            if text:
+                return text, None
+            validators = {}
+        return None, validators
+
+    def fetch_review_text(self, url: str) -> Optional[str]:
+        """Get the readable text of a DriveThruRPG page with the configured fetcher."""
+        if self.crawler_service:
+            pages = self._prefetched.get('review_pages', {})
+            if url in pages:
+                return pages.pop(url)
+
+        text, validators = self._current_snapshot_text(url)
+        if text:
+            return text
+
+        if self.crawler_service:
+            markdown = self.crawler_service.fetch(url)
+            if markdown:
+                self.snapshot_store.put(url, markdown, MARKDOWN, validators)
+            return markdown
+
+        # Get reviews from DriveThruRPG
+        scraper = ScraperService()
+        
+        # Concurrent scrapes adapt to how quickly DriveThruRPG responds
+        with get_limiter('drivethrurpg').slot(), profile_stage('drivethrurpg'):
+            rawHtml = scraper.scrape_drivethrurpg_html(url)
+        if not rawHtml:
+            logger.warning(f"No HTML content found at {url}")
+            return None
+        self.snapshot_store.put(url, rawHtml, HTML, validators)
+        
+        return scraper.get_visible_text(rawHtml)
+
+    def prefetch_categories(self, games: List[str], column: Optional[str] = None, batch_size: int = 20) -> None:
+        """
+        Categorize games in batches before they are processed one by one.
+
+        Each batch request shares the static category-list prefix, so a full
+        catalog run sends that prefix once per batch instead of once per game.
+        Potential categories get the CategoryStats shortlist instead of the
+        full list. Games missing from a batch response fall back to
+        single-game calls.
+        """
+        fetchers = {
+            'category': self.openai_service.get_ttrpg_categories_batch,
+            'potential_categories': self._potential_categories_batch,
+        }
+        for field, fetch_batch in fetchers.items():
+            if column and column != field:
+                continue
+            prefetched = self._prefetched.setdefault(field, {})
+            for start in range(0, len(games), batch_size):
+                batch = games[start:start + batch_size]
+                logger.info(f"Batch fetching {field} for games {start + 1}-{start + len(batch)} of {len(games)}...")
+                try:
+                    prefetched.update(fetch_batch(batch))
+                except Exception as e:
+                    logger.error(f"Error batch fetching {field}: {str(e)}")
+
+    def _potential_categories_batch(self, games: List[str]) -> Dict[str, str]:
+        stats = self.get_category_stats()
+        prefetched = self._prefetched.get('category', {})
+        current = {
+            title: split_categories(prefetched[title]) if prefetched.get(title) else stats.game_categories(title)
+            for title in games
+        }
+        shared_context, game_contexts = stats.batch_prompt_context(current)
+        return self.openai_service.get_potential_categories_batch(games, shared_context, game_contexts)
+
+    @staticmethod
+    def _token_printer(label: str) -> Callable[[str], None]:
+        """Print streamed text under a heading as it arrives, starting over under a new heading on a retry."""
+        heading = label
+        started = False
+
+        def on_token(token: str) -> None:
+            nonlocal started
+            if not started:
+                print(f"\n{heading}:", flush=True)
+                started = True
+            print(token, end='', flush=True)
+
+        def restart() -> None:
+            # Called before every attempt; only one that follows printed text needs marking
+            nonlocal heading, started
+            if started:
+                print("\n[Retrying; the text above is discarded]", flush=True)
+                heading = f"{label} (retry)"
+                started = False
+
+        on_token.restart = restart
+        return on_token
+
+    def research_full_text(
+        self,
+        title: str,
+        notes: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Optional[str]:
+        """Get the HTML full text for a game from the research service."""
+        budget = PromptBudget('research')
+        notes = budget.fit('notes', notes)
+        research_prompt = f"""Create a detailed HTML article about the tabletop roleplaying game '{title}' that covers:
+        - Theme and setting
+        - Core mechanics and rules
+        - What makes it unique
+        - Target audience and player experience
+        
+        {"Additional context: " + notes if notes else ''}
+        
+        Format requirements:
+        - Do not include any report intro or outro, start with the first section and end with the last section
+        - Start headings with <h2> (no h1 tags)
+        - Include specific examples and details
+        - Keep the word count under 500 words"""
+        
+        # Strip any h1 tags from the beginning of the research output
+        full_text = self.research_service.get_research(
+            game_title=title,
+            prompt=budget.check(research_prompt),
+            on_token=on_token
+        )
+        if full_text and full_text.strip().startswith("<h1>"):
+            full_text = full_text[full_text.find("</h1>") + 5:].strip()
+        return full_text
 
     def generate_game_content(
         self, 
         title: str, 
-        column: Optional[str] = None
+        column: Optional[str] = None,
+        stream: bool = False,
+        on_field: Optional[Callable[[str, Dict[str, Any]], None]] = None
     ) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str], Optional[List[Dict[str, Any]]], Optional[str], Optional[str]]:
         """
         Generate requested content for a game title.
@@ -39,81 +287,103 @@ class TTRPGBlurbWriter:
         Args:
             title: Name of the game
             column: Specific column to update (if any)
+            stream: Print the summary, full text and review summary as they are generated
+            on_field: Called with the column name and its update_google_sheet
+                arguments as soon as each column is complete
             
         Returns:
             Tuple containing: summary, full_text, category, potential_categories, related_data, review_summary, reviews_url
         """
         summary = full_text = category = potential_categories = related_data = review_summary = reviews_url = None
+
+        def printer(label: str) -> Optional[Callable[[str], None]]:
+            return self._token_printer(label) if stream else None
+
+        def done(field: str, **values) -> None:
+            if stream and field in ('summary', 'full_text', 'reviewSummary'):
+                print(flush=True)  # End the streamed text's line
+            if on_field and any(values.values()):
+                on_field(field, values)
         
         try:
             # Get notes for the game from the spreadsheet
             notes = self.sheets_service.get_notes(title)
+
+            # Fields generated together in one structured request when refreshing the whole row
+            combined: Dict[str, Optional[str]] = {}
+            if self.combined and not column:
+                fields = [field for field in COMBINED_FIELDS if not self._prefetched.get(field, {}).get(title)]
+                # When batch prefetch already covered the categories there is nothing to combine
+                if len(fields) > 1:
+                    logger.info(f"Getting {', '.join(fields)} in one request...")
+                    category_context = None
+                    if 'potential_categories' in fields:
+                        stats = self.get_category_stats()
+                        category_context = stats.prompt_context(stats.game_categories(title))
+                    combined = self.openai_service.get_game_content_combined(title, notes, fields, category_context)
             
             if not column or column == 'summary':
-                logger.info("Getting TTRPG summary...")
-                summary = self.openai_service.get_ttrpg_summary(title, notes)
+                if 'summary' in combined:
+                    summary = combined['summary']
+                else:
+                    logger.info("Getting TTRPG summary...")
+                    summary = self.openai_service.get_ttrpg_summary(title, notes, on_token=printer('Summary'))
+                done('summary', summary=summary)
             
             if not column or column == 'full_text':
                 logger.info("Getting full text description...")
-                research_prompt = f"""Create a detailed HTML article about the tabletop roleplaying game '{title}' that covers:
-                - Theme and setting
-                - Core mechanics and rules
-                - What makes it unique
-                - Target audience and player experience
-                
-                {"Additional context: " + notes if notes else ''}
-                
-                Format requirements:
-                - Do not include any report intro or outro, start with the first section and end with the last section
-                - Start headings with <h2> (no h1 tags)
-                - Include specific examples and details
-                - Keep the word count under 500 words"""
-                
-                # Strip any h1 tags from the beginning of the research output
-                full_text = self.research_service.get_research(
-                    game_title=title,
-                    prompt=research_prompt
-                )
-                if full_text and full_text.strip().startswith("<h1>"):
-                    full_text = full_text[full_text.find("</h1>") + 5:].strip()
+                full_text = self.research_full_text(title, notes, on_token=printer('Full text'))
+                done('full_text', full_text=full_text)
             
             if not column or column == 'category':
                 logger.info("Getting category...")
-                category = self.openai_service.get_ttrpg_category(title)
+                category = (
+                    combined.get('category')
+                    or self._prefetched.get('category', {}).get(title)
+                    or self.openai_service.get_ttrpg_category(title)
+                )
+                done('category', category=category)
             
             if not column or column == 'potential_categories':
                 logger.info("Getting potential categories...")
-                potential_categories = self.openai_service.get_potential_categories(title)
+                potential_categories = combined.get('potential_categories') or self._prefetched.get('potential_categories', {}).get(title)
+                if not potential_categories:
+                    stats = self.get_category_stats()
+                    current = split_categories(category) if category else stats.game_categories(title)
+                    potential_categories = self.openai_service.get_potential_categories(
+                        title,
+                        category_context=stats.prompt_context(current)
+                    )
+                if self._category_stats:
+                    self._category_stats.set_game(
+                        title,
+                        split_categories(category) if category else self._category_stats.game_categories(title),
+                        split_categories(potential_categories)
+                    )
+                done('potential_categories', potential_categories=potential_categories)
             
             if not column or column == 'related_games':
                 logger.info("Getting related games...")
-                if not category:
+                graph = self.get_related_graph()
+                categories = split_categories(category) if category else graph.categories(title)
+                if not categories:
                     category = self.openai_service.get_ttrpg_category(title)
+                    categories = split_categories(category)
                 
-                worksheet = self.sheets_service.get_worksheet()
-                related_games = self.openai_service.find_related_games_by_ai(worksheet, title)
-                
-                related_data = []
-                for game in related_games:
-                    blurb = self.openai_service.generate_relationship_blurb(
-                        title, 
-                        game['title'], 
-                        game['categories']
-                    )
-                    related_data.append({
-                        'title': game['title'],
-                        'imgUrl': game['imgUrl'],
-                        'page': game['page'],
-                        'blurb': blurb
-                    })
+                # Same selection as --related-graph, with this run's categories for the game
+                related_data = RelatedGamesService(self.openai_service).related_data(
+                    title, graph.related(title, categories)
+                )
                 
                 # Ensure we have exactly 3 entries
                 while len(related_data) < 3:
                     related_data.append({'title': '', 'imgUrl': '', 'page': '', 'blurb': ''})
+                done('related_games', related_data=related_data)
             
             if not column or column in ['reviewSummary', 'reviewsUrl']:
                 logger.info("Getting review summary...")
-                review_summary, reviews_url = self.generate_review_summary(title)
+                review_summary, reviews_url = self.generate_review_summary(title, on_token=printer('Review summary'))
+                done('reviewSummary', review_summary=review_summary, reviews_url=reviews_url)
             
             return summary, full_text, category, potential_categories, related_data, review_summary, reviews_url
             
@@ -121,32 +391,29 @@ class TTRPGBlurbWriter:
             logger.error(f"Error generating content for {title}: {str(e)}")
             raise
 
-    def generate_review_summary(self, title: str) -> Tuple[Optional[str], Optional[str]]:
-        """Generate a summary of reviews for a game."""
+    def generate_review_summary(
+        self,
+        title: str,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Generate a summary of reviews for a game, optionally streaming the summary text."""
         try:
             logger.info("Retrieving DriveThruRPG URL using Serper service...")
             
             # Use Serper service to get the URL
-            url = self.serper_service.get_drivethrurpg_url(title)
+            prefetched_urls = self._prefetched.get('reviews_url', {})
+            if title in prefetched_urls:
+                url = prefetched_urls.pop(title)
+            else:
+                url = self.serper_service.get_drivethrurpg_url(title)
             print("DRIVE THRU RPG URL", url)
             if not url:
                 logger.warning(f"No DriveThruRPG URL found for {title}")
                 return None, None
             
-            # Get reviews from DriveThruRPG
-            scraper = ScraperService()
-            
-            # Add delay before scraping to be respectful to the server
-            time.sleep(2)
-            
-            rawHtml = scraper.scrape_drivethrurpg_html(url)
-            if not rawHtml:
-                logger.warning(f"No HTML content found for {title} at {url}")
-                return None, None
-            
-            rawText = scraper.get_visible_text(rawHtml)
+            rawText = self.fetch_review_text(url)
             if not rawText:
-                logger.warning(f"No visible text found in HTML for {title} at {url}")
+                logger.warning(f"No visible text found for {title} at {url}")
                 return None, None
             
             reviews = self.openai_service.extract_reviews(rawText)
@@ -157,7 +424,7 @@ class TTRPGBlurbWriter:
             logger.info(f"Found {len(reviews) if isinstance(reviews, list) else 'some'} reviews")
             
             # Generate summary using OpenAI
-            summary = self.openai_service.summarize_reviews(reviews)
+            summary = self.openai_service.summarize_reviews(reviews, on_token=on_token)
             logger.info("Generated review summary")
             return summary, url
             
@@ -165,29 +432,265 @@ class TTRPGBlurbWriter:
             logger.error(f"Error generating review summary for {title}: {str(e)}")
             return None, None
 
-    def process_games(self, games: List[str], column: Optional[str] = None) -> None:
-        """Process one or more games from the spreadsheet."""
-        for i, title in enumerate(games, 1):
+    def process_games(
+        self,
+        games: List[str],
+        column: Optional[str] = None,
+        batch_size: int = 20,
+        budget: Optional[RunBudget] = None,
+        scheduler: Optional[PriorityScheduler] = None,
+        workers: int = 1
+    ) -> None:
+        """
+        Process one or more games from the spreadsheet.
+
+        Args:
+            games: Titles, in the order they should be processed
+            column: Only regenerate this column
+            batch_size: Games per batched category request and review crawl
+            budget: Stop before the game that would exceed this time or cost budget
+            scheduler: Records each game once its row is written, for staleness scoring (not in dry runs)
+            workers: Games processed concurrently; each service's adaptive
+                limiter decides how many of their calls actually run at once
+        """
+        prefetch_categories = len(games) > 1 and batch_size > 1 and column in (None, 'category', 'potential_categories')
+        fetch_reviews = column in (None, 'reviewSummary', 'reviewsUrl')
+        attempted = 0
+        finished = 0
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def process(i: int, title: str) -> None:
+            nonlocal attempted, finished
+            if stop.is_set():
+                return
+            with lock:
+                reason = budget.exhausted(finished, attempted - finished) if budget else None
+                if reason:
+                    if not stop.is_set():
+                        logger.info(f"\nStopping before {title}: {reason}; {len(games) - attempted} games left unprocessed")
+                    stop.set()
+                    return
+                attempted += 1
+
             logger.info(f"\nProcessing {i}/{len(games)}: {title}")
             try:
-                content = self.generate_game_content(title, column)
-                self.sheets_service.update_google_sheet(
-                    game_name=title,
-                    summary=content[0],
-                    full_text=content[1],
-                    category=content[2],
-                    potential_categories=content[3],
-                    related_data=content[4],
-                    review_summary=content[5],
-                    reviews_url=content[6],
-                    specific_column=column
-                )
-                time.sleep(1)  # Rate limiting
+                self.process_game(title, column)
+                # Buffered rows are marked by the writer once they are in the sheet
+                if scheduler and not self.sheet_writer and not self.dry_run:
+                    scheduler.mark_processed(title)
             except Exception as e:
                 logger.error(f"Error processing {title}: {str(e)}")
-                continue
+            finally:
+                with lock:
+                    finished += 1
+
+        if scheduler and self.sheet_writer:
+            self.sheet_writer.on_written = scheduler.mark_processed
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for start in range(0, len(games), batch_size):
+                if stop.is_set():
+                    break
+                batch = games[start:start + batch_size]
+                # Prefetch one batch at a time so a budget stop doesn't leave prefetched work unused
+                if len(games) > 1:
+                    if prefetch_categories:
+                        self.prefetch_categories(batch, column, batch_size)
+                    if fetch_reviews:
+                        self.prefetch_review_pages(batch)
+                list(executor.map(process, range(start + 1, start + len(batch) + 1), batch))
         
         logger.info("\nBatch update completed!")
+        self.log_model_usage()
+
+    def update_related_games_graph(self, titles: Optional[List[str]] = None, workers: int = 1) -> None:
+        """
+        Recompute related games for the catalog in one pass.
+
+        Loads every game once, selects neighbors from the catalog-wide
+        category similarity graph and only calls the LLM for the blurbs.
+
+        Args:
+            titles: Only update these games (neighbors still come from the whole catalog)
+            workers: Games whose blurbs are generated concurrently
+        """
+        games = self.sheets_service.get_all_games(['title', 'Category', 'imgUrl', 'page'])
+        related_service = RelatedGamesService(self.openai_service, workers)
+        for i, (title, related_data) in enumerate(related_service.iter_related_data(games, titles), 1):
+            logger.info(f"\nRelated games {i}: {title} -> {', '.join(game['title'] for game in related_data)}")
+            update = dict(game_name=title, related_data=related_data, specific_column='related_games')
+            if self.sheet_writer:
+                self.sheet_writer.submit(**update)
+            else:
+                self.sheets_service.update_google_sheet(**update, dry_run=self.dry_run)
+        self.log_model_usage()
+
+    def reprocess_snapshots(self, titles: Optional[List[str]] = None) -> None:
+        """
+        Rerun review extraction and summarization over stored pages.
+
+        Uses the latest snapshot of each game's reviewsUrl without fetching
+        anything, e.g. after fixing extraction, and writes reviewSummary.
+
+        Args:
+            titles: Only reprocess these games (defaults to every game with a snapshot)
+        """
+        records = self.sheets_service.get_records(
+            ['title', 'reviewsUrl'],
+            positions={'reviewsUrl': self.sheets_service.COLUMN_MAPPING['reviewsUrl']}
+        )
+        wanted = {normalize_title(title) for title in titles} if titles else None
+        reprocessed = 0
+        for record in records:
+            title, url = record['title'], record['reviewsUrl'].strip()
+            if not url or (wanted is not None and normalize_title(title) not in wanted):
+                continue
+            snapshot = self.snapshot_store.latest(url)
+            text = self.snapshot_text(snapshot) if snapshot else None
+            if not text:
+                continue
+
+            logger.info(f"\nReprocessing {title} from snapshot of {time.ctime(snapshot.fetched_at)}")
+            try:
+                reviews = self.openai_service.extract_reviews(text)
+                if not reviews:
+                    logger.warning(f"No reviews found in the snapshot for {title}")
+                    continue
+                summary = self.openai_service.summarize_reviews(reviews)
+            except Exception as e:
+                logger.error(f"Error reprocessing {title}: {str(e)}")
+                continue
+            update = dict(game_name=title, review_summary=summary, reviews_url=url, specific_column='reviewSummary')
+            if self.sheet_writer:
+                self.sheet_writer.submit(**update)
+            else:
+                self.sheets_service.update_google_sheet(**update, dry_run=self.dry_run)
+            reprocessed += 1
+
+        logger.info(f"\nReprocessed {reprocessed} games from snapshots")
+        self.log_model_usage()
+
+    def process_game(self, title: str, column: Optional[str] = None, stream: bool = False) -> None:
+        """
+        Generate content for one game and write it to the spreadsheet, raising on failure.
+
+        Args:
+            title: Name of the game
+            column: Only regenerate this column
+            stream: Print text as it is generated and write each column as soon
+                as it is complete, instead of writing the row at the end
+        """
+        with profile_stage('game'):
+            self._process_game(title, column, stream)
+
+    def _process_game(self, title: str, column: Optional[str], stream: bool) -> None:
+        if stream:
+            self._process_game_streaming(title, column)
+            return
+
+        content = self.generate_game_content(title, column)
+        update = dict(
+            game_name=title,
+            summary=content[0],
+            full_text=content[1],
+            category=content[2],
+            potential_categories=content[3],
+            related_data=content[4],
+            review_summary=content[5],
+            reviews_url=content[6],
+            specific_column=column
+        )
+        if self.sheet_writer:
+            self.sheet_writer.submit(**update)
+            return
+
+        updated = self.sheets_service.update_google_sheet(**update, dry_run=self.dry_run)
+        if not updated:
+            raise RuntimeError(f"Spreadsheet update failed for {title}")
+
+    def _process_game_streaming(self, title: str, column: Optional[str] = None) -> None:
+        # One writer thread keeps the writes in order (the first may add the row)
+        # while generation carries on with the next column
+        writes = []
+        with ThreadPoolExecutor(max_workers=1) as sheet_writes:
+            def write_field(field: str, values: Dict[str, Any]) -> None:
+                writes.append(sheet_writes.submit(
+                    self.sheets_service.update_google_sheet,
+                    game_name=title,
+                    specific_column=field,
+                    dry_run=self.dry_run,
+                    **values
+                ))
+
+            self.generate_game_content(title, column, stream=True, on_field=write_field)
+
+        if not all(write.result() for write in writes):
+            raise RuntimeError(f"Spreadsheet update failed for {title}")
+
+    def run_worker(
+        self,
+        queue,
+        worker_id: Optional[str] = None,
+        wait: bool = False,
+        poll_interval: float = 10.0,
+        budget: Optional[RunBudget] = None
+    ) -> None:
+        """
+        Lease, process and acknowledge work items until the queue is empty.
+
+        Args:
+            queue: Work queue from services.queue_service.open_queue
+            worker_id: Lease owner name (defaults to host:pid)
+            wait: Keep polling for new work instead of exiting when the queue is empty
+            poll_interval: Seconds between polls when waiting
+            budget: Stop leasing once this time or cost budget would be exceeded
+        """
+        if self.dry_run:
+            raise ValueError("Queue workers can't run as a dry run: processed items are acknowledged")
+        worker_id = worker_id or default_worker_id()
+        processed = 0
+        attempted = 0
+        while True:
+            reason = budget.exhausted(attempted) if budget else None
+            if reason:
+                logger.info(f"\nWorker {worker_id} stopping: {reason}")
+                break
+            item = queue.lease(worker_id)
+            if item is None:
+                if not wait:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            logger.info(f"\n[{worker_id}] Processing {item.title} (attempt {item.attempts})")
+            attempted += 1
+            try:
+                with LeaseHeartbeat(queue, item):
+                    self.process_game(item.title, item.column)
+                if queue.ack(item):
+                    processed += 1
+            except Exception as e:
+                logger.error(f"Error processing {item.title}: {str(e)}")
+                queue.fail(item, str(e))
+
+        logger.info(f"\nWorker {worker_id} finished after {processed} games")
+        self.log_model_usage()
+
+    @staticmethod
+    def log_model_usage() -> None:
+        if model_router.usage:
+            logger.info("Model calls: " + ', '.join(f"{model}={count}" for model, count in model_router.usage.items())
+                        + f" (about ${model_router.cost:.2f})")
+        coalesced = coalesced_counts()
+        if coalesced:
+            logger.info("Duplicate in-flight requests merged: " + ', '.join(
+                f"{name}={count}" for name, count in sorted(coalesced.items())
+            ))
+        if prompt_overruns:
+            logger.info("Prompts over budget: " + ', '.join(
+                f"{key}={count}" for key, count in sorted(prompt_overruns.items())
+            ))
 
 def main():
     """Main entry point for the TTRPG Blurb Writer."""
@@ -201,12 +704,39 @@ Examples:
   
   # Update only the summary for a game
   python main.py "Pathfinder" --column summary
+
+  # Show text as it is generated and write each column as soon as it is done
+  python main.py "Mothership" --stream
+
+  # Generate a single game's summary and categories with one request
+  python main.py "Mothership" --combined
   
   # Update related games for all entries
   python main.py --update-all -c related_games
 
     # Update all entries starting from row 10
   python main.py --update-all --start-row 10
+
+  # Queue every game for a related-games refresh, then run workers on any host
+  python main.py --update-all -c related_games --enqueue --queue /shared/queue.db
+  python main.py --worker --queue /shared/queue.db
+  python main.py --queue-status --queue /shared/queue.db
+
+  # Recompute related games for the whole catalog in one pass
+  python main.py --related-graph
+
+  # Spend at most two hours and $5, most important games first
+  python main.py --update-all --time-budget 7200 --cost-budget 5
+
+  # Re-extract review summaries from stored pages, without fetching
+  python main.py --reprocess-snapshots
+
+  # See where a batch run's time goes: per-stage wall/CPU time and a flame graph
+  python main.py --update-all --workers 8 --profile profile/
+  flamegraph.pl profile/all.collapsed > profile/flame.svg
+
+  # Render game pages into site/ (only pages whose content changed)
+  python main.py --export site
   
 Column Descriptions:
   summary              - A 2-3 sentence overview of the game
@@ -241,28 +771,244 @@ Column Descriptions:
         default=2,
         help='Row number to start updating from when using --update-all (default: 2)'
     )
+    parser.add_argument(
+        '--order',
+        choices=['priority', 'sheet'],
+        default='priority',
+        help='With --update-all, process games by priority (missing fields, Rank, isTopRated, premium, staleness) '
+             'or in sheet order (default: priority)'
+    )
+    parser.add_argument(
+        '--time-budget',
+        type=float,
+        metavar='SECONDS',
+        help='Stop cleanly before the game that would run past this many seconds'
+    )
+    parser.add_argument(
+        '--cost-budget',
+        type=float,
+        metavar='USD',
+        help='Stop cleanly before the game that would push estimated model spend past this amount'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Games processed concurrently with --update-all (or whose blurbs are written concurrently with '
+             '--related-graph); calls to each service are further '
+             'limited by an adaptive limit that backs off on 429s, timeouts and rising latency (default: 1)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=20,
+        help='Games per batched category request when updating several games (default: 20, 1 disables batching)'
+    )
+    
+    parser.add_argument(
+        '--related-graph',
+        action='store_true',
+        help='Recompute related games for every game (or the named games) from one catalog-wide similarity graph'
+    )
+    parser.add_argument(
+        '--taxonomy-report',
+        action='store_true',
+        help='Print category usage, gaps and overlap statistics for the directory (no LLM calls) and exit'
+    )
+    parser.add_argument(
+        '--export',
+        metavar='DIR',
+        help='Render a static HTML page for every game into DIR (only pages whose content changed) and exit'
+    )
+    parser.add_argument(
+        '--export-workers',
+        type=int,
+        help='Processes used to render pages with --export (default: one per CPU)'
+    )
+    parser.add_argument(
+        '--full-rebuild',
+        action='store_true',
+        help='With --export, re-render every page even if its content is unchanged'
+    )
+    parser.add_argument(
+        '--combined',
+        action='store_true',
+        help='When updating all columns, generate summary, category and potential categories in one request per '
+             'game on the fast model; fields that fail validation are regenerated on their own. Batch runs already '
+             'prefetch categories, so this mostly helps single-game runs'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='For a single game, print text as it is generated and write each column as soon as it is complete'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Generate content and print the cells that would change without writing to the sheet; with --enqueue, list what would be queued'
+    )
+    parser.add_argument(
+        '--sync-writes',
+        action='store_true',
+        help='With --update-all, write each game to the sheet before starting the next instead of buffering writes'
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='DIR',
+        help='Time each stage (wall and CPU), sample stacks and write per-stage profiles '
+             'and a flame graph input (all.collapsed) to DIR; cheap enough for production runs'
+    )
+    parser.add_argument(
+        '--profile-deterministic',
+        action='store_true',
+        help='With --profile, also trace every call with cProfile and write a .prof per stage (slow)'
+    )
+    parser.add_argument(
+        '--fetcher',
+        choices=['crawl4ai', 'selenium'],
+        default='crawl4ai',
+        help='How DriveThruRPG review pages are rendered (default: crawl4ai, pages in a batch are crawled concurrently)'
+    )
+    parser.add_argument(
+        '--snapshot-dir',
+        default='snapshots',
+        help='Where fetched DriveThruRPG pages are stored, compressed (default: snapshots)'
+    )
+    parser.add_argument(
+        '--reprocess-snapshots',
+        action='store_true',
+        help='Rerun review extraction and summaries over stored pages (all, or the named game) without fetching'
+    )
+    parser.add_argument(
+        '--queue',
+        default='work_queue.db',
+        help='Work queue: a SQLite file on a shared volume or a redis:// URL (default: work_queue.db)'
+    )
+    parser.add_argument(
+        '--enqueue',
+        action='store_true',
+        help='Add the selected games to the work queue instead of processing them'
+    )
+    parser.add_argument(
+        '--worker',
+        action='store_true',
+        help='Process games from the work queue until it is empty'
+    )
+    parser.add_argument(
+        '--wait',
+        action='store_true',
+        help='With --worker, keep polling for new work instead of exiting'
+    )
+    parser.add_argument(
+        '--lease-seconds',
+        type=float,
+        default=900,
+        help='How long a worker owns a queued game before it is retried elsewhere (default: 900)'
+    )
+    parser.add_argument(
+        '--queue-status',
+        action='store_true',
+        help='Show work queue progress and exit'
+    )
     
     args = parser.parse_args()
+    if args.stream and (args.update_all or args.worker or args.enqueue or args.related_graph or args.reprocess_snapshots):
+        parser.error('--stream only applies when processing a single game')
+    if args.profile_deterministic and not args.profile:
+        parser.error('--profile-deterministic requires --profile')
+    if args.dry_run and args.worker:
+        # A worker acks each item it processes, which a dry run must not do
+        parser.error('--dry-run cannot be used with --worker')
+    if args.profile:
+        start_profiling(args.profile, deterministic=args.profile_deterministic)
 
+    writer = None
     try:
-        writer = TTRPGBlurbWriter()
-        
-        if args.update_all:
+        if args.queue_status:
+            counts = open_queue(args.queue).status()
+            logger.info(', '.join(f"{status}: {count}" for status, count in counts.items()))
+            return 0
+
+        if args.export:
+            pages = load_pages(SheetsService)
+            counts = ExportService(args.export, args.export_workers).export(pages, args.full_rebuild)
+            logger.info(f"Exported to {args.export}: {counts['written']} written, "
+                        f"{counts['unchanged']} unchanged, {counts['removed']} removed")
+            return 0
+
+        if args.taxonomy_report:
+            sheets_service = SheetsService()
+            genres, themes, mechanics = sheets_service.categories
+            stats = CategoryStats.from_rows(
+                sheets_service.get_all_games(['title', 'Category', 'Potential Category']),
+                genres + themes + mechanics
+            )
+            print(stats.format_report())
+            return 0
+
+        # Queue workers write synchronously so an item is only acked once it is in the sheet
+        write_behind = (args.update_all or args.related_graph or args.reprocess_snapshots) and not args.enqueue and not args.worker and not args.sync_writes
+        writer = TTRPGBlurbWriter(
+            fetcher=args.fetcher,
+            write_behind=write_behind,
+            dry_run=args.dry_run,
+            snapshot_dir=args.snapshot_dir,
+            combined=args.combined
+        )
+        budget = RunBudget(args.time_budget, args.cost_budget) if args.time_budget or args.cost_budget else None
+
+        if args.reprocess_snapshots:
+            writer.reprocess_snapshots([' '.join(args.game_name)] if args.game_name else None)
+        elif args.related_graph:
+            writer.update_related_games_graph([' '.join(args.game_name)] if args.game_name else None, args.workers)
+        elif args.worker:
+            writer.run_worker(open_queue(args.queue, args.lease_seconds), wait=args.wait, budget=budget)
+        elif args.update_all:
             worksheet = writer.sheets_service.get_worksheet()
             titles = [t for t in worksheet.col_values(1)[args.start_row-1:] if t.strip()]
-            writer.process_games(titles, args.column)
+            scheduler = None
+            if args.order == 'priority':
+                scheduler = PriorityScheduler(args.column)
+                titles = scheduler.order(titles, scheduler.load_records(writer.sheets_service))
+                logger.info(f"Scheduled {len(titles)} games by priority")
+            if args.enqueue and args.dry_run:
+                logger.info(f"Would queue {len(titles)} games in {args.queue}")
+            elif args.enqueue:
+                # Queues lease new items in insertion order, so priority order carries over
+                added = open_queue(args.queue).enqueue(titles, args.column)
+                logger.info(f"Queued {added} of {len(titles)} games in {args.queue}")
+            else:
+                writer.process_games(titles, args.column, args.batch_size, budget, scheduler, args.workers)
         else:
             ttrpg_name = ' '.join(args.game_name) if args.game_name else input("Enter the name of the TTRPG: ").strip()
             if not ttrpg_name:
                 logger.error("Please provide a valid name.")
                 return
 
-            writer.process_games([ttrpg_name], args.column)
-            logger.info("Successfully uploaded the data to Google Sheet!")
+            if args.enqueue:
+                if args.dry_run:
+                    logger.info(f"Would queue {ttrpg_name} in {args.queue}")
+                    return 0
+                open_queue(args.queue).enqueue([ttrpg_name], args.column)
+                logger.info(f"Queued {ttrpg_name} in {args.queue}")
+                return 0
+
+            if args.stream:
+                writer.process_game(ttrpg_name, args.column, stream=True)
+                writer.log_model_usage()
+            else:
+                writer.process_games([ttrpg_name], args.column)
+            if not args.dry_run:
+                logger.info("Successfully uploaded the data to Google Sheet!")
             
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
         return 1
+    finally:
+        if writer:
+            writer.close()
+        # After close() so the final write-behind flush is included
+        stop_profiling()
     
     return 0
 
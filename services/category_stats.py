@@ -0,0 +1,260 @@
+import threading
+from typing import Any, Dict, Iterable, List, Set, Tuple
+import numpy as np
+from services.related_games_service import split_categories
+from utils.title_index import normalize_title
+
+CATEGORY = 'category'
+POTENTIAL = 'potential'
+
+
+class CategoryStats:
+    """
+    Category frequency and co-occurrence statistics for the directory.
+
+    Categories (from the Category column) and suggested tags (from Potential
+    Category) share one vocabulary. `frequency[i]` counts games using term i
+    and `cooccurrence[i, j]` counts games using both i and j. Games are
+    tracked by normalized title so a changed row can be replaced
+    incrementally without rebuilding the matrices.
+
+    Safe to share between worker threads: updates and queries hold one lock,
+    since growing the vocabulary replaces the arrays.
+    """
+
+    def __init__(self, taxonomy: Iterable[str] = ()):
+        self._lock = threading.RLock()
+        self._terms: List[Tuple[str, str]] = []
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._labels: List[str] = []
+        self.frequency = np.zeros(0, dtype=np.int32)
+        self.cooccurrence = np.zeros((0, 0), dtype=np.int32)
+        self._games: Dict[str, np.ndarray] = {}
+        for name in taxonomy:
+            self._term_index(CATEGORY, name)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], taxonomy: Iterable[str] = ()) -> 'CategoryStats':
+        """Build statistics from sheet rows with 'title', 'Category' and 'Potential Category'."""
+        stats = cls(taxonomy)
+        for row in rows:
+            stats.set_game(
+                str(row.get('title', '')),
+                split_categories(row.get('Category')),
+                split_categories(row.get('Potential Category'))
+            )
+        return stats
+
+    @staticmethod
+    def _key(kind: str, name: str) -> Tuple[str, str]:
+        # Suggested tags vary in capitalization; canonical categories don't
+        return (kind, name.strip().lower() if kind == POTENTIAL else name.strip())
+
+    def _term_index(self, kind: str, name: str) -> int:
+        key = self._key(kind, name)
+        if key not in self._index:
+            index = len(self._terms)
+            self._index[key] = index
+            self._terms.append(key)
+            self._labels.append(name.strip())
+            if index >= len(self.frequency):
+                self._grow(max(16, 2 * len(self.frequency)))
+        return self._index[key]
+
+    def _grow(self, size: int) -> None:
+        frequency = np.zeros(size, dtype=np.int32)
+        frequency[:len(self.frequency)] = self.frequency
+        cooccurrence = np.zeros((size, size), dtype=np.int32)
+        old = len(self.cooccurrence)
+        cooccurrence[:old, :old] = self.cooccurrence
+        self.frequency, self.cooccurrence = frequency, cooccurrence
+
+    def _apply(self, indices: np.ndarray, sign: int) -> None:
+        self.frequency[indices] += sign
+        self.cooccurrence[np.ix_(indices, indices)] += sign
+
+    def set_game(self, title: str, categories: List[str], potential: List[str] = ()) -> None:
+        """Add or replace one game's categories and suggested tags."""
+        key = normalize_title(title)
+        if not key:
+            return
+        with self._lock:
+            self._set_game(key, categories, potential)
+
+    def _set_game(self, key: str, categories: List[str], potential: List[str]) -> None:
+        indices = sorted(
+            {self._term_index(CATEGORY, name) for name in categories}
+            | {self._term_index(POTENTIAL, name) for name in potential}
+        )
+        indices = np.array(indices, dtype=np.int64)
+        previous = self._games.get(key)
+        if previous is not None:
+            self._apply(previous, -1)
+        self._apply(indices, 1)
+        self._games[key] = indices
+
+    def remove_game(self, title: str) -> None:
+        with self._lock:
+            previous = self._games.pop(normalize_title(title), None)
+            if previous is not None:
+                self._apply(previous, -1)
+
+    def game_categories(self, title: str) -> List[str]:
+        """Categories currently recorded for a game."""
+        with self._lock:
+            indices = self._games.get(normalize_title(title), [])
+            return [self._labels[i] for i in indices if self._terms[i][0] == CATEGORY]
+
+    @property
+    def game_count(self) -> int:
+        return len(self._games)
+
+    def _kind_mask(self, kind: str) -> np.ndarray:
+        mask = np.zeros(len(self.frequency), dtype=bool)
+        mask[[i for i, (term_kind, _) in enumerate(self._terms) if term_kind == kind]] = True
+        return mask
+
+    def _related_scores(self, categories: List[str]) -> np.ndarray:
+        """Average P(term | category) over the given categories."""
+        indices = [self._index[key] for key in (self._key(CATEGORY, name) for name in categories) if key in self._index]
+        indices = [i for i in indices if self.frequency[i] > 0]
+        if not indices:
+            return self.frequency / max(1, self.game_count)
+        conditional = self.cooccurrence[indices] / self.frequency[indices][:, None]
+        return conditional.mean(axis=0)
+
+    def _top(self, scores: np.ndarray, mask: np.ndarray, exclude: Set[int], limit: int) -> List[Tuple[str, float]]:
+        scores = np.where(mask, scores, -1.0)
+        scores[list(exclude)] = -1.0
+        order = np.argsort(-scores, kind='stable')[:limit]
+        return [(self._labels[i], float(scores[i])) for i in order if scores[i] > 0]
+
+    def candidate_categories(self, categories: List[str], limit: int = 25) -> List[str]:
+        """Existing categories most often used alongside `categories`."""
+        with self._lock:
+            exclude = {self._index[self._key(CATEGORY, name)] for name in categories if self._key(CATEGORY, name) in self._index}
+            scores = self._related_scores(categories)
+            return [name for name, _ in self._top(scores, self._kind_mask(CATEGORY), exclude, limit)]
+
+    def candidate_tags(self, categories: List[str], limit: int = 10) -> List[str]:
+        """Tags already suggested for games that share `categories`, most relevant first."""
+        with self._lock:
+            scores = self._related_scores(categories)
+            return [name for name, _ in self._top(scores, self._kind_mask(POTENTIAL), set(), limit)]
+
+    def prompt_context(self, categories: List[str], limit: int = 25) -> str:
+        """
+        Context for a potential-categories prompt, sent instead of the full category list.
+
+        Lists the game's categories, the existing categories most used with
+        them (the likeliest duplicates of a new suggestion) and tags already
+        suggested for similar games (so suggestions converge on shared names).
+        Suggestions that still repeat an existing category are filtered out
+        after the call.
+        """
+        lines = []
+        if categories:
+            lines.append(f"Current categories: {'; '.join(categories)}")
+        related = self.candidate_categories(categories, limit)
+        if related:
+            lines.append(f"Existing categories used with similar games: {'; '.join(related)}")
+        tags = self.candidate_tags(categories)
+        if tags:
+            lines.append(f"Tags already suggested for similar games (reuse one if it fits): {'; '.join(tags)}")
+        return '\n'.join(lines)
+
+    def batch_prompt_context(
+        self,
+        games: Dict[str, List[str]],
+        limit: int = 10,
+        tag_limit: int = 2,
+        max_shared: int = 30
+    ) -> Tuple[str, Dict[str, str]]:
+        """
+        prompt_context for a batch of games, kept smaller than the full category list.
+
+        The games' own categories and the existing categories used with them
+        are merged into one shortlist sent once per batch, most used first;
+        each game only gets the tags already suggested for similar games,
+        shown after its title.
+
+        Args:
+            games: Each game's current categories, by title
+            limit: Related categories taken per game
+            tag_limit: Suggested tags listed per game
+            max_shared: Size cap of the merged shortlist
+
+        Returns:
+            Tuple of (shared context, per-game context by title)
+        """
+        counts: Dict[str, int] = {}
+        per_game = {}
+        for title, categories in games.items():
+            for name in list(categories) + self.candidate_categories(categories, limit):
+                counts[name] = counts.get(name, 0) + 1
+            tags = self.candidate_tags(categories, tag_limit)
+            per_game[title] = '; '.join(tags)
+        shortlist = sorted(counts, key=lambda name: -counts[name])[:max_shared]
+        lines = []
+        if shortlist:
+            lines.append(f"Existing categories of and around these games: {'; '.join(shortlist)}")
+        if any(per_game.values()):
+            lines.append("In brackets after a game: tags already suggested for similar games (reuse one if it fits)")
+        return '\n'.join(lines), per_game
+
+    def gap_report(self, min_uses: int = 2, promote_after: int = 3, overlap: float = 0.8) -> Dict[str, List]:
+        """
+        Catalog-wide taxonomy analysis without any LLM calls.
+
+        Returns:
+            Dict with:
+              unused: categories no game uses
+              rare: (category, count) used by fewer than `min_uses` games
+              promote: (tag, count) suggested for at least `promote_after` games
+              redundant: (category, category, jaccard) pairs whose games overlap by `overlap` or more
+        """
+        with self._lock:
+            return self._gap_report(min_uses, promote_after, overlap)
+
+    def _gap_report(self, min_uses: int, promote_after: int, overlap: float) -> Dict[str, List]:
+        size = len(self._terms)
+        frequency = self.frequency[:size]
+        categories = self._kind_mask(CATEGORY)[:size]
+        potential = ~categories
+
+        unused = [self._labels[i] for i in np.flatnonzero(categories & (frequency == 0))]
+        rare = [(self._labels[i], int(frequency[i])) for i in np.flatnonzero(categories & (frequency > 0) & (frequency < min_uses))]
+        promote_indices = np.flatnonzero(potential & (frequency >= promote_after))
+        promote = sorted(((self._labels[i], int(frequency[i])) for i in promote_indices), key=lambda item: -item[1])
+
+        used = np.flatnonzero(categories & (frequency >= min_uses))
+        both = self.cooccurrence[np.ix_(used, used)].astype(np.float64)
+        either = frequency[used][:, None] + frequency[used][None, :] - both
+        jaccard = np.divide(both, either, out=np.zeros_like(both), where=either > 0)
+        rows, cols = np.nonzero(np.triu(jaccard >= overlap, k=1))
+        redundant = sorted(
+            ((self._labels[used[a]], self._labels[used[b]], float(jaccard[a, b])) for a, b in zip(rows, cols)),
+            key=lambda item: -item[2]
+        )
+        return {'unused': unused, 'rare': rare, 'promote': promote, 'redundant': redundant}
+
+    def format_report(self, top: int = 20) -> str:
+        """Human-readable taxonomy report."""
+        with self._lock:
+            size = len(self._terms)
+            categories = self._kind_mask(CATEGORY)[:size]
+            frequency = self.frequency[:size].copy()
+            labels = list(self._labels)
+            most_used = [i for i in np.argsort(-frequency, kind='stable') if categories[i] and frequency[i] > 0][:top]
+            gaps = self.gap_report()
+
+        def section(title, items):
+            return [f"\n{title}:"] + ([f"  {item}" for item in items] or ["  (none)"])
+
+        lines = [f"Taxonomy report for {self.game_count} games"]
+        lines += section("Most used categories", [f"{labels[i]}: {int(frequency[i])}" for i in most_used])
+        lines += section("Unused categories", gaps['unused'])
+        lines += section("Rarely used categories", [f"{name}: {count}" for name, count in gaps['rare']])
+        lines += section("Suggested tags worth promoting", [f"{name}: {count}" for name, count in gaps['promote']])
+        lines += section("Overlapping categories", [f"{a} / {b}: {score:.2f}" for a, b, score in gaps['redundant']])
+        return '\n'.join(lines)
@@ -1,40 +1,132 @@
 import asyncio
+import logging
+import sys
+import threading
+from typing import Dict, List, Optional
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.content_filter_strategy import PruningContentFilter
 from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+from utils.profiling import profile_stage
 
-async def crawl_website(url):
-    # Configure the browser settings
-    browser_config = BrowserConfig(
-        headless=True,  # Run in headless mode
-        verbose=True,   # Enable verbose logging
-    )
-    
-    # Configure the crawler run settings
-    run_config = CrawlerRunConfig(
-        cache_mode=CacheMode.ENABLED,
-        excluded_tags=['nav', 'footer', 'aside'],
+logger = logging.getLogger(__name__)
+
+# Expand the DriveThruRPG discussion list before the page is captured
+EXPAND_REVIEWS_JS = """
+const button = [...document.querySelectorAll('button')]
+    .find(b => b.textContent.includes('View more discussions'));
+if (button) { button.scrollIntoView({block: 'center'}); button.click(); }
+"""
+
+
+class CrawlerService:
+    """
+    Fetches pages as pruned markdown with one long-lived crawl4ai browser.
+
+    The browser is started on first use and reused for every fetch until
+    close() is called. Batches are crawled concurrently with arun_many.
+    crawl4ai's own cache is bypassed by default: the snapshot store already
+    decides (by revalidating) when a page needs fetching, and a cached copy
+    would hide the change that made it fetch.
+    """
+
+    def __init__(self, concurrency: int = 5, cache_mode: CacheMode = CacheMode.BYPASS, verbose: bool = False):
+        self.browser_config = BrowserConfig(
+            headless=True,
+            verbose=verbose,
+        )
+        self.run_config = CrawlerRunConfig(
+            cache_mode=cache_mode,
+            excluded_tags=['nav', 'footer', 'aside'],
             remove_overlay_elements=True,
+            js_code=EXPAND_REVIEWS_JS,
+            delay_before_return_html=2.0,
+            semaphore_count=concurrency,
             markdown_generator=DefaultMarkdownGenerator(
                 content_filter=PruningContentFilter(threshold=0.48, threshold_type="fixed", min_word_threshold=0),
                 options={
                     "ignore_links": True
                 }
             ),
-    )
-    
-    # Use the AsyncWebCrawler to perform the crawl
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        result = await crawler.arun(
-            url=url,
-            config=run_config
         )
-        return result.markdown
+        self._crawler: Optional[AsyncWebCrawler] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # The loop can only run one batch at a time; concurrent workers take turns
+        self._lock = threading.Lock()
+
+    async def _get_crawler(self) -> AsyncWebCrawler:
+        if self._crawler is None:
+            self._crawler = AsyncWebCrawler(config=self.browser_config)
+            await self._crawler.start()
+        return self._crawler
+
+    @staticmethod
+    def _pruned_markdown(result) -> Optional[str]:
+        """Prefer the content-filtered markdown, falling back to the full markdown."""
+        if not result.success:
+            logger.warning(f"Failed to crawl {result.url}: {result.error_message}")
+            return None
+        markdown = result.markdown
+        pruned = getattr(markdown, 'fit_markdown', None) or getattr(result, 'fit_markdown', None)
+        return pruned or (str(markdown) if markdown else None)
+
+    async def afetch_many(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        """Crawl several URLs concurrently, returning pruned markdown per URL (None on failure)."""
+        if not urls:
+            return {}
+        crawler = await self._get_crawler()
+        results = await crawler.arun_many(urls=list(urls), config=self.run_config)
+        pages = {url: None for url in urls}
+        for result in results:
+            pages[result.url] = self._pruned_markdown(result)
+        return pages
+
+    async def aclose(self) -> None:
+        if self._crawler is not None:
+            await self._crawler.close()
+            self._crawler = None
+
+    def _run(self, coroutine):
+        # A dedicated loop keeps the browser alive between synchronous calls
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+            return self._loop.run_until_complete(coroutine)
+
+    @profile_stage('crawl')
+    def fetch_many(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        """Synchronous wrapper around afetch_many for the pipeline."""
+        return self._run(self.afetch_many(urls))
+
+    def fetch(self, url: str) -> Optional[str]:
+        """Crawl a single URL and return its pruned markdown."""
+        return self.fetch_many([url]).get(url)
+
+    def close(self) -> None:
+        """Shut down the browser and the event loop."""
+        with self._lock:
+            if self._loop is None:
+                return
+            self._loop.run_until_complete(self.aclose())
+            self._loop.close()
+            self._loop = None
+
+
+async def crawl_website(url):
+    """Crawl a single URL and return its markdown."""
+    service = CrawlerService(verbose=True)
+    try:
+        return (await service.afetch_many([url])).get(url)
+    finally:
+        await service.aclose()
 
 def main():
-    url = "https://www.example.com"  # Replace with the target URL
-    result = asyncio.run(crawl_website(url))
-    print(result)
+    urls = sys.argv[1:] or ["https://www.example.com"]
+    service = CrawlerService(verbose=True)
+    try:
+        for url, markdown in service.fetch_many(urls).items():
+            print(f"# {url}\n\n{markdown}\n")
+    finally:
+        service.close()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
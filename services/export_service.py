@@ -0,0 +1,196 @@
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from services.related_games_service import split_categories
+
+logger = logging.getLogger(__name__)
+
+# Bump when the page template changes so every page is re-rendered
+TEMPLATE_VERSION = 2
+
+MANIFEST_FILE = '.manifest.json'
+
+
+def page_inputs(record: Any, related_columns: List[str]) -> Dict[str, Any]:
+    """Collect everything a game page is rendered from."""
+    title = str(record.get('title', '')).strip()
+    page = str(record.get('page', '') or '').strip().lower() or title.lower()
+    related = []
+    for i in range(0, len(related_columns), 4):
+        fields = [str(record.get(name, '') or '') for name in related_columns[i:i + 4]]
+        if fields[0].strip():
+            related.append(dict(zip(('title', 'imgUrl', 'page', 'blurb'), fields)))
+    return {
+        'title': title,
+        'page': re.sub(r'[^a-z0-9_-]', '', page),  # also keeps page names from escaping output_dir
+        'url': str(record.get('url', '') or ''),
+        'imgUrl': str(record.get('imgUrl', '') or ''),
+        'summary': str(record.get('summary', '') or ''),
+        'fullText': str(record.get('fullText', '') or ''),
+        'categories': split_categories(record.get('Category')),
+        'reviewSummary': str(record.get('reviewSummary', '') or ''),
+        'reviewsUrl': str(record.get('reviewsUrl', '') or ''),
+        'related': related,
+    }
+
+
+def load_pages(sheets_service) -> List[Dict[str, Any]]:
+    """Read only the columns pages are built from and collect each game's page inputs."""
+    mapping = sheets_service.COLUMN_MAPPING
+    positions = {
+        'title': 1,
+        'url': 2,
+        'imgUrl': 3,
+        'page': 4,
+        'reviewsUrl': mapping['reviewsUrl'],
+        'reviewSummary': mapping['reviewSummary'],
+        'summary': mapping['summary'],
+        'fullText': mapping['full_text'],
+        'Category': mapping['category'],
+    }
+    related_columns = []
+    for i, col in enumerate(mapping['related_games']):
+        name = f"related_{i // 4 + 1}_{('title', 'imgUrl', 'page', 'blurb')[i % 4]}"
+        positions[name] = col
+        related_columns.append(name)
+    records = sheets_service.get_records(list(positions), positions=positions)
+    return [page_inputs(record, related_columns) for record in records]
+
+
+def content_hash(inputs: Dict[str, Any]) -> str:
+    payload = json.dumps({'template': TEMPLATE_VERSION, 'inputs': inputs}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_page(inputs: Dict[str, Any]) -> str:
+    """
+    Render one game page as an HTML fragment, in the style of the pages in blurbs/.
+
+    fullText and related-game blurbs are generated HTML and are included
+    as-is; every other field is escaped. Like the generated content, the
+    fragment has no <h1>: the site page it is embedded in owns the title.
+    """
+    escape = html.escape
+    parts = []
+    if inputs['imgUrl']:
+        parts.append(f'<img src="{escape(inputs["imgUrl"])}" alt="{escape(inputs["title"])}">')
+    if inputs['summary']:
+        parts.append(f"<p>{escape(inputs['summary'])}</p>")
+    if inputs['fullText']:
+        parts.append(inputs['fullText'].strip())
+    if inputs['categories']:
+        items = '\n'.join(f"    <li>{escape(category)}</li>" for category in inputs['categories'])
+        parts.append(f"<h2>Categories</h2>\n\n<ul>\n{items}\n</ul>")
+    if inputs['reviewSummary']:
+        link = f' <a href="{escape(inputs["reviewsUrl"])}">Read the reviews</a>' if inputs['reviewsUrl'] else ''
+        parts.append(f"<h2>What Players Say</h2>\n\n<p>{escape(inputs['reviewSummary'])}{link}</p>")
+    if inputs['related']:
+        items = '\n'.join(
+            f'    <li><strong><a href="/{escape(game["page"])}">{escape(game["title"])}</a></strong>: {game["blurb"]}</li>'
+            for game in inputs['related']
+        )
+        parts.append(f"<h2>Related Games</h2>\n\n<ul>\n{items}\n</ul>")
+    if inputs['url']:
+        parts.append(f'<p><a href="{escape(inputs["url"])}">Get {escape(inputs["title"])}</a></p>')
+    return '\n\n'.join(parts) + '\n'
+
+
+def _write_page(job: Tuple[str, Dict[str, Any]]) -> str:
+    """Render a page and replace its file atomically; runs in a worker process."""
+    path, inputs = job
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render_page(inputs))
+    os.replace(tmp_path, path)
+    return path
+
+
+class ExportService:
+    """
+    Incremental static export of game pages.
+
+    Each page's inputs are hashed and recorded in a manifest in the output
+    directory; on later runs only pages whose hash changed (or whose file is
+    missing) are rendered, in parallel across processes. Pages for games that
+    are no longer in the directory are removed. Games that share a page name
+    get numbered pages (name-2, name-3, ...) in directory order.
+    """
+
+    def __init__(self, output_dir: str = 'export', workers: Optional[int] = None):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+
+    def _load_manifest(self) -> Dict[str, str]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: Dict[str, str]) -> None:
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=0, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def export(self, pages: Iterable[Dict[str, Any]], full_rebuild: bool = False) -> Dict[str, int]:
+        """
+        Write pages whose inputs changed since the last export.
+
+        Args:
+            pages: Page inputs from page_inputs()
+            full_rebuild: Render every page, whether or not its inputs changed
+
+        Returns:
+            Counts of written, unchanged and removed pages
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        # Read even for a full rebuild: it lists the pages of removed games to delete
+        previous = self._load_manifest()
+        manifest: Dict[str, str] = {}
+        jobs = []
+        pages = list(pages)
+        taken = {inputs['page'] for inputs in pages}
+        for inputs in pages:
+            slug = inputs['page']
+            if not slug:
+                logger.warning(f"Skipping {inputs['title'] or 'a row without a title'}: it has no page name")
+                continue
+            if slug in manifest:
+                # Another game has the same page name; give this one the next free numbered name
+                n = 2
+                while f"{slug}-{n}" in taken:
+                    n += 1
+                logger.warning(f"{inputs['title']}: page name {slug} is already used, exporting as {slug}-{n}")
+                slug = f"{slug}-{n}"
+                taken.add(slug)
+            digest = content_hash(inputs)
+            manifest[slug] = digest
+            path = os.path.join(self.output_dir, f"{slug}.html")
+            if full_rebuild or previous.get(slug) != digest or not os.path.exists(path):
+                jobs.append((path, inputs))
+
+        if jobs:
+            logger.info(f"Rendering {len(jobs)} of {len(manifest)} pages...")
+            if len(jobs) == 1 or self.workers == 1:
+                for job in jobs:
+                    _write_page(job)
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    chunksize = max(1, len(jobs) // ((self.workers or os.cpu_count() or 1) * 4))
+                    list(executor.map(_write_page, jobs, chunksize=chunksize))
+
+        removed = 0
+        for slug in set(previous) - set(manifest):
+            path = os.path.join(self.output_dir, f"{slug}.html")
+            if os.path.exists(path):
+                os.remove(path)
+                removed += 1
+
+        self._save_manifest(manifest)
+        return {'written': len(jobs), 'unchanged': len(manifest) - len(jobs), 'removed': removed}
@@ -0,0 +1,135 @@
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Union
+from config.constants import openai_client, MODEL_ROUTES, MODEL_PRICES, GPT_MODEL
+
+logger = logging.getLogger(__name__)
+
+Messages = Union[str, List[Dict[str, str]]]
+
+
+def restart_stream(on_token: Optional[Callable[[str], None]]) -> None:
+    """
+    Tell a streaming callback that a new attempt is starting.
+
+    Retries and escalations stream the whole text again; a callback with a
+    `restart` attribute (see main.TTRPGBlurbWriter._token_printer) uses it
+    to mark where the new attempt begins.
+    """
+    restart = getattr(on_token, 'restart', None)
+    if restart:
+        restart()
+
+
+class ModelRouter:
+    """Routes each LLM task to a model tier, escalating only when validation fails."""
+
+    def __init__(self, client=openai_client, routes: Optional[Dict[str, Dict]] = None):
+        self.client = client
+        self.routes = routes or MODEL_ROUTES
+        self.usage = Counter()
+        # Estimated spend in USD, from reported token usage and MODEL_PRICES
+        self.cost = 0.0
+        self._lock = threading.Lock()
+
+    def get_route(self, task: str) -> Dict:
+        """Get the route for a task, defaulting to the large model."""
+        return self.routes.get(task, {'model': GPT_MODEL, 'max_tokens': 1000, 'escalate_to': None})
+
+    def _record_usage(self, model: str, tokens) -> None:
+        input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        with self._lock:
+            self.usage[model] += 1
+            if tokens:
+                self.cost += (tokens.prompt_tokens * input_price + tokens.completion_tokens * output_price) / 1_000_000
+
+    def _create(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        on_token: Optional[Callable[[str], None]] = None,
+        **kwargs
+    ) -> str:
+        if on_token:
+            return self._create_streaming(model, messages, max_tokens, on_token, **kwargs)
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        self._record_usage(model, getattr(response, 'usage', None))
+        return (response.choices[0].message.content or '').strip()
+
+    def _create_streaming(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        on_token: Callable[[str], None],
+        **kwargs
+    ) -> str:
+        """Stream the completion, passing each content delta to on_token as it arrives."""
+        restart_stream(on_token)
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            stream=True,
+            # The final chunk then carries token usage for cost tracking
+            stream_options={'include_usage': True},
+            **kwargs
+        )
+        parts = []
+        tokens = None
+        for chunk in stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    on_token(delta)
+            tokens = getattr(chunk, 'usage', None) or tokens
+        self._record_usage(model, tokens)
+        return ''.join(parts).strip()
+
+    def complete(
+        self,
+        task: str,
+        messages: Messages,
+        validator: Optional[Callable[[str], bool]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        **kwargs
+    ) -> str:
+        """
+        Run a chat completion for a task using its routed model.
+
+        Args:
+            task: Task name from MODEL_ROUTES
+            messages: A prompt string or a list of chat messages
+            validator: Optional check on the output; a failure escalates to the larger model
+            on_token: Stream the response, calling this with each piece of text as it
+                arrives (an escalated retry streams again from the start)
+            **kwargs: Extra arguments passed to chat.completions.create
+
+        Returns:
+            The stripped response content
+        """
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+
+        route = self.get_route(task)
+        max_tokens = kwargs.pop('max_tokens', route['max_tokens'])
+        content = self._create(route['model'], messages, max_tokens, on_token, **kwargs)
+
+        escalate_to = route.get('escalate_to')
+        if validator and escalate_to and escalate_to != route['model'] and not validator(content):
+            logger.info(f"{task} output from {route['model']} failed validation, escalating to {escalate_to}")
+            content = self._create(escalate_to, messages, max_tokens, on_token, **kwargs)
+
+        return content
+
+
+# Shared router so usage counts cover the whole run
+model_router = ModelRouter()
@@ -1,6 +1,38 @@
-from config.constants import openai_client, GPT_MODEL
-from utils.decorators import retry_with_backoff
+import json
+import logging
+from typing import Dict, List, Optional, Sequence
+from utils.retry_policy import with_retry_policy
 from services.sheets_service import SheetsService
+from services.model_router import model_router
+from services.prompt_builder import PromptBudget
+from utils.title_index import normalize_title
+from utils.concurrency import single_flight
+
+logger = logging.getLogger(__name__)
+
+
+def _is_blurb(text):
+    """A blurb is non-empty prose of at most a few sentences."""
+    return bool(text) and text.count('. ') <= 5 and '<h' not in text
+
+
+def _is_html(text):
+    return bool(text) and '<' in text and '>' in text
+
+
+# Fields get_game_content_combined can generate together. The full text stays
+# with the research service: writing it on the model costs more than it saves.
+COMBINED_FIELDS = ('summary', 'category', 'potential_categories')
+
+# What the combined request asks for in each field, in response order
+COMBINED_INSTRUCTIONS = {
+    'summary': '"summary": a short, engaging 2-3 sentence blurb covering its theme, key features and what makes it unique, '
+               'written as an explanation of the game rather than an advertisement',
+    'category': '"category": a list of 4-7 categories from the lists above, with at least one genre, one theme and one '
+                'mechanic/system, most important first',
+    'potential_categories': '"potential_categories": a list of 2-3 new, specific categories or tags for this game that '
+                            'are not in the lists above',
+}
 
 class OpenAIService:
     def __init__(self):
@@ -9,8 +41,10 @@ class OpenAIService:
         self.categories = self.genres + self.themes + self.mechanics
 
     @staticmethod
-    @retry_with_backoff
-    def get_ttrpg_summary(game_name, notes=None):
+    @with_retry_policy('openai')
+    def get_ttrpg_summary(game_name, notes=None, on_token=None):
+        budget = PromptBudget('summary')
+        notes = budget.fit('notes', notes)
         notes_text = f"\nAdditional context about the game:\n{notes}" if notes else ""
         
         prompt = f"""Write a short, engaging blurb about the tabletop roleplaying game '{game_name}'. 
@@ -26,18 +60,13 @@ class OpenAIService:
 
     Please write a similar style blurb for: {game_name}"""
 
-        response = openai_client.chat.completions.create(
-            model=GPT_MODEL,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=200
-        )
-        return response.choices[0].message.content.strip()
+        return model_router.complete('summary', budget.check(prompt), validator=_is_blurb, on_token=on_token)
 
     @staticmethod
-    @retry_with_backoff
-    def get_ttrpg_full_text(game_name, notes=None):
+    @with_retry_policy('openai')
+    def get_ttrpg_full_text(game_name, notes=None, on_token=None):
+        budget = PromptBudget('full_text')
+        notes = budget.fit('notes', notes)
         notes_text = f"\nAdditional context about the game:\n{notes}" if notes else ""
         
         prompt = f"""Write a detailed description of the tabletop roleplaying game '{game_name}' formatted in HTML using <article> and <section> blocks. Include its theme, rules overview, unique mechanics, and target audience.{notes_text}
@@ -54,26 +83,24 @@ class OpenAIService:
     - What makes it unique
     - Target audience"""
 
-        response = openai_client.chat.completions.create(
-            model=GPT_MODEL,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000
-        )
+        content = model_router.complete('full_text', budget.check(prompt), validator=_is_html, on_token=on_token)
         
         # Remove any markdown code block formatting if present
-        content = response.choices[0].message.content.strip()
         content = content.replace('```html', '').replace('```', '')
         return content.strip()
 
-    @retry_with_backoff
-    def get_ttrpg_category(self, game_name):
+    def _category_prefix(self):
+        """
+        Static instructions and category lists shared by every category request.
+
+        Kept identical across single and batched calls and placed first in the
+        messages so provider-side prompt caching can reuse it.
+        """
         genres_string = '; '.join(self.genres)
         themes_string = '; '.join(self.themes)
         mechanics_string = '; '.join(self.mechanics)
-        
-        prompt = f"""Analyze the tabletop roleplaying game '{game_name}' and select 4-7 categories total from the following lists. Choose categories that best capture the game's core essence and unique features. Provide the categories separated by a semicolon and space.
+
+        return f"""You categorize tabletop roleplaying games. For each game, select 4-7 categories total from the following lists. Choose categories that best capture the game's core essence and unique features.
 
     Requirements:
     - Must include at least one GENRE
@@ -94,122 +121,292 @@ class OpenAIService:
 
     Important: Select only the categories that truly define the game's core identity, ordered by importance."""
 
-        response = openai_client.chat.completions.create(
-            model=GPT_MODEL,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=50
+    def _potential_categories_prefix(self, with_categories: bool = True):
+        """
+        Static instructions shared by every potential category request.
+
+        With `with_categories` the whole taxonomy is included; callers that have
+        CategoryStats send its shortlist of likely duplicates instead.
+        """
+        instructions = """You suggest 2-3 new potential categories or tags for tabletop roleplaying games that aren't existing categories. 
+    These should be unique, specific categories that could be useful for categorizing the game and similar games."""
+        if not with_categories:
+            return instructions
+        return f"""{instructions}
+
+    Existing categories: {'; '.join(self.categories)}"""
+
+    @with_retry_policy('openai')
+    def get_ttrpg_category(self, game_name):
+        messages = [
+            {"role": "system", "content": self._category_prefix()},
+            {"role": "user", "content": f"Analyze the tabletop roleplaying game '{game_name}'. Provide the categories separated by a semicolon and space."}
+        ]
+        content = model_router.complete(
+            'category',
+            PromptBudget('category').check_messages(messages),
+            validator=lambda text: len(self._valid_categories(text)) >= 4
         )
         
-        # Get response and split into categories
-        categories = response.choices[0].message.content.strip().split('; ')
-        
-        # Filter out any categories that aren't in our defined sets
-        valid_categories = [
+        # Join back into semicolon-separated string
+        return '; '.join(self._valid_categories(content))
+
+    def _valid_categories(self, text):
+        """Split a category response and drop anything not in our defined sets."""
+        categories = text.strip().split('; ')
+        return [
             cat for cat in categories 
             if cat in self.genres 
             or cat in self.themes 
             or cat in self.mechanics
         ]
-        
-        # Join back into semicolon-separated string
-        return '; '.join(valid_categories)
 
-    @retry_with_backoff
-    def get_potential_categories(self, game_name):
-        prompt = f"""Analyze the tabletop roleplaying game '{game_name}' and suggest 2-3 new potential categories or tags that aren't in the following list. 
-    These should be unique, specific categories that could be useful for categorizing this and similar games. Format your response as a semicolon-separated list.
+    def _new_categories(self, text):
+        """Suggestions from a semicolon-separated list that aren't existing categories (ignoring case)."""
+        existing = {category.lower() for category in self.categories}
+        return [cat.strip() for cat in (text or '').split(';') if cat.strip() and cat.strip().lower() not in existing]
 
-    Existing categories: {'; '.join(self.categories)}"""
+    def _is_new_categories(self, text):
+        """Potential categories are a short list that doesn't repeat existing ones."""
+        suggestions = [cat.strip() for cat in text.split(';') if cat.strip()]
+        return 1 <= len(suggestions) <= 5 and len(self._new_categories(text)) == len(suggestions)
+
+    @with_retry_policy('openai')
+    def get_potential_categories(self, game_name, category_context=None):
+        """
+        Suggest new categories for a game.
+
+        Args:
+            game_name: Name of the game
+            category_context: Context from CategoryStats.prompt_context (the game's
+                categories, the existing categories used with them and tags
+                suggested for similar games); sent instead of the full category list
 
-        response = openai_client.chat.completions.create(
-            model=GPT_MODEL,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=50
+        Returns:
+            Semicolon-separated suggestions; any that repeat an existing
+            category, including in an escalated answer, are dropped
+        """
+        context = f"\n\n{category_context}" if category_context else ""
+        messages = [
+            {"role": "system", "content": self._potential_categories_prefix(with_categories=not category_context)},
+            {"role": "user", "content": f"Analyze the tabletop roleplaying game '{game_name}'. Format your response as a semicolon-separated list.{context}"}
+        ]
+        content = model_router.complete(
+            'potential_categories', PromptBudget('potential_categories').check_messages(messages), validator=self._is_new_categories
+        )
+        return '; '.join(self._new_categories(content)[:5])
+
+    def get_ttrpg_categories_batch(self, game_names: List[str]) -> Dict[str, str]:
+        """
+        Categorize several games in one request.
+
+        Returns:
+            Mapping of game name to a semicolon-separated category string
+        """
+        results = self._run_batch('category_batch', self._category_prefix(), game_names, 'categories')
+        return {
+            name: '; '.join(self._valid_categories('; '.join(values)))
+            for name, values in results.items()
+        }
+
+    def get_potential_categories_batch(
+        self,
+        game_names: List[str],
+        shared_context: Optional[str] = None,
+        game_contexts: Optional[Dict[str, str]] = None
+    ) -> Dict[str, str]:
+        """
+        Suggest potential categories for several games in one request.
+
+        Args:
+            game_names: Games to suggest categories for
+            shared_context: Shortlist from CategoryStats.batch_prompt_context;
+                sent instead of the full category list
+            game_contexts: Per-game context from the same call, by game name
+
+        Returns:
+            Mapping of game name to a semicolon-separated list of suggestions
+        """
+        results = self._run_batch(
+            'potential_categories_batch',
+            self._potential_categories_prefix(with_categories=not shared_context),
+            game_names,
+            'suggestions',
+            context=shared_context,
+            game_contexts=game_contexts
+        )
+        return {
+            name: '; '.join(self._new_categories('; '.join(values)))
+            for name, values in results.items()
+        }
+
+    @with_retry_policy('openai')
+    def _run_batch(
+        self,
+        task: str,
+        prefix: str,
+        game_names: List[str],
+        field: str,
+        context: Optional[str] = None,
+        game_contexts: Optional[Dict[str, str]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Send one structured request covering every game in `game_names`.
+
+        Games are numbered in the prompt and the JSON response is mapped back by
+        id, so oddly formatted titles can't be confused. Repeated titles are
+        sent once, since results are keyed by title. Games missing from the
+        response are left out of the result.
+
+        `context` goes before the list and each game's entry in
+        `game_contexts` after its line.
+        """
+        game_names = list(dict.fromkeys(game_names))
+        game_contexts = game_contexts or {}
+        games_list = '\n'.join(
+            f"{i}. {name}" + (f" [{game_contexts[name]}]" if game_contexts.get(name) else '')
+            for i, name in enumerate(game_names)
         )
-        return response.choices[0].message.content.strip()
+        context = f"{context}\n\n" if context else ""
+        messages = [
+            {"role": "system", "content": prefix},
+            {"role": "user", "content": f"""{context}Handle each of the following games:
+{games_list}
+
+Respond with JSON only, in the form {{"games": [{{"id": <number>, "{field}": ["...", "..."]}}]}}, with one entry per game id."""}
+        ]
+
+        def parse(text):
+            try:
+                entries = json.loads(text).get('games', [])
+            except (ValueError, AttributeError):
+                return {}
+            parsed = {}
+            for entry in entries:
+                if not isinstance(entry, dict):
+                    continue
+                game_id = entry.get('id')
+                values = entry.get(field)
+                if isinstance(game_id, int) and 0 <= game_id < len(game_names) and isinstance(values, list):
+                    parsed[game_names[game_id]] = [str(value).strip() for value in values if str(value).strip()]
+            return parsed
+
+        route = model_router.get_route(task)
+        content = model_router.complete(
+            task,
+            messages,
+            validator=lambda text: len(parse(text)) == len(game_names),
+            max_tokens=route['max_tokens'] * len(game_names),
+            response_format={"type": "json_object"}
+        )
+        results = parse(content)
+        missing = len(game_names) - len(results)
+        if missing:
+            logger.warning(f"{task}: {missing} of {len(game_names)} games missing from batch response")
+        return results
     
-    @staticmethod
-    @retry_with_backoff
-    def find_related_games_by_ai(worksheet, current_game):
+    @with_retry_policy('openai')
+    def _complete_combined(self, game_name: str, notes: Optional[str], fields: Sequence[str]) -> Dict:
+        budget = PromptBudget('combined')
+        notes = budget.fit('notes', notes)
+        notes_text = f"\n\nAdditional context about the game:\n{notes}" if notes else ""
+        instructions = '\n'.join(f"- {COMBINED_INSTRUCTIONS[field]}" for field in fields)
+        messages = [
+            # The category prefix comes first, as in the single category calls, so it stays cacheable
+            {"role": "system", "content": self._category_prefix()},
+            {"role": "user", "content": f"""Write content for the tabletop roleplaying game '{game_name}'.{notes_text}
+
+Respond with JSON only, as one object with these keys:
+{instructions}"""}
+        ]
+        content = model_router.complete('combined', budget.check_messages(messages), response_format={"type": "json_object"})
         try:
-            # Get all game titles and their categories
-            all_data = worksheet.get_all_records()
-            games_with_categories = [
-                {'title': row['title'], 'categories': row.get('Category', '')} 
-                for row in all_data 
-                if row['title'].lower() != current_game.lower()
-            ]
-            
-            # Create prompt for AI
-            games_info = '\n'.join([
-                f"- {game['title']} ({game['categories']})" 
-                for game in games_with_categories[:100]  # Limit to first 100 games
-            ])
-            
-            prompt = f"""Given the tabletop RPG "{current_game}", identify 3 related but distinctly different games from the list below. 
-    Each recommendation should offer a unique perspective or alternative approach while maintaining some connection to {current_game}.
-
-    Games and their categories:
-    {games_info}
+            parsed = json.loads(content)
+        except ValueError:
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+
+    def _validated_combined_field(self, field: str, value) -> Optional[str]:
+        """Normalize one field of a combined response, or None if it fails that field's validation."""
+        if isinstance(value, list):
+            value = '; '.join(str(item).strip() for item in value if str(item).strip())
+        if not isinstance(value, str):
+            return None
+        value = value.strip()
+        if field == 'summary':
+            return value if _is_blurb(value) else None
+        if field == 'category':
+            categories = self._valid_categories(value)
+            return '; '.join(categories) if len(categories) >= 4 else None
+        if field == 'potential_categories':
+            return value if self._is_new_categories(value) else None
+        return None
+
+    def get_game_content_combined(
+        self,
+        game_name: str,
+        notes: Optional[str] = None,
+        fields: Sequence[str] = COMBINED_FIELDS,
+        category_context: Optional[str] = None
+    ) -> Dict[str, Optional[str]]:
+        """
+        Generate several fields for a game with one structured request.
 
-    Requirements:
-    - Choose games with different mechanical approaches or unique twists
-    - Avoid selecting games that are too similar to each other
-    - Consider both obvious and non-obvious connections
-    - Focus on games that would interest players of {current_game} but offer fresh experiences
-
-    Format your response as a semicolon-separated list of exactly 3 games. Example: "Game1; Game2; Game3"
-    Important: Only include games from the provided list. You must return exactly 3 games."""
-
-            response = openai_client.chat.completions.create(
-                model=GPT_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1000
-            )
-            
-            related_titles = response.choices[0].message.content.strip().split('; ')
-            
-            # Find the full data for the related games
-            related_games = []
-            for title in related_titles:
-                game_data = next((row for row in all_data if row['title'].lower() == title.lower()), None)
-                if game_data:
-                    related_games.append({
-                        'title': game_data['title'],
-                        'imgUrl': game_data['imgUrl'],
-                        'page': game_data['page'],
-                        'categories': game_data.get('Category', '')
-                    })
-            
-            return related_games
+        The game name, notes and category lists are sent once instead of once
+        per field. Each field is validated as its own call would be, and only
+        the fields that are missing or fail are regenerated with the
+        single-field methods.
+
+        Args:
+            game_name: Name of the game
+            notes: Spreadsheet notes for the game
+            fields: Which of COMBINED_FIELDS to generate
+            category_context: Passed to get_potential_categories if that field is regenerated
+
+        Returns:
+            Mapping of each requested field to its value
+        """
+        try:
+            response = self._complete_combined(game_name, notes, fields)
         except Exception as e:
-            print(f"Error finding related games by AI: {e}")
-            return []
+            logger.error(f"Combined generation failed for {game_name}, generating fields separately: {e}")
+            response = {}
+
+        results = {field: self._validated_combined_field(field, response.get(field)) for field in fields}
+        failed = [field for field, value in results.items() if value is None]
+        if failed:
+            logger.info(f"Regenerating {', '.join(failed)} for {game_name} separately")
+        regenerate = {
+            'summary': lambda: self.get_ttrpg_summary(game_name, notes),
+            'category': lambda: self.get_ttrpg_category(game_name),
+            'potential_categories': lambda: self.get_potential_categories(game_name, category_context),
+        }
+        for field in failed:
+            results[field] = regenerate[field]()
+        return results
 
     @staticmethod
-    @retry_with_backoff
+    # The same pair is often requested by several games' related lists at once
+    @single_flight(
+        'relationship_blurb',
+        key=lambda game1_name, game2_name, game2_categories: (
+            normalize_title(game1_name), normalize_title(game2_name), game2_categories
+        )
+    )
+    @with_retry_policy('openai')
     def generate_relationship_blurb(game1_name, game2_name, game2_categories):
         prompt = f"""Write a brief 1-2 sentence description of how the tabletop RPG "{game2_name}" relates to "{game1_name}". 
     Focus on their shared elements or complementary features, especially how they differ in play style and game mechanics. Also an example of how they differ.
     Wrap any titles in <i> tags.
     Categories for {game2_name}: {game2_categories}"""
 
-        response = openai_client.chat.completions.create(
-            model=GPT_MODEL,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=200
-        )
-        return response.choices[0].message.content.strip()
+        return model_router.complete('relationship_blurb', PromptBudget('relationship_blurb').check(prompt), validator=_is_blurb)
     
     @staticmethod
-    @retry_with_backoff
+    @with_retry_policy('openai')
     def extract_reviews(text_content):
+        budget = PromptBudget('extract_reviews')
+        text_content = budget.fit('page_text', text_content)
         prompt = f"""
         Extract all user reviews from the following text:
 
@@ -219,20 +416,15 @@ class OpenAIService:
 
         Reviews:
         """
-        response = openai_client.chat.completions.create(
-            model=GPT_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=3000,
-            temperature=0
-        )
-        reviews_text = response.choices[0].message.content
-        reviews = reviews_text.strip().split('\n')
+        reviews_text = model_router.complete('extract_reviews', budget.check(prompt), temperature=0)
+        reviews = reviews_text.split('\n')
         return reviews
     
     @staticmethod
-    @retry_with_backoff
-    def summarize_reviews(reviews):
-        combined_reviews = ' '.join(reviews)
+    @with_retry_policy('openai')
+    def summarize_reviews(reviews, on_token=None):
+        budget = PromptBudget('summarize_reviews')
+        combined_reviews = budget.fit('reviews', ' '.join(reviews))
         prompt = f"""
         Summarize the following user reviews into a concise paragraph highlighting the main points:
 
@@ -240,11 +432,6 @@ class OpenAIService:
 
         Summary:
         """
-        response = openai_client.chat.completions.create(
-            model=GPT_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=3000,
-            temperature=0.0
-        )
-        summary = response.choices[0].message.content
-        return summary.strip()
\ No newline at end of file
+        return model_router.complete(
+            'summarize_reviews', budget.check(prompt), validator=bool, temperature=0.0, on_token=on_token
+        )
\ No newline at end of file
@@ -0,0 +1,220 @@
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+from config.constants import PROMPT_BUDGETS
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a characters/4 estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Tokenizer used by the gpt-4o family
+ENCODING_NAME = 'o200k_base'
+CHARS_PER_TOKEN = 4
+
+SENTENCE_PATTERN = re.compile(r'[^.!?\n]+(?:[.!?]+|\n+|$)\s*')
+WORD_PATTERN = re.compile(r"[a-z][a-z'-]{2,}")
+# Words too common to say what a passage is about
+STOPWORDS = frozenset("""
+the and for are but not you all any can had her was one our out has have his how its may new now old see two who
+did get let put say she too use that with this from they will would there their what about which when your said
+each them then these some more also into than only other such very just over most been were being game games
+""".split())
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    if tiktoken is None:
+        return None
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                _encoding = tiktoken.get_encoding(ENCODING_NAME)
+            except Exception as e:
+                # The encoding is downloaded on first use, which fails offline
+                logger.warning(f"Could not load the {ENCODING_NAME} tokenizer, estimating token counts instead: {e}")
+                _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Count tokens with tiktoken when installed, otherwise estimate from the length."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, backing up to the last sentence or line break when there is one."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        cut = text[:max_tokens * CHARS_PER_TOKEN]
+    boundary = max(cut.rfind('. '), cut.rfind('\n'))
+    # Only back up if that keeps most of the allowance
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip()
+
+
+def extract_summary(text: str, max_tokens: int) -> str:
+    """
+    Keep the most informative sentences of a text, in their original order.
+
+    Sentences are scored by how many of the text's frequent content words they
+    contain (Luhn-style), with a small bonus for coming early, and added best
+    first until the budget is full. The result depends only on the input, so
+    the same notes always compact to the same prompt.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    sentences = [s.strip() for s in SENTENCE_PATTERN.findall(text) if s.strip()]
+    if len(sentences) < 2:
+        return truncate_to_tokens(text, max_tokens)
+
+    frequencies = Counter(word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS)
+    scores = []
+    for position, sentence in enumerate(sentences):
+        words = [word for word in WORD_PATTERN.findall(sentence.lower()) if word not in STOPWORDS]
+        density = sum(frequencies[word] for word in words) / math.sqrt(len(words) or 1)
+        scores.append(density * (1.0 + 1.0 / (position + 1)))
+
+    chosen: List[int] = []
+    used = 0
+    for index in sorted(range(len(sentences)), key=lambda i: (-scores[i], i)):
+        tokens = count_tokens(sentences[index]) + 1
+        if used + tokens > max_tokens:
+            continue
+        chosen.append(index)
+        used += tokens
+    if not chosen:
+        return truncate_to_tokens(text, max_tokens)
+    return ' '.join(sentences[i] for i in sorted(chosen))
+
+
+COMPACTORS = {
+    'extract': extract_summary,
+    'truncate': truncate_to_tokens,
+}
+
+# Inputs compacted and prompts over budget, by "task.input", for the end-of-run report
+overruns: Counter = Counter()
+_overruns_lock = threading.Lock()
+
+
+def _record_overrun(key: str) -> None:
+    with _overruns_lock:
+        overruns[key] += 1
+
+
+class PromptBudgetError(Exception):
+    """A prompt can't be trimmed to its task's total budget."""
+
+
+def _trim_longest_line(text: str, excess: int) -> Optional[str]:
+    """Cut the longest line of text by about excess tokens; None if it isn't that long."""
+    lines = text.split('\n')
+    counts = [count_tokens(line) for line in lines]
+    longest = max(range(len(lines)), key=lambda i: counts[i])
+    if counts[longest] <= excess:
+        return None
+    lines[longest] = truncate_to_tokens(lines[longest], counts[longest] - excess)
+    return '\n'.join(lines)
+
+
+class PromptBudget:
+    """
+    Token accounting for one prompt.
+
+    Each task in PROMPT_BUDGETS has a total input budget and a limit for each
+    variable input (notes, scraped text, reviews). fit() compacts an input
+    that is over its limit and logs it; check() measures the finished prompt
+    and, when it is over the total (e.g. because of a long category list),
+    cuts its longest line down so the prompt fits.
+
+        budget = PromptBudget('summary')
+        notes = budget.fit('notes', notes)
+        prompt = budget.check(f"... {notes} ...")
+    """
+
+    def __init__(self, task: str, budgets: Optional[Dict[str, Dict[str, int]]] = None):
+        self.task = task
+        self.limits = (budgets or PROMPT_BUDGETS).get(task, {})
+
+    def fit(self, name: str, text: Optional[str], strategy: str = 'extract') -> Optional[str]:
+        """
+        Compact one input to its limit.
+
+        Args:
+            name: Input name from the task's budget (e.g. 'notes')
+            text: The input; returned unchanged when empty, within its limit or unbudgeted
+            strategy: 'extract' keeps the most informative sentences, 'truncate' keeps the start
+        """
+        limit = self.limits.get(name)
+        if not text or limit is None:
+            return text
+        tokens = count_tokens(text)
+        if tokens <= limit:
+            return text
+        compacted = COMPACTORS[strategy](text, limit)
+        _record_overrun(f"{self.task}.{name}")
+        logger.warning(f"{self.task}: {name} is {tokens} tokens, over its budget of {limit}; "
+                       f"compacted to {count_tokens(compacted)} tokens ({strategy})")
+        return compacted
+
+    def check(self, prompt: str) -> str:
+        """
+        Fit a finished prompt to the task's total budget.
+
+        A prompt over the total has its longest line (the input or list that
+        made it long) cut from the end until it fits.
+
+        Raises:
+            PromptBudgetError: The prompt doesn't fit even after trimming
+        """
+        total = self.limits.get('total')
+        tokens = count_tokens(prompt)
+        if total is None or tokens <= total:
+            return prompt
+        _record_overrun(f"{self.task}.total")
+        trimmed = prompt
+        # Token counts of the parts don't add up exactly, so cut again if needed
+        for _ in range(3):
+            trimmed = _trim_longest_line(trimmed, count_tokens(trimmed) - total)
+            if trimmed is None:
+                break
+            if count_tokens(trimmed) <= total:
+                logger.warning(f"{self.task}: prompt is {tokens} tokens, over its budget of {total}; "
+                               f"trimmed its longest line to fit")
+                return trimmed
+        raise PromptBudgetError(f"{self.task}: prompt is {tokens} tokens and can't be trimmed to its budget of {total}")
+
+    def check_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """check() for a chat message list; the longest message is the one trimmed."""
+        total = self.limits.get('total')
+        tokens = count_tokens('\n'.join(message['content'] for message in messages))
+        if total is None or tokens <= total:
+            return messages
+        longest = max(range(len(messages)), key=lambda i: len(messages[i]['content']))
+        others = tokens - count_tokens(messages[longest]['content'])
+        budget = PromptBudget(self.task, {self.task: {'total': max(total - others, 0)}})
+        try:
+            content = budget.check(messages[longest]['content'])
+        except PromptBudgetError:
+            raise PromptBudgetError(
+                f"{self.task}: prompt is {tokens} tokens and can't be trimmed to its budget of {total}") from None
+        return [dict(message, content=content) if i == longest else message for i, message in enumerate(messages)]
@@ -0,0 +1,361 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WorkItem(NamedTuple):
+    """
+    A leased unit of work: one title and the column to update (None for all).
+
+    lease_owner and attempts identify the lease, so a worker whose lease
+    expired and was handed to someone else can no longer ack or fail it.
+    """
+    id: str
+    title: str
+    column: Optional[str]
+    attempts: int
+    lease_owner: Optional[str] = None
+
+
+def default_worker_id() -> str:
+    """Identify a worker process across hosts."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _check_lease(updated: int, item: WorkItem, action: str) -> bool:
+    if not updated:
+        logger.warning(f"Lease on {item.title} (attempt {item.attempts}) was lost before {action}; "
+                       f"it has been handed to another worker")
+    return bool(updated)
+
+
+class SQLiteWorkQueue:
+    """
+    Work queue backed by a SQLite file, for several worker processes on one host.
+
+    The file uses SQLite's default rollback journal rather than WAL, since WAL
+    needs shared memory that only works on a local disk. SQLite's locking is
+    only as reliable as the filesystem's, so for workers on several machines
+    use a Redis queue instead of a file on a network volume.
+
+    Items are leased for `lease_seconds`; a worker that dies without acking
+    leaves its lease to expire and the item is handed to the next worker;
+    a live worker keeps its lease with extend_lease (see LeaseHeartbeat).
+    Items that fail, or whose lease expires, `max_attempts` times are parked
+    with status 'failed'.
+    """
+
+    def __init__(self, path: str = 'work_queue.db', lease_seconds: float = 900, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute('PRAGMA busy_timeout=30000')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                column_name TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                last_error TEXT,
+                updated_at REAL,
+                UNIQUE (title, column_name)
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires)')
+
+    def enqueue(self, titles: Iterable[str], column: Optional[str] = None) -> int:
+        """Add titles to the queue, resetting any finished entry for the same title and column."""
+        now = time.time()
+        added = 0
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            for title in titles:
+                cursor = self._conn.execute("""
+                    INSERT INTO jobs (title, column_name, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT (title, column_name) DO UPDATE SET
+                        status = 'pending', attempts = 0, lease_owner = NULL,
+                        lease_expires = NULL, last_error = NULL, updated_at = excluded.updated_at
+                    WHERE status IN ('done', 'failed')
+                """, (title, column or '', now))
+                added += cursor.rowcount
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        return added
+
+    def lease(self, worker_id: str) -> Optional[WorkItem]:
+        """Lease the next pending (or expired) item, or return None if there is none."""
+        now = time.time()
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            # A lease that keeps expiring means the item crashes or hangs its worker
+            self._conn.execute("""
+                UPDATE jobs SET status = 'failed', lease_owner = NULL, lease_expires = NULL,
+                    last_error = 'Lease expired after ' || attempts || ' attempts', updated_at = ?
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+            """, (now, now, self.max_attempts))
+            row = self._conn.execute("""
+                SELECT id, title, column_name, attempts FROM jobs
+                WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY id LIMIT 1
+            """, (now,)).fetchone()
+            if row is None:
+                self._conn.execute('COMMIT')
+                return None
+            job_id, title, column, attempts = row
+            self._conn.execute("""
+                UPDATE jobs SET status = 'leased', attempts = attempts + 1,
+                    lease_owner = ?, lease_expires = ?, updated_at = ?
+                WHERE id = ?
+            """, (worker_id, now + self.lease_seconds, now, job_id))
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        return WorkItem(str(job_id), title, column or None, attempts + 1, worker_id)
+
+    def ack(self, item: WorkItem) -> bool:
+        """
+        Mark a leased item as done.
+
+        Returns:
+            False if the lease was lost (it expired and the item was leased
+            again), in which case the item is left to its new owner
+        """
+        cursor = self._conn.execute("""
+            UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, updated_at = ?
+            WHERE id = ? AND lease_owner = ? AND attempts = ? AND status = 'leased'
+        """, (time.time(), int(item.id), item.lease_owner, item.attempts))
+        return _check_lease(cursor.rowcount, item, 'ack')
+
+    def extend_lease(self, item: WorkItem) -> bool:
+        """
+        Push a lease's expiry `lease_seconds` into the future; False if the lease was lost.
+
+        Uses its own connection, so a heartbeat thread can call it while the
+        worker's thread uses the queue.
+        """
+        now = time.time()
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            cursor = conn.execute("""
+                UPDATE jobs SET lease_expires = ?, updated_at = ?
+                WHERE id = ? AND lease_owner = ? AND attempts = ? AND status = 'leased'
+            """, (now + self.lease_seconds, now, int(item.id), item.lease_owner, item.attempts))
+            return _check_lease(cursor.rowcount, item, 'extending it')
+        finally:
+            conn.close()
+
+    def fail(self, item: WorkItem, error: str) -> bool:
+        """Return a failed item to the queue, or park it once it has used up its attempts; False if the lease was lost."""
+        status = 'failed' if item.attempts >= self.max_attempts else 'pending'
+        cursor = self._conn.execute("""
+            UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL,
+                last_error = ?, updated_at = ?
+            WHERE id = ? AND lease_owner = ? AND attempts = ? AND status = 'leased'
+        """, (status, error, time.time(), int(item.id), item.lease_owner, item.attempts))
+        return _check_lease(cursor.rowcount, item, 'fail')
+
+    def status(self) -> Dict[str, int]:
+        """Count items by status; expired leases are reported as 'expired'."""
+        now = time.time()
+        counts = {'pending': 0, 'leased': 0, 'expired': 0, 'done': 0, 'failed': 0}
+        for status, expired, count in self._conn.execute("""
+            SELECT status, status = 'leased' AND lease_expires < ?, COUNT(*)
+            FROM jobs GROUP BY 1, 2
+        """, (now,)):
+            counts['expired' if expired else status] = count
+        return counts
+
+
+class RedisWorkQueue:
+    """
+    Work queue on a Redis-compatible server (Redis, Valkey, KeyDB, ...).
+
+    Pending item ids live in a list, leases in a sorted set scored by expiry
+    time and item details in a hash. Leasing runs as a Lua script so expired
+    leases are requeued and the next item is claimed atomically.
+    """
+
+    LEASE_SCRIPT = """
+        local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+        for _, id in ipairs(expired) do
+            redis.call('ZREM', KEYS[2], id)
+            local attempts = tonumber(redis.call('HGET', KEYS[3] .. id, 'attempts') or '0')
+            if attempts >= tonumber(ARGV[4]) then
+                redis.call('HSET', KEYS[3] .. id, 'status', 'failed',
+                    'last_error', 'Lease expired after ' .. attempts .. ' attempts')
+                redis.call('HDEL', KEYS[3] .. id, 'lease_owner')
+            else
+                redis.call('HSET', KEYS[3] .. id, 'status', 'pending')
+                redis.call('RPUSH', KEYS[1], id)
+            end
+        end
+        local id = redis.call('LPOP', KEYS[1])
+        if not id then return nil end
+        redis.call('ZADD', KEYS[2], ARGV[2], id)
+        local attempts = redis.call('HINCRBY', KEYS[3] .. id, 'attempts', 1)
+        redis.call('HSET', KEYS[3] .. id, 'status', 'leased', 'lease_owner', ARGV[3])
+        return {id, redis.call('HGET', KEYS[3] .. id, 'payload'), attempts}
+    """
+
+    # Finish a lease only if it is still the caller's: same owner and attempt
+    FINISH_SCRIPT = """
+        local item = KEYS[3] .. ARGV[1]
+        if redis.call('HGET', item, 'status') ~= 'leased'
+            or redis.call('HGET', item, 'lease_owner') ~= ARGV[2]
+            or redis.call('HGET', item, 'attempts') ~= ARGV[3] then
+            return 0
+        end
+        redis.call('ZREM', KEYS[2], ARGV[1])
+        redis.call('HSET', item, 'status', ARGV[4])
+        redis.call('HDEL', item, 'lease_owner')
+        if ARGV[5] ~= '' then redis.call('HSET', item, 'last_error', ARGV[5]) end
+        if ARGV[4] == 'pending' then redis.call('RPUSH', KEYS[1], ARGV[1]) end
+        return 1
+    """
+
+    # Move a lease's expiry, again only if it is still the caller's
+    EXTEND_SCRIPT = """
+        local item = KEYS[2] .. ARGV[1]
+        if redis.call('HGET', item, 'status') ~= 'leased'
+            or redis.call('HGET', item, 'lease_owner') ~= ARGV[2]
+            or redis.call('HGET', item, 'attempts') ~= ARGV[3] then
+            return 0
+        end
+        return redis.call('ZADD', KEYS[1], 'XX', 'CH', ARGV[4], ARGV[1])
+    """
+
+    def __init__(self, url: str, prefix: str = 'ttrpg:queue', lease_seconds: float = 900, max_attempts: int = 3):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis package is required for redis:// queues: pip install redis")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.pending_key = f"{prefix}:pending"
+        self.leases_key = f"{prefix}:leases"
+        self.item_prefix = f"{prefix}:item:"
+        self.statuses_key = f"{prefix}:statuses"
+        self._lease = self.client.register_script(self.LEASE_SCRIPT)
+        self._finish = self.client.register_script(self.FINISH_SCRIPT)
+        self._extend = self.client.register_script(self.EXTEND_SCRIPT)
+
+    @staticmethod
+    def _item_id(title: str, column: Optional[str]) -> str:
+        return f"{column or ''}|{title}"
+
+    def enqueue(self, titles: Iterable[str], column: Optional[str] = None) -> int:
+        added = 0
+        for title in titles:
+            item_id = self._item_id(title, column)
+            status = self.client.hget(self.item_prefix + item_id, 'status')
+            if status in ('pending', 'leased'):
+                continue
+            pipe = self.client.pipeline()
+            pipe.hset(self.item_prefix + item_id, mapping={
+                'payload': json.dumps({'title': title, 'column': column}),
+                'status': 'pending',
+                'attempts': 0,
+            })
+            pipe.hdel(self.item_prefix + item_id, 'last_error', 'lease_owner')
+            pipe.rpush(self.pending_key, item_id)
+            pipe.sadd(self.statuses_key, item_id)
+            pipe.execute()
+            added += 1
+        return added
+
+    def lease(self, worker_id: str) -> Optional[WorkItem]:
+        now = time.time()
+        result = self._lease(
+            keys=[self.pending_key, self.leases_key, self.item_prefix],
+            args=[now, now + self.lease_seconds, worker_id, self.max_attempts]
+        )
+        if not result:
+            return None
+        item_id, payload, attempts = result
+        data = json.loads(payload)
+        return WorkItem(item_id, data['title'], data['column'], int(attempts), worker_id)
+
+    def _finish_lease(self, item: WorkItem, status: str, error: str = '') -> int:
+        return self._finish(
+            keys=[self.pending_key, self.leases_key, self.item_prefix],
+            args=[item.id, item.lease_owner or '', item.attempts, status, error]
+        )
+
+    def ack(self, item: WorkItem) -> bool:
+        return _check_lease(self._finish_lease(item, 'done'), item, 'ack')
+
+    def fail(self, item: WorkItem, error: str) -> bool:
+        status = 'failed' if item.attempts >= self.max_attempts else 'pending'
+        return _check_lease(self._finish_lease(item, status, error), item, 'fail')
+
+    def extend_lease(self, item: WorkItem) -> bool:
+        extended = self._extend(
+            keys=[self.leases_key, self.item_prefix],
+            args=[item.id, item.lease_owner or '', item.attempts, time.time() + self.lease_seconds]
+        )
+        return _check_lease(extended, item, 'extending it')
+
+    def status(self) -> Dict[str, int]:
+        counts = {'pending': 0, 'leased': 0, 'expired': 0, 'done': 0, 'failed': 0}
+        now = time.time()
+        expired = set(self.client.zrangebyscore(self.leases_key, '-inf', now))
+        for item_id in self.client.sscan_iter(self.statuses_key):
+            status = self.client.hget(self.item_prefix + item_id, 'status') or 'pending'
+            counts['expired' if item_id in expired else status] += 1
+        return counts
+
+
+class LeaseHeartbeat:
+    """
+    Keeps a work item's lease alive while it is being processed.
+
+    Used as a context manager around the work; a background thread extends
+    the lease every third of `lease_seconds`, so a slow game isn't handed to
+    a second worker. Stops early if the lease turns out to be lost.
+    """
+
+    def __init__(self, queue, item: WorkItem, interval: Optional[float] = None):
+        self.queue = queue
+        self.item = item
+        self.interval = interval or queue.lease_seconds / 3
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-heartbeat-{item.id}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.extend_lease(self.item):
+                    return
+            except Exception as e:
+                logger.warning(f"Error extending lease on {self.item.title}: {e}")
+
+    def __enter__(self) -> 'LeaseHeartbeat':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def open_queue(spec: str, lease_seconds: float = 900):
+    """Open a queue from a SQLite file path or a redis:// / rediss:// URL."""
+    if spec.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisWorkQueue(spec, lease_seconds=lease_seconds)
+    return SQLiteWorkQueue(spec, lease_seconds=lease_seconds)
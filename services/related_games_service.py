@@ -0,0 +1,237 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from utils.title_index import normalize_title
+
+logger = logging.getLogger(__name__)
+
+
+def split_categories(value: Any) -> List[str]:
+    """Split a semicolon-separated Category cell into category names."""
+    return [cat.strip() for cat in str(value or '').split(';') if cat.strip()]
+
+
+class RelatedGamesGraph:
+    """
+    Catalog-wide related-games graph built from category overlap.
+
+    Each game is a row of an IDF-weighted, L2-normalized multi-hot category
+    matrix, so the cosine similarity of every pair is one matrix product.
+    Similarities are computed in row blocks to keep memory bounded on large
+    catalogs, and only the top `candidates` per game are kept. From those,
+    `neighbors` are picked with maximal marginal relevance so the chosen games
+    are related to the source but not near-copies of each other.
+
+    build() covers the whole catalog; related() answers for one game, from
+    categories that may be newer than the ones the graph was built from.
+    """
+
+    def __init__(
+        self,
+        games: List[Dict[str, Any]],
+        candidates: int = 20,
+        neighbors: int = 3,
+        diversity: float = 0.3,
+        block_size: int = 1024
+    ):
+        """
+        Args:
+            games: Rows with at least 'title' and 'Category'
+            candidates: Most similar games considered per game
+            neighbors: Related games selected per game
+            diversity: MMR trade-off; 0 ranks purely by similarity, higher values favor variety
+            block_size: Rows per similarity block
+        """
+        self.candidates = candidates
+        self.neighbors = neighbors
+        self.diversity = diversity
+        self.block_size = block_size
+
+        # Drop untitled rows and later duplicates of the same normalized title
+        seen = set()
+        self.games = []
+        for game in games:
+            key = normalize_title(str(game.get('title', '')))
+            if key and key not in seen:
+                seen.add(key)
+                self.games.append(game)
+
+        self._rows = {normalize_title(str(game['title'])): row for row, game in enumerate(self.games)}
+        self.vectors = self._build_vectors()
+
+    def _build_vectors(self) -> np.ndarray:
+        game_categories = [split_categories(game.get('Category')) for game in self.games]
+        vocabulary = sorted({cat for cats in game_categories for cat in cats})
+        self._column = {cat: i for i, cat in enumerate(vocabulary)}
+
+        matrix = np.zeros((len(self.games), len(vocabulary)), dtype=np.float32)
+        for row, cats in enumerate(game_categories):
+            matrix[row, [self._column[cat] for cat in cats]] = 1.0
+
+        # Rare categories say more about a game than ubiquitous ones like "Fantasy"
+        document_frequency = matrix.sum(axis=0)
+        self._idf = (np.log((1 + len(self.games)) / (1 + document_frequency)) + 1).astype(np.float32)
+        matrix *= self._idf
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _vector(self, categories: List[str]) -> np.ndarray:
+        """Vector for a category list; categories no catalog game uses are ignored."""
+        vector = np.zeros(len(self._column), dtype=np.float32)
+        indices = [self._column[cat] for cat in categories if cat in self._column]
+        vector[indices] = self._idf[indices]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def categories(self, title: str) -> List[str]:
+        """A game's categories as the graph knows them (empty if it isn't in the catalog)."""
+        row = self._rows.get(normalize_title(title))
+        return split_categories(self.games[row].get('Category')) if row is not None else []
+
+    def _top_candidates(self) -> np.ndarray:
+        """Indices of the most similar games for every game, most similar first."""
+        count = len(self.games)
+        k = min(self.candidates, count - 1)
+        if k <= 0:
+            return np.empty((count, 0), dtype=np.int64)
+
+        top = np.empty((count, k), dtype=np.int64)
+        for start in range(0, count, self.block_size):
+            end = min(start + self.block_size, count)
+            similarity = self.vectors[start:end] @ self.vectors.T
+            similarity[np.arange(end - start), np.arange(start, end)] = -np.inf  # never relate a game to itself
+            block_top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(similarity, block_top, axis=1), axis=1)
+            top[start:end] = np.take_along_axis(block_top, order, axis=1)
+        return top
+
+    def _select_diverse(self, vector: np.ndarray, candidates: np.ndarray) -> List[int]:
+        """Pick neighbors of `vector` by maximal marginal relevance among the candidates."""
+        candidate_vectors = self.vectors[candidates]
+        relevance = candidate_vectors @ vector
+        valid = relevance > 0
+        candidates, candidate_vectors, relevance = candidates[valid], candidate_vectors[valid], relevance[valid]
+        if not len(candidates):
+            return []
+
+        pairwise = candidate_vectors @ candidate_vectors.T
+        selected: List[int] = []
+        redundancy = np.zeros(len(candidates), dtype=np.float32)
+        available = np.ones(len(candidates), dtype=bool)
+        for _ in range(min(self.neighbors, len(candidates))):
+            score = (1 - self.diversity) * relevance - self.diversity * redundancy
+            score[~available] = -np.inf
+            best = int(np.argmax(score))
+            selected.append(best)
+            available[best] = False
+            redundancy = np.maximum(redundancy, pairwise[best])
+        return [int(candidates[i]) for i in selected]
+
+    def build(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Compute related games for the whole catalog.
+
+        Returns:
+            Mapping of game title to its selected neighbor rows
+        """
+        top = self._top_candidates()
+        graph = {}
+        for index, game in enumerate(self.games):
+            neighbors = self._select_diverse(self.vectors[index], top[index]) if top.shape[1] else []
+            graph[game['title']] = [self.games[i] for i in neighbors]
+        return graph
+
+    def related(self, title: str, categories: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Select related games for one game, as build() would.
+
+        Args:
+            title: The game; never related to itself, whether or not it is in the catalog
+            categories: Its categories (defaults to those in the catalog)
+
+        Returns:
+            The selected neighbor rows
+        """
+        vector = self._vector(categories if categories is not None else self.categories(title))
+        similarity = self.vectors @ vector
+        own_row = self._rows.get(normalize_title(title))
+        if own_row is not None:
+            similarity[own_row] = -np.inf
+        k = min(self.candidates, len(self.games) - (own_row is not None))
+        if k <= 0:
+            return []
+        candidates = np.argpartition(-similarity, k - 1)[:k]
+        candidates = candidates[np.argsort(-similarity[candidates], kind='stable')]
+        return [self.games[i] for i in self._select_diverse(vector, candidates)]
+
+
+class RelatedGamesService:
+    """Builds related games for every game in one pass and writes blurbs for the chosen pairs."""
+
+    def __init__(self, openai_service, workers: int = 1):
+        """
+        Args:
+            openai_service: Writes the relationship blurbs
+            workers: Games whose blurbs are generated concurrently; the
+                'openai' limiter decides how many calls actually run at once
+        """
+        self.openai_service = openai_service
+        self.workers = workers
+
+    def related_data(self, title: str, neighbors: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Write a blurb for each selected neighbor, in the update_google_sheet format."""
+        related_data = []
+        for game in neighbors:
+            try:
+                blurb = self.openai_service.generate_relationship_blurb(
+                    title,
+                    game['title'],
+                    game.get('Category', '')
+                )
+            except Exception as e:
+                logger.error(f"Error writing blurb for {title} -> {game['title']}: {str(e)}")
+                blurb = ''
+            related_data.append({
+                'title': game['title'],
+                'imgUrl': game.get('imgUrl', ''),
+                'page': game.get('page', ''),
+                'blurb': blurb
+            })
+        return related_data
+
+    def iter_related_data(
+        self,
+        games: List[Dict[str, Any]],
+        titles: Optional[List[str]] = None
+    ) -> Iterator[Tuple[str, List[Dict[str, str]]]]:
+        """
+        Compute the graph over all games and generate blurbs for the selected pairs.
+
+        Blurbs are generated for `workers` games at a time; results are
+        yielded game by game, in catalog order, so they can be written while
+        the remaining blurbs are generated.
+
+        Args:
+            games: Every game in the catalog
+            titles: Only generate blurbs for these games (defaults to all)
+
+        Yields:
+            Game title and its related_data in the update_google_sheet format
+        """
+        logger.info(f"Building related-games graph for {len(games)} games...")
+        graph = RelatedGamesGraph(games).build()
+        wanted = {normalize_title(title) for title in titles} if titles else None
+
+        selected = [
+            (title, neighbors) for title, neighbors in graph.items()
+            if wanted is None or normalize_title(title) in wanted
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            for title, related_data in zip(
+                (title for title, _ in selected),
+                executor.map(lambda item: self.related_data(*item), selected)
+            ):
+                yield title, related_data
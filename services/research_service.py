@@ -1,8 +1,9 @@
 import os
 import logging
 import requests
-from typing import Optional
-from utils.decorators import retry_with_backoff
+from typing import Callable, Optional
+from services.model_router import restart_stream
+from utils.retry_policy import with_retry_policy
 
 logger = logging.getLogger(__name__)
 
@@ -14,62 +15,80 @@ class ResearchService:
         # Default to http://localhost:3000 for development
         self.base_url = os.getenv("RESEARCH_API_URL", "http://localhost:3000/api/research")
         
-    @retry_with_backoff
     def get_research(
         self, 
         game_title: str, 
         prompt: str, 
-        model: str = "google__gemini-flash"
+        model: str = "google__gemini-flash",
+        on_token: Optional[Callable[[str], None]] = None
     ) -> Optional[str]:
         """
         Get research analysis for a given game title and prompt.
+
+        Falls back to OpenAI once the research service has failed for good:
+        after its retries, or while its circuit is open.
         
         Args:
             game_title: The name of the game to research
             prompt: Specific research prompt/question
             model: The AI model to use (defaults to gpt-4o)
+            on_token: Read the report as it is sent, calling this with each chunk of text
             
         Returns:
             HTML formatted research report or None if the request fails
         """
         try:
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {self.api_key}' if self.api_key else None
-            }
-            
-            # Remove None values from headers
-            headers = {k: v for k, v in headers.items() if v is not None}
-            
-            payload = {
-                'query': game_title + ' ttrpg',
-                'prompt': prompt,
-                'model': model
-            }
-            
-            # For development, disable SSL verification if using localhost
-            verify_ssl = not self.base_url.startswith('http://localhost')
-            
-            response = requests.post(
-                self.base_url,
-                headers=headers,
-                json=payload,
-                verify=verify_ssl
-            )
-            response.raise_for_status()
-            
-            return response.text
-            
-        except requests.exceptions.SSLError as e:
-            logger.error(f"SSL Error connecting to research service: {str(e)}")
-            # Fallback to OpenAI service
-            from services.openai_service import OpenAIService
-            openai = OpenAIService()
-            return openai.get_ttrpg_full_text(game_title, prompt)
-            
+            return self._request_research(game_title, prompt, model, on_token)
         except Exception as e:
             logger.error(f"Error getting research for {game_title}: {str(e)}")
             # Fallback to OpenAI service
             from services.openai_service import OpenAIService
             openai = OpenAIService()
-            return openai.get_ttrpg_full_text(game_title, prompt) 
\ No newline at end of file
+            return openai.get_ttrpg_full_text(game_title, prompt, on_token)
+
+    @with_retry_policy('research')
+    def _request_research(
+        self,
+        game_title: str,
+        prompt: str,
+        model: str,
+        on_token: Optional[Callable[[str], None]]
+    ) -> str:
+        """Call the research API once; errors are left to the retry policy."""
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.api_key}' if self.api_key else None
+        }
+        
+        # Remove None values from headers
+        headers = {k: v for k, v in headers.items() if v is not None}
+        
+        payload = {
+            'query': game_title + ' ttrpg',
+            'prompt': prompt,
+            'model': model
+        }
+        
+        # For development, disable SSL verification if using localhost
+        verify_ssl = not self.base_url.startswith('http://localhost')
+        
+        response = requests.post(
+            self.base_url,
+            headers=headers,
+            json=payload,
+            verify=verify_ssl,
+            stream=bool(on_token)
+        )
+        response.raise_for_status()
+
+        if on_token:
+            restart_stream(on_token)
+            response.encoding = response.encoding or 'utf-8'
+            parts = []
+            for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                if chunk:
+                    parts.append(chunk)
+                    on_token(chunk)
+            return ''.join(parts)
+        
+        return response.text
@@ -0,0 +1,174 @@
+import json
+import math
+import os
+import threading
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from services.model_router import model_router
+from utils.title_index import normalize_title
+
+logger = logging.getLogger(__name__)
+
+# Generated columns (COLUMN_MAPPING names) checked for missing content
+CONTENT_COLUMNS = [
+    'summary', 'full_text', 'category', 'potential_categories',
+    'related_games', 'reviewSummary', 'reviewsUrl'
+]
+
+# Sheet columns, by header name, that scoring reads besides the content columns
+SCORE_COLUMNS = ['title', 'Rank', 'isTopRated', 'premium']
+
+# Score weights; a game with every field missing outranks any complete game
+MISSING_WEIGHT = 100.0
+TOP_RATED_WEIGHT = 15.0
+PREMIUM_WEIGHT = 10.0
+RANK_WEIGHT = 10.0
+STALENESS_WEIGHT = 20.0
+
+
+def _is_true(value: Any) -> bool:
+    return str(value or '').strip().upper() == 'TRUE'
+
+
+class PriorityScheduler:
+    """
+    Orders games so the most valuable ones are processed first.
+
+    Each game is scored from the sheet: fields still missing for the
+    selected column(s), Rank (1 is the most important), isTopRated, premium
+    and how long ago this tool last regenerated it. When each game was last
+    processed is kept in a small local history file, since the sheet has no
+    timestamp column; games with no history count as fully stale.
+    """
+
+    def __init__(
+        self,
+        column: Optional[str] = None,
+        history_path: str = 'schedule_history.json',
+        stale_after_days: float = 90.0
+    ):
+        self.fields = [column] if column else CONTENT_COLUMNS
+        self.history_path = history_path
+        self.stale_after = stale_after_days * 86400
+        self._history: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(history_path):
+            with open(history_path) as f:
+                self._history = json.load(f)
+
+    @staticmethod
+    def load_records(sheets_service) -> List[Any]:
+        """
+        Read only the columns scoring needs, for every game.
+
+        Score columns missing from the header are skipped and count as empty
+        for every game, so an older sheet still schedules.
+        """
+        mapping = sheets_service.COLUMN_MAPPING
+        # A game has related games when the first related title is filled in
+        positions = {column: mapping[column] for column in CONTENT_COLUMNS if column != 'related_games'}
+        positions['related_games'] = mapping['related_games'][0]
+        header = sheets_service.get_header()
+        missing = [column for column in SCORE_COLUMNS if column != 'title' and column not in header]
+        if missing:
+            logger.warning(f"Sheet has no {', '.join(missing)} column(s); scoring without them")
+        columns = [column for column in SCORE_COLUMNS if column not in missing]
+        return sheets_service.get_records(columns + CONTENT_COLUMNS, positions=positions)
+
+    def score(self, record: Any, now: Optional[float] = None) -> float:
+        """Priority of one game; higher is processed first."""
+        missing = sum(1 for field in self.fields if not str(record.get(field, '') or '').strip())
+        score = MISSING_WEIGHT * missing / len(self.fields)
+
+        if _is_true(record.get('isTopRated')):
+            score += TOP_RATED_WEIGHT
+        if _is_true(record.get('premium')):
+            score += PREMIUM_WEIGHT
+
+        try:
+            rank = float(record.get('Rank') or 0)
+        except ValueError:
+            rank = 0
+        if rank >= 1:
+            score += RANK_WEIGHT / math.log2(rank + 1)
+
+        last_processed = self._history.get(normalize_title(str(record.get('title', ''))))
+        age = (now or time.time()) - last_processed if last_processed else self.stale_after
+        score += STALENESS_WEIGHT * min(age / self.stale_after, 1.0)
+        return score
+
+    def order(self, titles: List[str], records: List[Any]) -> List[str]:
+        """
+        Sort titles by priority, highest first.
+
+        Args:
+            titles: Games to schedule
+            records: Sheet records with the scoring columns; titles without one keep a zero score
+        """
+        now = time.time()
+        scores = {normalize_title(str(record.get('title', ''))): self.score(record, now) for record in records}
+        # sorted() is stable, so equal scores keep sheet order
+        return sorted(titles, key=lambda title: -scores.get(normalize_title(title), 0.0))
+
+    def mark_processed(self, title: str) -> None:
+        """Record that a game was just regenerated."""
+        with self._lock:
+            self._history[normalize_title(title)] = time.time()
+            tmp_path = self.history_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._history, f)
+            os.replace(tmp_path, self.history_path)
+
+
+class RunBudget:
+    """
+    Wall-clock and spend limits for a run.
+
+    Before each game the budget checks whether another game, at the average
+    time and cost of the games processed so far, still fits, so a run stops
+    between games instead of overrunning. The cost check also reserves the
+    average cost of the games still running on other workers.
+    """
+
+    def __init__(self, time_budget: Optional[float] = None, cost_budget: Optional[float] = None):
+        """
+        Args:
+            time_budget: Seconds the run may take
+            cost_budget: USD of model calls the run may spend, as tracked by the model router
+        """
+        self.time_budget = time_budget
+        self.cost_budget = cost_budget
+        self.started = time.time()
+        self.start_cost = model_router.cost
+
+    @property
+    def elapsed(self) -> float:
+        return time.time() - self.started
+
+    @property
+    def spent(self) -> float:
+        return model_router.cost - self.start_cost
+
+    def exhausted(self, processed: int, in_flight: int = 0) -> Optional[str]:
+        """
+        Check whether the next game would exceed the budget.
+
+        Args:
+            processed: Games finished so far in this run
+            in_flight: Games started but not finished yet
+
+        Returns:
+            The reason to stop, or None to continue
+        """
+        if self.time_budget is not None:
+            started = processed + in_flight
+            average = self.elapsed / started if started else 0.0
+            if self.elapsed + average > self.time_budget:
+                return f"time budget of {self.time_budget:.0f}s reached ({self.elapsed:.0f}s elapsed)"
+        if self.cost_budget is not None:
+            # Games in flight have only spent part of their cost so far
+            average = self.spent / processed if processed else 0.0
+            if self.spent + average * (in_flight + 1) > self.cost_budget:
+                return f"cost budget of ${self.cost_budget:.2f} reached (${self.spent:.2f} spent)"
+        return None
@@ -6,6 +6,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from typing import List, Dict
 import time
+from utils.profiling import profile_stage
 
 class ScraperService:
     def __init__(self):
@@ -90,6 +91,7 @@ class ScraperService:
         finally:
             self.close_driver()
 
+    @profile_stage('parse html')
     def get_visible_text(self, html_content):
         """Extract visible text from HTML content."""
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -2,15 +2,19 @@ import requests
 import logging
 from typing import Optional
 import os
+from utils.retry_policy import with_retry_policy
+from utils.concurrency import single_flight
+from utils.title_index import normalize_title
 
 class SerperService:
     """Service to interact with Serper API for retrieving URLs."""
     
     def __init__(self):
         self.api_key = os.getenv("SERPER_API_KEY")  # Ensure you have this in your .env file
-        self.base_url = "https://google.serper.dev/search"
+        self.base_url = os.getenv("SERPER_API_URL", "https://google.serper.dev/search")
         self.logger = logging.getLogger(__name__)
 
+    @with_retry_policy('serper')
     def search(self, query):
         headers = {
             'X-API-KEY': self.api_key,
@@ -18,22 +22,15 @@ class SerperService:
         }
         payload = {'q': query}
         response = requests.post(self.base_url, headers=headers, json=payload)
+        response.raise_for_status()
         return response.json() 
 
+    # Duplicate titles processed at the same time share one lookup
+    @single_flight('serper', key=lambda self, title: normalize_title(title))
     def get_drivethrurpg_url(self, title: str) -> Optional[str]:
         """Fetch the DriveThruRPG URL for a given game title."""
         try:
-            headers = {
-                'X-API-KEY': self.api_key,
-                'Content-Type': 'application/json'
-            }
-            payload = {
-                'q': f"{title} site:drivethrurpg.com"
-            }
-            response = requests.post(self.base_url, headers=headers, json=payload)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self.search(f"{title} site:drivethrurpg.com")
             # print("serper data", data)
             # Assuming the first result is the most relevant
             if data and "organic" in data and len(data["organic"]) > 0:
@@ -0,0 +1,285 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from services.sheets_service import SheetsService, StaleRowError
+from utils.title_index import normalize_title
+
+logger = logging.getLogger(__name__)
+
+# update_google_sheet arguments written for each specific_column
+COLUMN_FIELDS = {
+    'summary': ('summary',),
+    'full_text': ('full_text',),
+    'category': ('category',),
+    'potential_categories': ('potential_categories',),
+    'related_games': ('related_data',),
+    'reviewSummary': ('review_summary', 'reviews_url'),
+    'reviewsUrl': ('review_summary', 'reviews_url'),
+}
+
+
+class SheetWriteBehind:
+    """
+    Write-behind buffer for spreadsheet updates.
+
+    Generated rows are submitted to a bounded queue and return immediately; a
+    background thread collects rows for `flush_interval` seconds after the
+    first one arrives (or until `max_batch` are waiting) and writes them with
+    one batch_update plus one append_rows request. Cells whose value is
+    already in the sheet are dropped after one bulk read of the affected rows.
+    With the default settings a busy run flushes at most ~30 times a minute,
+    inside the Sheets per-user quota.
+
+    Every submitted row is first appended to a local journal and only removed
+    once it has been written. A failed flush is retried with backoff, up to
+    `max_flush_attempts` times; meanwhile new rows wait in the bounded queue,
+    so submit() blocks during an outage instead of buffering without limit.
+    Rows still unwritten after the last attempt, or buffered when the process
+    dies, are replayed the next time a writer starts.
+
+    Set `on_written` to be called with each title once its row is in the sheet.
+    """
+
+    def __init__(
+        self,
+        sheets_service=SheetsService,
+        max_pending: int = 100,
+        max_batch: int = 50,
+        flush_interval: float = 2.0,
+        journal_path: str = 'pending_sheet_writes.jsonl',
+        max_flush_attempts: int = 4,
+        retry_delay: float = 5.0
+    ):
+        self.sheets_service = sheets_service
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        self.max_flush_attempts = max_flush_attempts
+        self.retry_delay = retry_delay
+        # Rows of a failed flush waiting for their retry, and when it is due
+        self._failed: List[int] = []
+        self._failures = 0
+        self._retry_at = 0.0
+        self._queue: "queue.Queue[int]" = queue.Queue(maxsize=max_pending)
+        self._unflushed: Dict[int, Dict[str, Any]] = {}
+        self._next_seq = 0
+        self._journal_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.flushed_rows = 0
+        self.on_written: Optional[Callable[[str], None]] = None
+
+        self._replay_journal()
+        self._thread = threading.Thread(target=self._run, name='sheet-write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _replay_journal(self) -> None:
+        """Requeue rows left in the journal by an earlier run."""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path) as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        if entries:
+            logger.info(f"Replaying {len(entries)} unwritten spreadsheet updates from {self.journal_path}")
+        for entry in entries:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._unflushed[seq] = entry
+        self._rewrite_journal()
+
+    def _rewrite_journal(self) -> None:
+        with self._journal_lock:
+            if not self._unflushed:
+                if os.path.exists(self.journal_path):
+                    os.remove(self.journal_path)
+                return
+            tmp_path = self.journal_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                for entry in self._unflushed.values():
+                    f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.journal_path)
+
+    def submit(self, **update) -> None:
+        """
+        Queue a row update; takes the same keyword arguments as
+        SheetsService.update_google_sheet. Blocks when the buffer is full.
+        """
+        with self._journal_lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._unflushed[seq] = update
+            with open(self.journal_path, 'a') as f:
+                f.write(json.dumps(update) + '\n')
+        self._queue.put(seq)
+
+    def _drain(self) -> List[int]:
+        """
+        Wait for the first pending row, then keep collecting rows until
+        flush_interval has passed since it or max_batch rows are taken.
+        Once the writer is closing, only rows already queued are taken.
+        """
+        seqs = []
+        try:
+            seqs.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return seqs
+        deadline = time.monotonic() + self.flush_interval
+        while len(seqs) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0 or self._stop.is_set():
+                    seqs.append(self._queue.get_nowait())
+                else:
+                    seqs.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return seqs
+
+    @staticmethod
+    def _coalesce(updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge updates for the same title; later non-empty values win.
+
+        Updates of different columns become one update of just those columns,
+        so a game that isn't in the sheet yet is appended once, not once per
+        column.
+        """
+        merged: Dict[Any, Dict[str, Any]] = {}
+        for update in updates:
+            column = update.get('specific_column')
+            if column and column not in COLUMN_FIELDS:
+                # Left alone so plan_row_update rejects it on its own
+                merged[(normalize_title(update['game_name']), column)] = dict(update)
+                continue
+            if column:
+                # Keep only the values this column writes
+                update = {
+                    'game_name': update['game_name'],
+                    'specific_column': column,
+                    **{field: update[field] for field in COLUMN_FIELDS[column] if field in update},
+                }
+            key = normalize_title(update['game_name'])
+            if key not in merged:
+                merged[key] = dict(update)
+                continue
+            entry = merged[key]
+            if entry.get('specific_column') != column:
+                # Only the columns with values are written once specific_column is cleared
+                entry['specific_column'] = None
+            entry.update({k: v for k, v in update.items() if v and k not in ('game_name', 'specific_column')})
+        return list(merged.values())
+
+    def _flush(self, seqs: List[int]) -> None:
+        with self._journal_lock:
+            updates = [self._unflushed[seq] for seq in seqs]
+
+        worksheet = self.sheets_service.get_worksheet()
+        updates = self._coalesce(updates)
+        for attempt in range(2):
+            cell_updates, new_rows, written_titles, row_titles = self._plan(worksheet, updates)
+            try:
+                cell_updates = self.sheets_service.drop_unchanged(worksheet, cell_updates, row_titles)
+                break
+            except StaleRowError as e:
+                # The index was refreshed; a second mismatch fails the flush, which is retried
+                if attempt:
+                    raise
+                logger.warning(f"{e}; planning again")
+        self.sheets_service.apply_row_updates(worksheet, cell_updates, new_rows)
+        self.flushed_rows += len(seqs)
+        logger.info(f"Wrote {len(seqs)} updates to the spreadsheet ({len(cell_updates)} cells, {len(new_rows)} new rows)")
+
+        with self._journal_lock:
+            for seq in seqs:
+                self._unflushed.pop(seq, None)
+        self._rewrite_journal()
+
+        if self.on_written:
+            for title in dict.fromkeys(written_titles):
+                try:
+                    self.on_written(title)
+                except Exception as e:
+                    logger.warning(f"Error recording write of {title}: {e}")
+
+    def _plan(self, worksheet, updates: List[Dict[str, Any]]) -> Tuple[List[Tuple[int, int, Any]], List[List[Any]], List[str], Dict[int, str]]:
+        """Plan coalesced updates: cell updates, new rows, planned titles and each updated row's title."""
+        cell_updates = []
+        new_rows = []
+        written_titles = []
+        row_titles = {}
+        for update in updates:
+            try:
+                cells, new_row = self.sheets_service.plan_row_update(worksheet=worksheet, **update)
+            except ValueError as e:
+                logger.error(f"Dropping spreadsheet update for {update.get('game_name')}: {e}")
+                continue
+            cell_updates.extend(cells)
+            row_titles.update((row, update['game_name']) for row, _, _ in cells)
+            if new_row:
+                new_rows.append(new_row)
+            written_titles.append(update['game_name'])
+        return cell_updates, new_rows, written_titles, row_titles
+
+    def _run(self) -> None:
+        # Rows replayed from the journal are written first
+        with self._journal_lock:
+            replayed = list(self._unflushed)
+        if replayed:
+            self._flush_safely(replayed)
+
+        while not (self._stop.is_set() and self._queue.empty() and not self._failed):
+            if self._failed:
+                # Newer rows stay queued behind the failed ones so an older value never
+                # overwrites a newer one, and submit() blocks once the queue is full
+                wait = self._retry_at - time.monotonic()
+                if wait > 0:
+                    time.sleep(min(wait, self.flush_interval))
+                    continue
+                seqs, self._failed = self._failed, []
+            else:
+                seqs = self._drain()
+            if seqs:
+                self._flush_safely(seqs)
+
+    def _flush_safely(self, seqs: List[int]) -> None:
+        try:
+            self._flush(seqs)
+            self._failures = 0
+        except Exception as e:
+            self._failures += 1
+            if self._failures >= self.max_flush_attempts:
+                # Rows stay in the journal and are retried on the next start
+                self._failures = 0
+                logger.error(f"Error flushing {len(seqs)} spreadsheet updates, kept in {self.journal_path}: {e}")
+                return
+            delay = self.retry_delay * 2 ** (self._failures - 1)
+            logger.warning(f"Error flushing {len(seqs)} spreadsheet updates, retrying in {delay:.0f}s "
+                           f"(attempt {self._failures + 1}/{self.max_flush_attempts}): {e}")
+            self._failed = seqs
+            self._retry_at = time.monotonic() + delay
+
+    @property
+    def pending(self) -> int:
+        """Rows submitted but not yet written (including failed flushes)."""
+        return len(self._unflushed)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flush everything still buffered and stop the background thread."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        start = time.time()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Spreadsheet writer still flushing after {time.time() - start:.0f}s; "
+                           f"unwritten rows are kept in {self.journal_path}")
+        elif self._unflushed:
+            logger.warning(f"{len(self._unflushed)} spreadsheet updates could not be written, "
+                           f"kept in {self.journal_path} for the next run")
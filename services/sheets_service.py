@@ -1,20 +1,72 @@
 import gspread
+from gspread.utils import rowcol_to_a1
 import logging
-import time
-from typing import List, Dict, Optional, Any, Tuple
-from config.constants import SERVICE_ACCOUNT_FILE
-from utils.decorators import retry_with_backoff
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config.constants import SERVICE_ACCOUNT_FILE, SHEETS_REQUESTS_PER_MINUTE
+from utils.retry_policy import with_retry_policy
+from utils.concurrency import TokenBucket, get_limiter, single_flight
+from utils.title_index import TitleIndex, normalize_title
 
 # Set up logging
 logging.basicConfig(format='%(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+class StaleRowError(Exception):
+    """Raised when rows no longer hold the games the title index placed there."""
+
+    def __init__(self, titles: List[str]):
+        super().__init__(f"Rows of {', '.join(titles)} moved since the title index was read")
+        self.titles = titles
+
+
+class SheetRecord:
+    """
+    Compact read-only row holding only the projected columns.
+
+    Values live in one tuple per row and the column -> position map is shared
+    by every record from the same read. Supports the dict-style access
+    (`record['title']`, `record.get('Category', '')`) that code written
+    against get_all_records() uses.
+    """
+
+    __slots__ = ('_columns', '_values')
+
+    def __init__(self, columns: Dict[str, int], values: Tuple[str, ...]):
+        self._columns = columns
+        self._values = values
+
+    def __getitem__(self, key: str) -> str:
+        return self._values[self._columns[key]]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        index = self._columns.get(key)
+        return self._values[index] if index is not None else default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._columns
+
+    def keys(self) -> List[str]:
+        return list(self._columns)
+
+    def __repr__(self) -> str:
+        return f"SheetRecord({dict(zip(self._columns, self._values))})"
+
 class SheetsService:
     """Service class for handling Google Sheets operations."""
     
-    # Add rate limiting constants
-    MIN_TIME_BETWEEN_REQUESTS = 3.0  # seconds
-    _last_request_time = 0
+    # Shared title -> row number index, built from column A on first use
+    _title_index: Optional[TitleIndex] = None
+
+    # Header row (column names), read once for projected reads
+    _header: Optional[List[str]] = None
+
+    # Keeps request rate under the per-minute quota, shared by every instance
+    _pacer = TokenBucket(SHEETS_REQUESTS_PER_MINUTE)
+
+    # Opens the spreadsheet instead of gspread when set, e.g. by the load-test
+    # harness to point at a local Sheets stand-in
+    spreadsheet_opener: Optional[Callable[[], Any]] = None
 
     # Column mappings for the spreadsheet
     COLUMN_MAPPING = {
@@ -35,8 +87,7 @@ class SheetsService:
     def worksheet(self):
         if not self._worksheet:
             self._rate_limit()
-            gc = gspread.service_account(filename=SERVICE_ACCOUNT_FILE)
-            self._worksheet = gc.open("TTRPG Directory").sheet1
+            self._worksheet = self.open_spreadsheet().sheet1
         return self._worksheet
         
     @property
@@ -47,43 +98,269 @@ class SheetsService:
 
     @classmethod
     def _rate_limit(cls):
-        """Ensure minimum time between API requests."""
-        current_time = time.time()
-        time_since_last_request = current_time - cls._last_request_time
-        if time_since_last_request < cls.MIN_TIME_BETWEEN_REQUESTS:
-            sleep_time = cls.MIN_TIME_BETWEEN_REQUESTS - time_since_last_request + 0.1  # Added 0.1s buffer
-            time.sleep(sleep_time)
-        cls._last_request_time = time.time()
+        """
+        Pace requests to the per-minute quota and hold off while Sheets is backing off after a 429.
+
+        The token bucket enforces SHEETS_REQUESTS_PER_MINUTE; the 'sheets'
+        concurrency limiter, fed by the retry-policy-wrapped methods, adds
+        backoff when Sheets still answers 429.
+        """
+        get_limiter('sheets').wait_until_ready()
+        cls._pacer.acquire()
+
+    @classmethod
+    def open_spreadsheet(cls):
+        """Open the TTRPG Directory spreadsheet."""
+        if cls.spreadsheet_opener:
+            return cls.spreadsheet_opener()
+        gc = gspread.service_account(filename=SERVICE_ACCOUNT_FILE)
+        return gc.open("TTRPG Directory")
 
     @classmethod
     def get_worksheet(cls):
         """Get the main worksheet from the TTRPG Directory spreadsheet."""
         cls._rate_limit()
-        gc = gspread.service_account(filename=SERVICE_ACCOUNT_FILE)
-        return gc.open("TTRPG Directory").sheet1
+        return cls.open_spreadsheet().sheet1
+
+    @classmethod
+    def get_title_index(cls, worksheet=None, refresh: bool = False) -> TitleIndex:
+        """
+        Get the shared index of normalized titles to row numbers.
+
+        Built from one read of column A and reused by every lookup until
+        `refresh` is requested.
+        """
+        if cls._title_index is None or refresh:
+            worksheet = worksheet or cls.get_worksheet()
+            titles = worksheet.col_values(1)  # Column A contains titles
+            cls._title_index = TitleIndex(
+                (title, row) for row, title in enumerate(titles, start=1) if row > 1 and title.strip()
+            )
+        return cls._title_index
+
+    @classmethod
+    def find_row(cls, game_name: str, worksheet=None, fuzzy: bool = True) -> Optional[int]:
+        """
+        Find the row number for a game title.
+
+        Matches on the normalized title first, then fuzzily unless `fuzzy` is
+        off. A miss re-reads column A once in case another process added the
+        game since the index was built.
+
+        Fuzzy matching is only for reads: "Alien" is close enough to "Aliens"
+        to look up notes, but writing with it would overwrite another game's
+        row, so writes always match exactly.
+        """
+        row_index = cls.get_title_index(worksheet).get(game_name, fuzzy=fuzzy)
+        if row_index is None:
+            row_index = cls.get_title_index(worksheet, refresh=True).get(game_name, fuzzy=fuzzy)
+        return row_index
 
     @staticmethod
     def _format_page_name(game_name: str) -> str:
         """Format game name for page URL."""
         return ''.join(e.lower() for e in game_name if e.isalnum())
 
+    @staticmethod
+    def _related_games_values(related_data: List[Dict]) -> List[str]:
+        """Flatten related games into the 12 title/imgUrl/page/blurb cell values."""
+        values = []
+        for game_index in range(3):
+            game = related_data[game_index] if game_index < len(related_data) else {}
+            values.extend(game.get(field, '') for field in ('title', 'imgUrl', 'page', 'blurb'))
+        return values
+
     @classmethod
-    def _update_related_games(cls, worksheet, row_index: int, related_data: List[Dict], columns: List[int]):
-        """Update related games data in the worksheet."""
-        for i, col in enumerate(columns):
-            cls._rate_limit()  # Add rate limiting for each cell update
-            game_index = i // 4
-            field_index = i % 4
-            value = ''
-            if game_index < len(related_data):
-                if field_index == 0: value = related_data[game_index]['title']
-                elif field_index == 1: value = related_data[game_index]['imgUrl']
-                elif field_index == 2: value = related_data[game_index]['page']
-                elif field_index == 3: value = related_data[game_index]['blurb']
-            worksheet.update_cell(row_index, col, value)
+    def plan_row_update(
+        cls,
+        game_name: str,
+        summary: Optional[str] = None,
+        full_text: Optional[str] = None,
+        category: Optional[str] = None,
+        potential_categories: Optional[str] = None,
+        review_summary: Optional[str] = None,
+        reviews_url: Optional[str] = None,
+        related_data: Optional[List[Dict]] = None,
+        specific_column: Optional[str] = None,
+        worksheet=None
+    ) -> Tuple[List[Tuple[int, int, Any]], Optional[List[Any]]]:
+        """
+        Work out the writes needed to store generated content for a game.
+
+        Returns:
+            Tuple of (cell updates as (row, col, value), new row to append or None)
+        """
+        if specific_column and specific_column not in cls.COLUMN_MAPPING:
+            raise ValueError(f"Invalid column name: {specific_column}")
+
+        values = {
+            'summary': summary,
+            'full_text': full_text,
+            'category': category,
+            'potential_categories': potential_categories,
+            'reviewSummary': review_summary,
+            'reviewsUrl': reviews_url,
+        }
+        row_index = cls.find_row(game_name, worksheet, fuzzy=False)
+
+        if not row_index:
+            logger.info(f"Adding new entry for {game_name}...")
+            page_name = cls._format_page_name(game_name)
+            new_row = [
+                game_name,              # title
+                '',                     # url
+                '',                     # imgUrl
+                page_name,              # page
+                reviews_url,            # reviewsUrl
+                review_summary,         # reviewSummary
+                summary,                # text
+                full_text,              # fullText
+                '',                     # notes
+                category,               # Category
+                potential_categories,   # Potential Categories
+                '',                     # Rank
+                True,                   # Hidden
+                False,                  # isFree
+                False,                  # isTopRated
+                True,                   # verified
+                False                   # premium
+            ]
+            if related_data:
+                first_related_col = cls.COLUMN_MAPPING['related_games'][0]
+                new_row.extend([''] * (first_related_col - 1 - len(new_row)))
+                new_row.extend(cls._related_games_values(related_data))
+            return [], new_row
+
+        logger.info(f"Updating existing entry for {game_name}...")
+        if specific_column == 'related_games':
+            columns = [] if not related_data else ['related_games']
+        elif specific_column in ['reviewSummary', 'reviewsUrl']:
+            # Update both review-related columns together
+            columns = ['reviewSummary', 'reviewsUrl']
+        elif specific_column:
+            columns = [specific_column]
+        else:
+            # Update all provided columns
+            columns = list(values) + (['related_games'] if related_data else [])
+
+        updates = []
+        for col_name in columns:
+            if col_name == 'related_games':
+                updates.extend(
+                    (row_index, col, value)
+                    for col, value in zip(cls.COLUMN_MAPPING['related_games'], cls._related_games_values(related_data))
+                )
+            elif values[col_name]:
+                updates.append((row_index, cls.COLUMN_MAPPING[col_name], values[col_name]))
+        return updates, None
+
+    @classmethod
+    def _column_label(cls, col: int) -> str:
+        """Human-readable name of a mapped column for change listings."""
+        for name, mapped in cls.COLUMN_MAPPING.items():
+            if mapped == col:
+                return name
+            if isinstance(mapped, list) and col in mapped:
+                index = mapped.index(col)
+                field = ('title', 'imgUrl', 'page', 'blurb')[index % 4]
+                return f"related_{index // 4 + 1}_{field}"
+        return rowcol_to_a1(1, col).rstrip('1')
+
+    @classmethod
+    @with_retry_policy('sheets')
+    def get_rows(cls, worksheet, row_indices: List[int]) -> Dict[int, List[str]]:
+        """Read several whole rows with a single batch request."""
+        row_indices = sorted(set(row_indices))
+        if not row_indices:
+            return {}
+        cls._rate_limit()
+        ranges = worksheet.batch_get([f"{row}:{row}" for row in row_indices])
+        return {
+            row: (values[0] if values else [])
+            for row, values in zip(row_indices, ranges)
+        }
+
+    @classmethod
+    def drop_unchanged(
+        cls,
+        worksheet,
+        updates: List[Tuple[int, int, Any]],
+        titles: Optional[Dict[int, str]] = None
+    ) -> List[Tuple[int, int, Any]]:
+        """
+        Filter out cell updates whose value already matches the sheet.
+
+        The affected rows are fetched with one bulk read, so a refresh where
+        most generated values are unchanged sends only the cells that differ.
+
+        Args:
+            worksheet: The directory worksheet
+            updates: Planned (row, col, value) updates
+            titles: Title each updated row should hold, by row number. Row
+                numbers come from a title index read earlier in the run; if
+                rows were inserted or sorted since, column A no longer matches.
+
+        Raises:
+            StaleRowError: A row holds another title. Nothing should be
+                written; the index has been refreshed, so plan again.
+        """
+        if not updates:
+            return updates
+        current_rows = cls.get_rows(worksheet, [row for row, _, _ in updates])
+        if titles:
+            moved = sorted({
+                titles[row] for row in {row for row, _, _ in updates}
+                if row in titles and normalize_title(str((current_rows.get(row) or [''])[0])) != normalize_title(titles[row])
+            })
+            if moved:
+                cls.get_title_index(worksheet, refresh=True)
+                raise StaleRowError(moved)
+        changed = []
+        for row, col, value in updates:
+            current = current_rows.get(row, [])
+            current_value = current[col - 1] if col - 1 < len(current) else ''
+            if str(current_value).strip() != str(value if value is not None else '').strip():
+                changed.append((row, col, value))
+        skipped = len(updates) - len(changed)
+        if skipped:
+            logger.info(f"Skipping {skipped} unchanged cells")
+        return changed
+
+    @classmethod
+    def describe_changes(cls, updates: List[Tuple[int, int, Any]], new_rows: List[List[Any]]) -> List[str]:
+        """Describe planned writes, one line per cell or new row."""
+        def preview(value):
+            text = str(value).replace('\n', ' ')
+            return text if len(text) <= 80 else text[:77] + '...'
+
+        lines = [f"  row {row} {cls._column_label(col)}: {preview(value)}" for row, col, value in updates]
+        lines.extend(f"  new row: {row[0]}" for row in new_rows)
+        return lines
+
+    @classmethod
+    @with_retry_policy('sheets')
+    def apply_row_updates(cls, worksheet, updates: List[Tuple[int, int, Any]], new_rows: List[List[Any]]) -> None:
+        """
+        Write planned cell updates and new rows with one request each.
+
+        Replaces per-cell update_cell calls, so a full row refresh costs one
+        write request instead of up to 18 rate-limited ones.
+        """
+        if updates:
+            cls._rate_limit()
+            worksheet.batch_update(
+                [{'range': rowcol_to_a1(row, col), 'values': [[value]]} for row, col, value in updates],
+                value_input_option='USER_ENTERED'
+            )
+        if new_rows:
+            width = len(worksheet.row_values(1))
+            padded = [row + [''] * (width - len(row)) for row in new_rows]
+            cls._rate_limit()
+            worksheet.append_rows(padded, value_input_option='USER_ENTERED')
+            # Pick up the row numbers of the appended games
+            cls.get_title_index(worksheet, refresh=True)
 
     @classmethod
-    @retry_with_backoff
     def update_google_sheet(
         cls,
         game_name: str,
@@ -94,7 +371,8 @@ class SheetsService:
         review_summary: Optional[str] = None,
         reviews_url: Optional[str] = None,
         related_data: Optional[List[Dict]] = None,
-        specific_column: Optional[str] = None
+        specific_column: Optional[str] = None,
+        dry_run: bool = False
     ) -> bool:
         """
         Update or create an entry in the Google Sheet.
@@ -109,115 +387,42 @@ class SheetsService:
             reviews_url: Reviews URL
             related_data: Related games information
             specific_column: Specific column to update (if any)
+            dry_run: Print the planned changes instead of writing them
         
         Returns:
             bool: Success status
         """
         try:
             worksheet = cls.get_worksheet()
-            titles = worksheet.col_values(1)  # Column A contains titles
-            
-            row_index = next(
-                (i for i, title in enumerate(titles, start=1) 
-                 if title.lower() == game_name.lower()),
-                None
-            )
-            
-            if row_index:
-                logger.info(f"Updating existing entry for {game_name}...")
-                if specific_column:
-                    if specific_column not in cls.COLUMN_MAPPING:
-                        raise ValueError(f"Invalid column name: {specific_column}")
-                    
-                    if specific_column == 'related_games' and related_data:
-                        cls._update_related_games(
-                            worksheet, 
-                            row_index, 
-                            related_data, 
-                            cls.COLUMN_MAPPING['related_games']
-                        )
-                    elif specific_column in ['reviewSummary', 'reviewsUrl']:
-                        # Update both review-related columns together
-                        if review_summary:
-                            worksheet.update_cell(
-                                row_index,
-                                cls.COLUMN_MAPPING['reviewSummary'],
-                                review_summary
-                            )
-                        if reviews_url:
-                            worksheet.update_cell(
-                                row_index,
-                                cls.COLUMN_MAPPING['reviewsUrl'],
-                                reviews_url
-                            )
-                    else:
-                        value = locals()[specific_column]
-                        if value:
-                            worksheet.update_cell(
-                                row_index, 
-                                cls.COLUMN_MAPPING[specific_column], 
-                                value
-                            )
+            for attempt in range(2):
+                updates, new_row = cls.plan_row_update(
+                    game_name,
+                    summary=summary,
+                    full_text=full_text,
+                    category=category,
+                    potential_categories=potential_categories,
+                    review_summary=review_summary,
+                    reviews_url=reviews_url,
+                    related_data=related_data,
+                    specific_column=specific_column,
+                    worksheet=worksheet
+                )
+                try:
+                    updates = cls.drop_unchanged(worksheet, updates, {row: game_name for row, _, _ in updates})
+                    break
+                except StaleRowError as e:
+                    if attempt:
+                        raise
+                    logger.warning(f"{e}; planning again")
+            new_rows = [new_row] if new_row else []
+            if dry_run:
+                changes = cls.describe_changes(updates, new_rows)
+                if changes:
+                    print(f"Planned changes for {game_name}:\n" + '\n'.join(changes))
                 else:
-                    # Update all provided columns
-                    for col_name, col_var in [
-                        ('summary', summary),
-                        ('full_text', full_text),
-                        ('category', category),
-                        ('potential_categories', potential_categories),
-                        ('reviewsUrl', reviews_url)
-                    ]:
-                        if col_var:
-                            worksheet.update_cell(
-                                row_index, 
-                                cls.COLUMN_MAPPING[col_name], 
-                                col_var
-                            )
-                    if related_data:
-                        cls._update_related_games(
-                            worksheet, 
-                            row_index, 
-                            related_data, 
-                            cls.COLUMN_MAPPING['related_games']
-                        )
-            else:
-                logger.info(f"Adding new entry for {game_name}...")
-                page_name = cls._format_page_name(game_name)
-                new_row = [
-                    game_name,              # title
-                    '',                     # url
-                    '',                     # imgUrl
-                    page_name,              # page
-                    reviews_url,            # reviewsUrl
-                    review_summary,         # reviewSummary
-                    summary,                # text
-                    full_text,              # fullText
-                    '',                     # notes
-                    category,               # Category
-                    potential_categories,   # Potential Categories
-                    '',                     # Rank
-                    True,                   # Hidden
-                    False,                  # isFree
-                    False,                  # isTopRated
-                    True,                   # verified
-                    False                   # premium
-                ]
-                
-                # Pad the row to match all columns
-                while len(new_row) < len(worksheet.row_values(1)):
-                    new_row.append('')
-                
-                worksheet.append_row(new_row)
-                row_index = len(worksheet.col_values(1))
-                
-                if related_data:
-                    cls._update_related_games(
-                        worksheet, 
-                        row_index, 
-                        related_data, 
-                        cls.COLUMN_MAPPING['related_games']
-                    )
-            
+                    print(f"No changes for {game_name}")
+                return True
+            cls.apply_row_updates(worksheet, updates, new_rows)
             return True
             
         except Exception as e:
@@ -225,9 +430,83 @@ class SheetsService:
             return False
 
     @classmethod
-    def get_all_games(cls) -> List[Dict[str, Any]]:
-        """Get all games from the worksheet."""
+    def get_header(cls, worksheet=None, refresh: bool = False) -> List[str]:
+        """Get the column names from the first row."""
+        if cls._header is None or refresh:
+            worksheet = worksheet or cls.get_worksheet()
+            cls._rate_limit()
+            cls._header = worksheet.row_values(1)
+        return cls._header
+
+    @classmethod
+    @with_retry_policy('sheets')
+    def get_columns(
+        cls,
+        columns: List[str],
+        worksheet=None,
+        positions: Optional[Dict[str, int]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Read only the named columns, for every data row, in one batch request.
+
+        Args:
+            columns: Column names from the header row
+            worksheet: Worksheet to read (opened if omitted)
+            positions: Fixed 1-based column numbers for names that aren't
+                (or aren't uniquely) in the header, e.g. from COLUMN_MAPPING
+
+        Returns:
+            Mapping of column name to its values, all padded to the same length
+        """
+        worksheet = worksheet or cls.get_worksheet()
+        positions = dict(positions or {})
+        header = cls.get_header(worksheet) if any(name not in positions for name in columns) else []
+        missing = [name for name in columns if name not in positions and name not in header]
+        if missing:
+            raise ValueError(f"Unknown column(s): {', '.join(missing)}")
+        for name in columns:
+            if name not in positions:
+                positions[name] = header.index(name) + 1
+
+        letters = [rowcol_to_a1(1, positions[name])[:-1] for name in columns]
+        cls._rate_limit()
+        ranges = worksheet.batch_get([f"{letter}2:{letter}" for letter in letters], major_dimension='COLUMNS')
+        values = [value_range[0] if value_range else [] for value_range in ranges]
+        row_count = max((len(column) for column in values), default=0)
+        return {
+            name: column + [''] * (row_count - len(column))
+            for name, column in zip(columns, values)
+        }
+
+    @classmethod
+    def get_records(
+        cls,
+        columns: List[str],
+        worksheet=None,
+        positions: Optional[Dict[str, int]] = None
+    ) -> List[SheetRecord]:
+        """Read only the named columns and return one compact record per titled row."""
+        if 'title' not in columns:
+            columns = ['title'] + list(columns)
+        data = cls.get_columns(columns, worksheet, positions)
+        index = {name: i for i, name in enumerate(columns)}
+        return [
+            SheetRecord(index, row)
+            for row in zip(*(data[name] for name in columns))
+            if row[index['title']].strip()
+        ]
+
+    @classmethod
+    def get_all_games(cls, columns: Optional[List[str]] = None) -> List[Any]:
+        """
+        Get all games from the worksheet.
+
+        Args:
+            columns: Only read these columns (returns SheetRecords); reads every column if omitted
+        """
         worksheet = cls.get_worksheet()
+        if columns:
+            return cls.get_records(columns, worksheet)
         return worksheet.get_all_records()
 
     def get_notes(self, game_name: str) -> Optional[str]:
@@ -236,11 +515,11 @@ class SheetsService:
         
         # Find the row for the game
         try:
-            cell = worksheet.find(game_name)
-            if cell:
+            row_index = self.find_row(game_name, worksheet)
+            if row_index:
                 # Assuming notes are in a specific column, e.g., column J (10)
                 notes_col = 10  # Adjust this to match your actual notes column
-                notes = worksheet.cell(cell.row, notes_col).value
+                notes = worksheet.cell(row_index, notes_col).value
                 return notes if notes else None
         except Exception as e:
             logger.debug(f"Could not find notes for {game_name}: {str(e)}")
@@ -251,23 +530,27 @@ class SheetsService:
         worksheet = self.get_worksheet()
         # Find the row with the matching title
         try:
-            cell = worksheet.find(title)
-            if cell:
+            row_index = self.find_row(title, worksheet)
+            if row_index:
                 # Get the URL from column B in the same row
-                return worksheet.cell(cell.row, 2).value
+                return worksheet.cell(row_index, 2).value
         except:
             return None
         return None
 
     @classmethod
-    @retry_with_backoff
+    @single_flight('categories', key=lambda cls: cls)
+    @with_retry_policy('sheets')
     def get_categories(cls):
-        """Get categories from the Categories worksheet."""
+        """
+        Get categories from the Categories worksheet.
+
+        Concurrent callers (each OpenAIService loads the lists on creation)
+        share one read.
+        """
         try:
             cls._rate_limit()
-            gc = gspread.service_account(filename=SERVICE_ACCOUNT_FILE)
-            spreadsheet = gc.open("TTRPG Directory")
-            categories_sheet = spreadsheet.worksheet("categories")
+            categories_sheet = cls.open_spreadsheet().worksheet("categories")
             
             records = categories_sheet.get_all_records()
             genres = []
@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+import requests
+from utils.concurrency import get_limiter
+
+try:
+    import zstandard
+except ImportError:  # gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+HTML = 'html'
+MARKDOWN = 'markdown'
+
+
+class Snapshot(NamedTuple):
+    url: str
+    fetched_at: float
+    digest: str
+    kind: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class SnapshotStore:
+    """
+    Compressed, content-addressed store of fetched pages.
+
+    Page bodies are stored once per distinct content under their SHA-256
+    (zstd-compressed when the zstandard package is installed, gzip
+    otherwise), and a SQLite index records every fetch of a URL with its
+    time, kind ('html' for Selenium page source, 'markdown' for crawl4ai
+    output) and the ETag/Last-Modified validators the server sent. Keeping
+    the raw fetch lets extraction be rerun offline after a parsing fix.
+    """
+
+    def __init__(self, root: str = 'snapshots', revalidate_timeout: float = 10.0):
+        self.root = root
+        self.revalidate_timeout = revalidate_timeout
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                digest TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS snapshots_url ON snapshots (url, fetched_at)')
+        self._conn.commit()
+
+    def _object_path(self, digest: str, codec: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], f"{digest}.{codec}")
+
+    def _write_object(self, digest: str, data: bytes) -> None:
+        for codec in ('zst', 'gz'):
+            if os.path.exists(self._object_path(digest, codec)):
+                return  # Same content was already stored
+        codec = 'zst' if zstandard else 'gz'
+        path = self._object_path(digest, codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = zstandard.ZstdCompressor(level=10).compress(data) if zstandard else gzip.compress(data, 9)
+        # A temp file per writer, so threads and processes storing the same page don't collide
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _read_object(self, digest: str) -> Optional[str]:
+        path = self._object_path(digest, 'zst')
+        if os.path.exists(path):
+            if not zstandard:
+                raise ImportError("The zstandard package is required to read .zst snapshots: pip install zstandard")
+            with open(path, 'rb') as f:
+                return zstandard.ZstdDecompressor().decompress(f.read()).decode('utf-8')
+        path = self._object_path(digest, 'gz')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return gzip.decompress(f.read()).decode('utf-8')
+        return None
+
+    def put(
+        self,
+        url: str,
+        content: str,
+        kind: str,
+        validators: Optional[Dict[str, Optional[str]]] = None
+    ) -> Snapshot:
+        """
+        Store a fetched page.
+
+        Args:
+            url: Page URL
+            content: Page body (HTML or markdown)
+            kind: HTML or MARKDOWN
+            validators: 'etag' and 'last_modified' from the server, if known
+        """
+        data = content.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        self._write_object(digest, data)
+        validators = validators or {}
+        snapshot = Snapshot(url, time.time(), digest, kind, validators.get('etag'), validators.get('last_modified'))
+        with self._lock:
+            self._conn.execute('INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?)', snapshot)
+            self._conn.commit()
+        return snapshot
+
+    def latest(self, url: str) -> Optional[Snapshot]:
+        """The most recent snapshot of a URL."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM snapshots WHERE url = ? ORDER BY fetched_at DESC LIMIT 1', (url,)
+            ).fetchone()
+        return Snapshot(*row) if row else None
+
+    def history(self, url: str) -> List[Snapshot]:
+        """Every snapshot of a URL, oldest first."""
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM snapshots WHERE url = ? ORDER BY fetched_at', (url,)).fetchall()
+        return [Snapshot(*row) for row in rows]
+
+    def content(self, snapshot: Snapshot) -> Optional[str]:
+        return self._read_object(snapshot.digest)
+
+    def revalidate(self, url: str) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Ask the server whether the latest snapshot of a URL is still current.
+
+        Sends a conditional GET with If-None-Match/If-Modified-Since and
+        closes the connection without reading the body. It holds a slot of
+        the 'drivethrurpg' limiter like the fetch itself. A URL with no
+        snapshot is not requested at all: there is nothing to reuse.
+
+        Returns:
+            None if the snapshot is still current (304). Otherwise the
+            server's current validators, to store with the new fetch;
+            empty when there is no snapshot, or the server sends none or
+            can't be reached.
+        """
+        snapshot = self.latest(url)
+        if snapshot is None:
+            return {}
+        headers = {}
+        if snapshot.etag:
+            headers['If-None-Match'] = snapshot.etag
+        if snapshot.last_modified:
+            headers['If-Modified-Since'] = snapshot.last_modified
+        try:
+            with get_limiter('drivethrurpg').slot(), \
+                    requests.get(url, headers=headers, timeout=self.revalidate_timeout, stream=True) as response:
+                if response.status_code == 304:
+                    logger.info(f"Snapshot of {url} from {time.ctime(snapshot.fetched_at)} is still current")
+                    return None
+                return {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+        except requests.RequestException as e:
+            logger.debug(f"Could not revalidate {url}: {e}")
+            return {}
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# config.constants creates an OpenAI client at import time
+if not os.environ.get('OPENAI_API_KEY'):
+    os.environ['OPENAI_API_KEY'] = 'test'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
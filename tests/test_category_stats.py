@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from services.category_stats import CategoryStats
+from services.model_router import model_router
+from services.openai_service import OpenAIService
+
+TAXONOMY = ['Fantasy', 'Horror', 'Science Fiction', 'Dungeon Crawl', 'Investigation', 'Space Opera', 'Western']
+
+
+@pytest.fixture
+def stats():
+    return CategoryStats.from_rows([
+        {'title': 'Knave', 'Category': 'Fantasy; Dungeon Crawl', 'Potential Category': 'Old-School'},
+        {'title': 'Cairn', 'Category': 'Fantasy; Dungeon Crawl', 'Potential Category': 'Old-School; Folk'},
+        {'title': 'Mothership', 'Category': 'Science Fiction; Horror', 'Potential Category': 'Space Horror'},
+        {'title': 'Alien', 'Category': 'Science Fiction; Horror; Investigation', 'Potential Category': ''},
+    ], TAXONOMY)
+
+
+@pytest.fixture
+def service():
+    service = OpenAIService.__new__(OpenAIService)
+    service.categories = TAXONOMY
+    return service
+
+
+def test_set_game_replaces_a_row(stats):
+    stats.set_game('Knave', ['Western'])
+    assert stats.game_categories('knave') == ['Western']
+    assert stats.candidate_categories(['Fantasy']) == ['Dungeon Crawl']
+
+
+def test_candidates_follow_cooccurrence(stats):
+    assert stats.candidate_categories(['Science Fiction'])[:1] == ['Horror']
+    assert stats.candidate_tags(['Fantasy']) == ['Old-School', 'Folk']
+
+
+def test_batch_context_shares_one_shortlist(stats):
+    shared, per_game = stats.batch_prompt_context({
+        'Knave': stats.game_categories('Knave'),
+        'Mothership': stats.game_categories('Mothership'),
+    })
+    assert 'Fantasy; Dungeon Crawl' in shared or 'Dungeon Crawl; Fantasy' in shared
+    assert 'Western' not in shared
+    assert per_game == {'Knave': 'Old-School; Folk', 'Mothership': 'Space Horror'}
+
+
+def test_batch_prompt_sends_the_shortlist_instead_of_the_taxonomy(stats, service, monkeypatch):
+    sent = []
+
+    def complete(task, messages, **kwargs):
+        sent.append(messages)
+        return json.dumps({'games': [{'id': 0, 'suggestions': ['Fantasy', 'Hexcrawl']}]})
+
+    monkeypatch.setattr(model_router, 'complete', complete)
+    shared, per_game = stats.batch_prompt_context({'Knave': stats.game_categories('Knave')})
+    result = service.get_potential_categories_batch(['Knave'], shared, per_game)
+
+    system, user = (message['content'] for message in sent[0])
+    assert 'Western' not in system + user
+    assert '0. Knave [Old-School; Folk]' in user
+    # An existing category in the answer is still dropped
+    assert result == {'Knave': 'Hexcrawl'}
+
+
+def test_batch_prompt_without_stats_lists_the_taxonomy(service, monkeypatch):
+    sent = []
+    monkeypatch.setattr(model_router, 'complete', lambda task, messages, **kwargs: sent.append(messages) or '{"games": []}')
+    service.get_potential_categories_batch(['Knave'])
+    assert 'Western' in sent[0][0]['content']
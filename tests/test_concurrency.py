@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from utils.concurrency import AdaptiveLimiter, SingleFlight
+
+
+def run_together(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight('test')
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return 'page'
+
+    threads = run_together(4, lambda: results.append(flight.do('key', fetch)))
+    while flight.coalesced < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ['page'] * 4
+
+
+def test_waiters_get_the_leaders_exception():
+    flight = SingleFlight('test')
+    release = threading.Event()
+    errors = []
+
+    def fetch():
+        release.wait(5)
+        raise ValueError('down')
+
+    def call():
+        try:
+            flight.do('key', fetch)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = run_together(3, call)
+    while flight.coalesced < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 3
+    assert len(set(map(id, errors))) == 1
+
+
+def test_results_are_not_cached():
+    flight = SingleFlight('test')
+    calls = []
+    assert flight.do('key', lambda: calls.append(1) or len(calls)) == 1
+    assert flight.do('key', lambda: calls.append(1) or len(calls)) == 2
+    assert flight.coalesced == 0
+
+
+def test_failed_call_is_run_again():
+    flight = SingleFlight('test')
+    with pytest.raises(RuntimeError):
+        flight.do('key', lambda: (_ for _ in ()).throw(RuntimeError('boom')))
+    assert flight.do('key', lambda: 'ok') == 'ok'
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight('test')
+    assert flight.do('a', lambda: 'a') == 'a'
+    assert flight.do('b', lambda: 'b') == 'b'
+
+
+def test_mixed_task_latencies_do_not_throttle():
+    limiter = AdaptiveLimiter('test', initial_limit=4)
+    for _ in range(200):
+        for task, latency in (('category', 0.5), ('full_text', 8.0), ('extract_reviews', 4.0)):
+            limiter.in_flight = int(limiter.limit)
+            limiter.release(latency, task=task)
+    assert limiter.limit > 4
+
+
+def test_slow_task_trims_the_limit():
+    limiter = AdaptiveLimiter('test', initial_limit=8)
+    for _ in range(20):
+        limiter.in_flight = int(limiter.limit)
+        limiter.release(0.5, task='category')
+    grown = limiter.limit
+    limiter._last_decrease = -1e9
+    for _ in range(20):
+        limiter.in_flight = 1
+        limiter.release(2.5, task='category')
+        limiter._last_decrease = -1e9
+    assert limiter.limit < grown
+
+
+def test_overload_halves_the_limit():
+    limiter = AdaptiveLimiter('test', initial_limit=8)
+    limiter.in_flight = 1
+    limiter.release(0.1, overloaded=True, pause=0.01)
+    assert limiter.limit == 4
@@ -0,0 +1,63 @@
+import os
+
+from services.export_service import ExportService, page_inputs, render_page
+
+
+def page(title, summary='A game.'):
+    return page_inputs({'title': title, 'summary': summary}, [])
+
+
+def test_page_slug_is_safe():
+    assert page_inputs({'title': 'Mörk Borg', 'page': '../Mork Borg'}, [])['page'] == 'morkborg'
+
+
+def test_render_page_escapes_and_has_no_h1():
+    html = render_page(page('Mothership', '<script>'))
+    assert '&lt;script&gt;' in html
+    assert '<h1>' not in html
+
+
+def test_export_renders_only_changed_pages(tmp_path):
+    service = ExportService(str(tmp_path), workers=1)
+    assert service.export([page('Alpha'), page('Beta')]) == {'written': 2, 'unchanged': 0, 'removed': 0}
+    assert service.export([page('Alpha'), page('Beta', 'Changed.')]) == {'written': 1, 'unchanged': 1, 'removed': 0}
+    assert 'Changed.' in (tmp_path / 'beta.html').read_text()
+
+
+def test_export_rewrites_missing_pages(tmp_path):
+    service = ExportService(str(tmp_path), workers=1)
+    service.export([page('Alpha')])
+    os.remove(tmp_path / 'alpha.html')
+    assert service.export([page('Alpha')])['written'] == 1
+    assert (tmp_path / 'alpha.html').exists()
+
+
+def test_export_removes_pages_of_removed_games(tmp_path):
+    service = ExportService(str(tmp_path), workers=1)
+    service.export([page('Alpha'), page('Beta')])
+    assert service.export([page('Alpha')])['removed'] == 1
+    assert not (tmp_path / 'beta.html').exists()
+
+
+def test_full_rebuild_renders_everything_and_still_removes(tmp_path):
+    service = ExportService(str(tmp_path), workers=1)
+    service.export([page('Alpha'), page('Beta')])
+    counts = service.export([page('Alpha')], full_rebuild=True)
+    assert counts == {'written': 1, 'unchanged': 0, 'removed': 1}
+    assert not (tmp_path / 'beta.html').exists()
+
+
+def test_duplicate_slugs_get_numbered_pages(tmp_path):
+    service = ExportService(str(tmp_path), workers=1)
+    pages = [page('Alpha', 'First.'), page('alpha', 'Second.'), page('Alpha-2'), page('ALPHA', 'Third.')]
+    assert service.export(pages)['written'] == 4
+    assert 'First.' in (tmp_path / 'alpha.html').read_text()
+    assert 'Second.' in (tmp_path / 'alpha-3.html').read_text()
+    assert 'Third.' in (tmp_path / 'alpha-4.html').read_text()
+    assert (tmp_path / 'alpha-2.html').exists()
+
+
+def test_pages_without_a_slug_are_skipped_with_a_warning(tmp_path, caplog):
+    service = ExportService(str(tmp_path), workers=1)
+    assert service.export([page('Alpha'), page('!!!')])['written'] == 1
+    assert 'no page name' in caplog.text
@@ -0,0 +1,38 @@
+import pytest
+
+from services.prompt_builder import PromptBudget, PromptBudgetError, count_tokens
+
+BUDGETS = {'task': {'total': 100}}
+CATEGORIES = ', '.join(f"Category {i}" for i in range(200))
+
+
+def test_prompt_within_budget_is_unchanged():
+    prompt = "Summarize this game.\nNotes: short"
+    assert PromptBudget('task', BUDGETS).check(prompt) == prompt
+
+
+def test_long_line_is_trimmed_to_fit():
+    prompt = f"Pick a category for this game.\nCategories: {CATEGORIES}\nAnswer with one category."
+    trimmed = PromptBudget('task', BUDGETS).check(prompt)
+
+    assert count_tokens(trimmed) <= 100
+    assert trimmed.startswith("Pick a category for this game.\nCategories: Category 0")
+    assert trimmed.endswith("\nAnswer with one category.")
+
+
+def test_prompt_that_cannot_fit_raises():
+    prompt = '\n'.join(f"Instruction number {i} of many." for i in range(100))
+    with pytest.raises(PromptBudgetError):
+        PromptBudget('task', BUDGETS).check(prompt)
+
+
+def test_messages_trim_the_longest_message():
+    messages = [
+        {'role': 'system', 'content': "You sort tabletop games into categories."},
+        {'role': 'user', 'content': f"Categories: {CATEGORIES}"},
+    ]
+    checked = PromptBudget('task', BUDGETS).check_messages(messages)
+
+    assert checked[0] == messages[0]
+    assert count_tokens('\n'.join(message['content'] for message in checked)) <= 100
+    assert messages[1]['content'] == f"Categories: {CATEGORIES}"
@@ -0,0 +1,105 @@
+import sqlite3
+import time
+
+import pytest
+
+from services.queue_service import LeaseHeartbeat, SQLiteWorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteWorkQueue(str(tmp_path / 'queue.db'), lease_seconds=60, max_attempts=2)
+
+
+def expire_leases(queue):
+    queue._conn.execute("UPDATE jobs SET lease_expires = 0 WHERE status = 'leased'")
+
+
+def test_enqueue_skips_titles_already_queued(queue):
+    assert queue.enqueue(['Mothership', 'Mork Borg']) == 2
+    assert queue.enqueue(['Mothership']) == 0
+    assert queue.status()['pending'] == 2
+
+
+def test_enqueue_requeues_finished_items(queue):
+    queue.enqueue(['Mothership'])
+    queue.ack(queue.lease('w1'))
+    assert queue.enqueue(['Mothership']) == 1
+    assert queue.lease('w1').attempts == 1
+
+
+def test_lease_ack(queue):
+    queue.enqueue(['Mothership'], column='summary')
+    item = queue.lease('w1')
+    assert (item.title, item.column, item.attempts, item.lease_owner) == ('Mothership', 'summary', 1, 'w1')
+    assert queue.lease('w2') is None
+    assert queue.ack(item)
+    assert queue.status()['done'] == 1
+
+
+def test_fail_requeues_then_parks(queue):
+    queue.enqueue(['Mothership'])
+    assert queue.fail(queue.lease('w1'), 'boom')
+    assert queue.status()['pending'] == 1
+    assert queue.fail(queue.lease('w1'), 'boom again')
+    assert queue.status()['failed'] == 1
+    assert queue.lease('w1') is None
+
+
+def test_expired_lease_cannot_be_acked_by_its_old_owner(queue):
+    queue.enqueue(['Mothership'])
+    stale = queue.lease('w1')
+    expire_leases(queue)
+    current = queue.lease('w2')
+    assert current.attempts == 2
+
+    assert not queue.ack(stale)
+    assert not queue.fail(stale, 'late failure')
+    assert queue.status()['leased'] == 1
+    assert queue.ack(current)
+    assert queue.status()['done'] == 1
+
+
+def test_lease_expiring_at_max_attempts_is_parked(queue):
+    queue.enqueue(['Mothership'])
+    queue.lease('w1')
+    expire_leases(queue)
+    queue.lease('w2')
+    expire_leases(queue)
+
+    assert queue.lease('w3') is None
+    assert queue.status()['failed'] == 1
+    error, = queue._conn.execute('SELECT last_error FROM jobs').fetchone()
+    assert error == 'Lease expired after 2 attempts'
+
+
+def test_does_not_use_wal(queue):
+    mode, = sqlite3.connect(queue.path).execute('PRAGMA journal_mode').fetchone()
+    assert mode == 'delete'
+
+
+def test_extend_lease_keeps_the_item(queue):
+    queue.enqueue(['Mothership'])
+    item = queue.lease('w1')
+    expire_leases(queue)
+    assert queue.extend_lease(item)
+    assert queue.lease('w2') is None
+    assert queue.ack(item)
+
+
+def test_lost_lease_cannot_be_extended(queue):
+    queue.enqueue(['Mothership'])
+    stale = queue.lease('w1')
+    expire_leases(queue)
+    queue.lease('w2')
+    assert not queue.extend_lease(stale)
+
+
+def test_heartbeat_extends_lease_while_working(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / 'queue.db'), lease_seconds=0.3)
+    queue.enqueue(['Mothership'])
+    item = queue.lease('w1')
+    with LeaseHeartbeat(queue, item, interval=0.05):
+        time.sleep(0.6)
+        assert queue.lease('w2') is None
+    assert queue.ack(item)
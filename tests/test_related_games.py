@@ -0,0 +1,52 @@
+from services.related_games_service import RelatedGamesGraph, RelatedGamesService
+
+GAMES = [
+    {'title': 'Knave', 'Category': 'Fantasy; OSR; Dungeon Crawl'},
+    {'title': 'Cairn', 'Category': 'Fantasy; OSR; Folk Horror'},
+    {'title': 'Into the Odd', 'Category': 'OSR; Weird; Industrial'},
+    {'title': 'Mothership', 'Category': 'Science Fiction; Horror; Survival'},
+    {'title': 'Alien', 'Category': 'Science Fiction; Horror; Investigation'},
+    {'title': 'Traveller', 'Category': 'Science Fiction; Space Opera; Sandbox'},
+]
+
+
+def titles(rows):
+    return [row['title'] for row in rows]
+
+
+def test_build_never_relates_a_game_to_itself():
+    graph = RelatedGamesGraph(GAMES, neighbors=2).build()
+    assert all(title not in titles(neighbors) for title, neighbors in graph.items())
+    assert set(titles(graph['Mothership'])) == {'Alien', 'Traveller'}
+
+
+def test_related_matches_build_for_catalog_games():
+    graph = RelatedGamesGraph(GAMES, neighbors=2)
+    built = graph.build()
+    for game in GAMES:
+        assert titles(graph.related(game['title'])) == titles(built[game['title']])
+
+
+def test_related_uses_the_given_categories():
+    graph = RelatedGamesGraph(GAMES, neighbors=1)
+    assert titles(graph.related('knave', ['Science Fiction', 'Space Opera'])) == ['Traveller']
+    # A game that isn't in the catalog yet
+    assert titles(graph.related('Electric Bastionland', ['OSR', 'Industrial'])) == ['Into the Odd']
+
+
+class FakeOpenAI:
+    def __init__(self):
+        self.pairs = []
+
+    def generate_relationship_blurb(self, title, other, categories):
+        self.pairs.append((title, other))
+        return f"{other} relates to {title}."
+
+
+def test_iter_related_data_keeps_catalog_order_with_workers():
+    openai = FakeOpenAI()
+    results = list(RelatedGamesService(openai, workers=4).iter_related_data(GAMES))
+    assert [title for title, _ in results] == titles(GAMES)
+    assert sorted(openai.pairs) == sorted((title, game['title']) for title, related in results for game in related)
+    title, related = results[0]
+    assert related[0]['blurb'] == f"{related[0]['title']} relates to Knave."
@@ -0,0 +1,34 @@
+import pytest
+import requests
+
+from services.openai_service import OpenAIService
+from services.research_service import ResearchService
+from utils.concurrency import AdaptiveLimiter
+from utils.retry_policy import CircuitBreaker, RetryBudget, get_policy
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    policy = get_policy('research')
+    monkeypatch.setattr(policy, 'breaker', CircuitBreaker('research', failure_threshold=3))
+    monkeypatch.setattr(policy, 'budget', RetryBudget())
+    monkeypatch.setattr(policy, 'limiter', AdaptiveLimiter('research'))
+    monkeypatch.setattr(policy, 'compute_delay', lambda attempt, error: 0)
+    monkeypatch.setattr(OpenAIService, '__init__', lambda self: None)
+    monkeypatch.setattr(OpenAIService, 'get_ttrpg_full_text', staticmethod(lambda *args: 'fallback'))
+    return policy
+
+
+def test_retries_the_research_api_before_falling_back(policy, monkeypatch):
+    calls = []
+
+    def post(*args, **kwargs):
+        calls.append(1)
+        raise requests.exceptions.ConnectionError('refused')
+
+    monkeypatch.setattr(requests, 'post', post)
+    assert ResearchService().get_research('Mothership', 'prompt') == 'fallback'
+    assert len(calls) == policy.max_attempts
+    # The failures reached the breaker: the next call skips the API
+    assert ResearchService().get_research('Mothership', 'prompt') == 'fallback'
+    assert len(calls) == policy.max_attempts
@@ -0,0 +1,198 @@
+import asyncio
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+from utils.concurrency import AdaptiveLimiter
+from utils.retry_policy import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    RetryPolicy,
+    get_retry_after,
+    is_retryable,
+)
+
+
+def http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.exceptions.HTTPError(f"HTTP {status}", response=response)
+
+
+def make_policy(breaker=None, budget=None, max_attempts=3):
+    policy = RetryPolicy(
+        'test',
+        max_attempts=max_attempts,
+        breaker=breaker or CircuitBreaker('test'),
+        budget=budget or RetryBudget(),
+        limiter=AdaptiveLimiter('test'),
+    )
+    policy.compute_delay = lambda attempt, error: 0
+    return policy
+
+
+def open_breaker(reset_timeout=60.0):
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+@pytest.mark.parametrize('error, retryable', [
+    (ConnectionError(), True),
+    (requests.exceptions.Timeout(), True),
+    (http_error(429), True),
+    (http_error(503), True),
+    (http_error(404), False),
+    (ValueError('bad page'), False),
+    (CircuitOpenError('test', 1.0), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) == retryable
+
+
+def test_retry_after_seconds_and_milliseconds():
+    assert get_retry_after(http_error(429, {'Retry-After': '7'})) == 7
+    assert get_retry_after(http_error(429, {'retry-after-ms': '1500', 'Retry-After': '7'})) == 1.5
+    assert get_retry_after(http_error(429)) is None
+    assert get_retry_after(ValueError()) is None
+
+
+def test_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    delay = get_retry_after(http_error(503, {'Retry-After': format_datetime(retry_at, usegmt=True)}))
+    assert 25 <= delay <= 30
+
+
+def test_compute_delay_honors_retry_after_up_to_max_delay():
+    policy = RetryPolicy('test', max_delay=10, breaker=CircuitBreaker('test'), limiter=AdaptiveLimiter('test'))
+    assert policy.compute_delay(1, http_error(429, {'Retry-After': '4'})) == 4
+    assert policy.compute_delay(1, http_error(429, {'Retry-After': '400'})) == 10
+
+
+def test_breaker_opens_after_threshold():
+    breaker = open_breaker()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_lets_one_trial_through_when_half_open():
+    breaker = open_breaker(reset_timeout=0)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = open_breaker(reset_timeout=0.05)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_retries_transient_errors_then_succeeds():
+    calls = []
+
+    @make_policy()
+    def call():
+        calls.append(1)
+        if len(calls) < 3:
+            raise http_error(503)
+        return 'ok'
+
+    assert call() == 'ok'
+    assert len(calls) == 3
+
+
+def test_fatal_error_is_not_retried_and_does_not_open_breaker():
+    breaker = CircuitBreaker('test', failure_threshold=1)
+    calls = []
+
+    @make_policy(breaker=breaker)
+    def call():
+        calls.append(1)
+        raise http_error(404)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        call()
+    assert len(calls) == 1
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_gives_up_after_max_attempts_and_opens_breaker():
+    breaker = CircuitBreaker('test', failure_threshold=2)
+    calls = []
+
+    @make_policy(breaker=breaker, max_attempts=2)
+    def call():
+        calls.append(1)
+        raise ConnectionError('down')
+
+    with pytest.raises(ConnectionError):
+        call()
+    assert len(calls) == 2
+    with pytest.raises(CircuitOpenError):
+        call()
+    assert len(calls) == 2
+
+
+def test_retry_budget_caps_retries():
+    budget = RetryBudget(ratio=0, min_tokens=1)
+    calls = []
+
+    @make_policy(budget=budget, max_attempts=5)
+    def call():
+        calls.append(1)
+        raise ConnectionError('down')
+
+    with pytest.raises(ConnectionError):
+        call()
+    # The first attempt plus the one retry the budget had tokens for
+    assert len(calls) == 2
+
+
+def test_interrupted_trial_frees_the_breaker():
+    breaker = open_breaker(reset_timeout=0)
+
+    @make_policy(breaker=breaker)
+    def call(interrupt):
+        if interrupt:
+            raise KeyboardInterrupt
+        return 'ok'
+
+    with pytest.raises(KeyboardInterrupt):
+        call(True)
+    assert call(False) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_async_trial_frees_the_breaker():
+    breaker = open_breaker(reset_timeout=0)
+
+    @make_policy(breaker=breaker)
+    async def call(delay):
+        await asyncio.sleep(delay)
+        return 'ok'
+
+    async def run():
+        task = asyncio.ensure_future(call(10))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await call(0)
+
+    assert asyncio.run(run()) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,20 @@
+from services.model_router import model_router
+from services.scheduler import RunBudget
+
+
+def test_cost_budget_reserves_games_in_flight(monkeypatch):
+    monkeypatch.setattr(model_router, 'cost', 0.0)
+    budget = RunBudget(cost_budget=1.0)
+    model_router.cost = 0.4  # Two finished games at $0.20 each
+
+    assert budget.exhausted(2) is None
+    # Three more games running would bring the run to about $1.00, so a fourth must wait
+    assert budget.exhausted(2, in_flight=3) is not None
+    assert budget.exhausted(2, in_flight=1) is None
+
+
+def test_budget_without_finished_games_continues(monkeypatch):
+    monkeypatch.setattr(model_router, 'cost', 0.0)
+    budget = RunBudget(time_budget=3600, cost_budget=1.0)
+
+    assert budget.exhausted(0, in_flight=4) is None
@@ -0,0 +1,181 @@
+import json
+import time
+
+import pytest
+
+from services.sheet_writer import SheetWriteBehind
+
+
+class FakeSheets:
+    """Stands in for SheetsService: records planned rows and can fail flushes."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.planned = []
+        self.flushes = 0
+
+    def get_worksheet(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('Sheets unavailable')
+        return object()
+
+    def plan_row_update(self, worksheet=None, **update):
+        if update.get('specific_column') == 'bogus':
+            raise ValueError('Invalid column name: bogus')
+        self.planned.append(update)
+        return [(2, 7, update.get('summary'))], None
+
+    def drop_unchanged(self, worksheet, updates, titles=None):
+        return updates
+
+    def apply_row_updates(self, worksheet, updates, new_rows):
+        self.flushes += 1
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / 'pending.jsonl')
+
+
+def make_writer(sheets, journal, **kwargs):
+    kwargs.setdefault('flush_interval', 0.01)
+    kwargs.setdefault('retry_delay', 0.01)
+    return SheetWriteBehind(sheets, journal_path=journal, **kwargs)
+
+
+def test_coalesce_merges_columns_of_one_title():
+    merged = SheetWriteBehind._coalesce([
+        {'game_name': 'Mothership', 'summary': 'Old', 'category': 'Ignored', 'specific_column': 'summary'},
+        {'game_name': 'mothership', 'category': 'Horror', 'specific_column': 'category'},
+        {'game_name': 'Mothership', 'summary': 'New', 'specific_column': 'summary'},
+    ])
+    assert merged == [
+        {'game_name': 'Mothership', 'summary': 'New', 'category': 'Horror', 'specific_column': None},
+    ]
+
+
+def test_coalesce_keeps_a_single_column_update():
+    merged = SheetWriteBehind._coalesce([
+        {'game_name': 'Mothership', 'summary': 'Old', 'specific_column': 'summary'},
+        {'game_name': 'Mothership', 'summary': 'New', 'specific_column': 'summary'},
+    ])
+    assert merged == [{'game_name': 'Mothership', 'summary': 'New', 'specific_column': 'summary'}]
+
+
+def test_coalesce_does_not_blank_values():
+    merged = SheetWriteBehind._coalesce([
+        {'game_name': 'Mothership', 'summary': 'Kept', 'category': 'Horror'},
+        {'game_name': 'Mothership', 'summary': '', 'category': 'Sci-fi'},
+    ])
+    assert merged[0]['summary'] == 'Kept'
+    assert merged[0]['category'] == 'Sci-fi'
+
+
+def test_coalesce_keeps_invalid_columns_apart():
+    merged = SheetWriteBehind._coalesce([
+        {'game_name': 'Mothership', 'summary': 'New', 'specific_column': 'summary'},
+        {'game_name': 'Mothership', 'summary': 'Bad', 'specific_column': 'bogus'},
+    ])
+    assert len(merged) == 2
+
+
+def test_replayed_rows_are_written_once_per_title(journal):
+    # Rows in the journal are flushed together, so the merge doesn't depend on timing
+    with open(journal, 'w') as f:
+        f.write(json.dumps({'game_name': 'Mothership', 'summary': 'A', 'specific_column': 'summary'}) + '\n')
+        f.write(json.dumps({'game_name': 'Mothership', 'category': 'Horror', 'specific_column': 'category'}) + '\n')
+    sheets = FakeSheets()
+    writer = make_writer(sheets, journal)
+    writer.close(timeout=5)
+
+    assert sheets.planned == [
+        {'game_name': 'Mothership', 'summary': 'A', 'category': 'Horror', 'specific_column': None},
+    ]
+    assert writer.pending == 0
+
+
+def test_on_written_is_called_after_the_write(journal):
+    sheets = FakeSheets()
+    written = []
+    writer = make_writer(sheets, journal)
+    writer.on_written = lambda title: written.append((title, sheets.flushes))
+    writer.submit(game_name='Mothership', summary='A', specific_column='summary')
+    writer.close(timeout=5)
+
+    assert written == [('Mothership', 1)]
+
+
+def test_failed_flush_is_retried(journal):
+    sheets = FakeSheets(failures=2)
+    writer = make_writer(sheets, journal)
+    writer.submit(game_name='Mothership', summary='A', specific_column='summary')
+    writer.close(timeout=5)
+
+    assert sheets.flushes == 1
+    assert writer.pending == 0
+
+
+def test_rows_stay_in_journal_after_last_attempt_and_replay(journal):
+    writer = make_writer(FakeSheets(failures=10), journal, max_flush_attempts=2)
+    writer.submit(game_name='Mothership', summary='A', specific_column='summary')
+    writer.close(timeout=5)
+
+    assert writer.pending == 1
+    with open(journal) as f:
+        assert [json.loads(line)['game_name'] for line in f] == ['Mothership']
+
+    sheets = FakeSheets()
+    make_writer(sheets, journal).close(timeout=5)
+    assert [update['game_name'] for update in sheets.planned] == ['Mothership']
+
+
+def test_invalid_updates_are_dropped(journal):
+    sheets = FakeSheets()
+    writer = make_writer(sheets, journal)
+    writer.submit(game_name='Mothership', summary='A', specific_column='bogus')
+    writer.close(timeout=5)
+
+    assert sheets.planned == []
+    assert writer.pending == 0
+
+
+def test_rows_arriving_within_flush_interval_are_batched(journal):
+    sheets = FakeSheets()
+    writer = make_writer(sheets, journal, flush_interval=0.5)
+    for i in range(5):
+        writer.submit(game_name=f"Game {i}", summary='A', specific_column='summary')
+        time.sleep(0.05)
+    writer.close(timeout=5)
+
+    assert sheets.flushes == 1
+    assert len(sheets.planned) == 5
+
+
+def test_flush_is_not_delayed_past_max_batch(journal):
+    sheets = FakeSheets()
+    writer = make_writer(sheets, journal, flush_interval=1, max_batch=2)
+    writer.submit(game_name='Alpha', summary='A', specific_column='summary')
+    writer.submit(game_name='Beta', summary='B', specific_column='summary')
+    deadline = time.monotonic() + 2
+    while not sheets.flushes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sheets.flushes == 1
+    writer.close(timeout=5)
+
+
+def test_rows_queue_behind_a_failed_flush(journal):
+    sheets = FakeSheets(failures=1)
+    writer = make_writer(sheets, journal, retry_delay=0.3, max_pending=2)
+    writer.submit(game_name='Alpha', summary='A', specific_column='summary')
+    deadline = time.monotonic() + 2
+    while not writer._failed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # The failed row is held for its retry; newer rows wait in the bounded queue
+    writer.submit(game_name='Beta', summary='B', specific_column='summary')
+    writer.submit(game_name='Gamma', summary='C', specific_column='summary')
+    assert writer._failed and writer._queue.full()
+    writer.close(timeout=5)
+
+    assert [update['game_name'] for update in sheets.planned] == ['Alpha', 'Beta', 'Gamma']
+    assert writer.pending == 0
@@ -0,0 +1,17 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from services.snapshot_store import HTML, SnapshotStore
+
+
+def test_concurrent_writes_of_the_same_page(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    content = '<html>' + 'x' * 100_000 + '</html>'
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        snapshots = list(pool.map(lambda i: store.put('https://example.com/game', content, HTML), range(32)))
+
+    assert len({snapshot.digest for snapshot in snapshots}) == 1
+    assert store.content(snapshots[0]) == content
+    objects = [name for _, _, names in os.walk(tmp_path / 'objects') for name in names]
+    assert len(objects) == 1 and not objects[0].endswith('.tmp')
@@ -0,0 +1,87 @@
+import pytest
+
+from services.sheets_service import SheetsService, StaleRowError
+from utils.title_index import TitleIndex, normalize_title
+
+
+@pytest.mark.parametrize('title, expected', [
+    ('The One Ring', 'one ring'),
+    ('Sprawl, The', 'sprawl'),
+    ('Mörk Borg', 'mork borg'),
+    ('Blades & Black Powder', 'blades and black powder'),
+    ("Fate Core’s Toolkit", 'fate cores toolkit'),
+    ('  Call   of Cthulhu!  ', 'call of cthulhu'),
+])
+def test_normalize_title(title, expected):
+    assert normalize_title(title) == expected
+
+
+def test_exact_lookup_ignores_formatting():
+    index = TitleIndex([('The One Ring', 2), ('Mörk Borg', 3)])
+    assert index.get('one ring') == 2
+    assert index.get('MORK BORG', fuzzy=False) == 3
+    assert index.get_title('mork borg') == 'Mörk Borg'
+
+
+def test_first_title_wins():
+    index = TitleIndex([('Mothership', 2), ('mothership', 9)])
+    assert index.get('Mothership') == 2
+    assert len(index) == 1
+
+
+def test_fuzzy_lookup_only_when_enabled():
+    index = TitleIndex([('Call of Cthulhu', 2)])
+    assert index.get('Call of Chtulhu') == 2
+    assert index.get('Call of Chtulhu', fuzzy=False) is None
+
+
+def test_fuzzy_lookup_keeps_editions_apart():
+    index = TitleIndex([('Mothership 1e', 2)])
+    assert index.get('Mothership 2e') is None
+
+
+class FakeWorksheet:
+    def __init__(self, titles):
+        self.titles = titles
+
+    def col_values(self, col):
+        assert col == 1
+        return ['title'] + self.titles
+
+    def batch_get(self, ranges):
+        rows = [int(a1.split(':')[0]) for a1 in ranges]
+        return [[[self.titles[row - 2]]] if row - 2 < len(self.titles) else [] for row in rows]
+
+
+@pytest.fixture
+def worksheet(monkeypatch):
+    monkeypatch.setattr(SheetsService, '_title_index', None)
+    monkeypatch.setattr(SheetsService, '_rate_limit', classmethod(lambda cls: None))
+    return FakeWorksheet(['Aliens', 'The One Ring'])
+
+
+def test_find_row_reads_fuzzily(worksheet):
+    assert SheetsService.find_row('Alien', worksheet) == 2
+
+
+def test_plan_row_update_matches_exactly(worksheet):
+    updates, new_row = SheetsService.plan_row_update('One Ring, The', summary='Hobbits', worksheet=worksheet)
+    assert new_row is None
+    assert updates == [(3, SheetsService.COLUMN_MAPPING['summary'], 'Hobbits')]
+
+    # Close to "Aliens", but a different game: it gets its own row
+    updates, new_row = SheetsService.plan_row_update('Alien', summary='Xenomorphs', worksheet=worksheet)
+    assert updates == []
+    assert new_row[0] == 'Alien'
+
+
+def test_writes_are_refused_when_rows_moved(worksheet):
+    updates, _ = SheetsService.plan_row_update('The One Ring', summary='Hobbits', worksheet=worksheet)
+    # A row is inserted above the game after the index was read
+    worksheet.titles.insert(0, 'Mothership')
+    with pytest.raises(StaleRowError):
+        SheetsService.drop_unchanged(worksheet, updates, {row: 'The One Ring' for row, _, _ in updates})
+
+    # The index was refreshed, so planning again finds the new row
+    updates, _ = SheetsService.plan_row_update('The One Ring', summary='Hobbits', worksheet=worksheet)
+    assert SheetsService.drop_unchanged(worksheet, updates, {4: 'The One Ring'}) == [(4, 7, 'Hobbits')]
@@ -1,3 +1,29 @@
+from .concurrency import AdaptiveLimiter, SingleFlight, TokenBucket, coalesced_counts, get_limiter, single_flight
 from .decorators import retry_with_backoff
+from .profiling import profile_stage, start_profiling, stop_profiling
+from .retry_policy import (
+    CircuitOpenError,
+    RetryPolicy,
+    is_retryable,
+    with_retry_policy,
+)
+from .title_index import TitleIndex, normalize_title
 
-__all__ = ['retry_with_backoff']
\ No newline at end of file
+__all__ = [
+    'retry_with_backoff',
+    'with_retry_policy',
+    'RetryPolicy',
+    'CircuitOpenError',
+    'AdaptiveLimiter',
+    'get_limiter',
+    'TokenBucket',
+    'SingleFlight',
+    'single_flight',
+    'coalesced_counts',
+    'profile_stage',
+    'start_profiling',
+    'stop_profiling',
+    'is_retryable',
+    'TitleIndex',
+    'normalize_title',
+]
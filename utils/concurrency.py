@@ -0,0 +1,317 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from utils.profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+
+class _Baseline:
+    """Latency baseline of one task: the fastest call of the last window."""
+
+    __slots__ = ('value', 'window_min', 'window_count')
+
+    def __init__(self, latency: float):
+        self.value = latency
+        self.window_min = float('inf')
+        self.window_count = 0
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one external service.
+
+    Calls hold a slot while in flight and the number of slots adapts to what
+    the service is currently able to take:
+
+    - every call that succeeds with healthy latency adds 1/limit, so the limit
+      grows by about one per round of calls (additive increase)
+    - a 429 or timeout halves the limit and pauses new calls briefly, at most
+      once per round so one burst of failures counts as a single signal
+    - smoothed latency above `latency_tolerance` times the baseline (the
+      fastest recent round) trims the limit by 10% before the service starts
+      rejecting calls
+
+    Calls of one service can differ a lot in size (a one-line category answer
+    vs a full article), so each task keeps its own baseline and the limiter
+    smooths each call's latency relative to its task's baseline.
+
+    Slots are reentrant per thread, so a rate-limited method that calls
+    another method of the same service doesn't wait on itself.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        initial_limit: float = 4.0,
+        min_limit: float = 1.0,
+        max_limit: float = 64.0,
+        latency_tolerance: float = 2.0,
+        window: int = 50
+    ):
+        """
+        Args:
+            service: Service name used in log messages
+            initial_limit: Concurrent calls allowed before any feedback
+            min_limit: The limit never drops below this
+            max_limit: The limit never grows above this
+            latency_tolerance: Latency/baseline ratio treated as congestion
+            window: Calls per baseline window; a task's baseline is its fastest call of the last window
+        """
+        self.service = service
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.window = window
+        self.in_flight = 0
+        # Smoothed latency in seconds, and smoothed latency/baseline ratio
+        self.smoothed: Optional[float] = None
+        self.congestion: Optional[float] = None
+        self._baselines: Dict[Hashable, _Baseline] = {}
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._held = threading.local()
+        self._condition = threading.Condition()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(self.min_limit, int(self.limit)) and time.monotonic() >= self._paused_until
+
+    def acquire(self) -> None:
+        """Wait for a slot; pair with release(). Prefer slot() in synchronous code."""
+        with self._condition:
+            if not self._has_capacity():
+                # Time spent queued for a slot, told apart from the call itself when profiling
+                with profile_stage(f"{self.service} queue"):
+                    while not self._has_capacity():
+                        self._condition.wait(max(0.01, self._paused_until - time.monotonic()))
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        """Wait for a slot from a coroutine, polling instead of blocking the event loop."""
+        while True:
+            with self._condition:
+                if self._has_capacity():
+                    self.in_flight += 1
+                    return
+            await asyncio.sleep(0.05)
+
+    def release(self, latency: float, overloaded: bool = False, pause: float = 0.0, task: Hashable = None) -> None:
+        """
+        Return a slot and feed the call's outcome into the limit.
+
+        Args:
+            latency: Seconds the call took
+            overloaded: The service rejected the call (429) or timed out
+            pause: Seconds new calls should wait after an overload, e.g. from
+                Retry-After (defaults to the typical call latency)
+            task: Kind of call, for calls whose latency differs by kind; its
+                latency is compared with earlier calls of the same kind only
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._update(latency, overloaded, pause, task)
+            self._condition.notify_all()
+
+    def wait_until_ready(self) -> None:
+        """Block while the service is paused after an overload, without taking a slot."""
+        with self._condition:
+            while time.monotonic() < self._paused_until:
+                self._condition.wait(self._paused_until - time.monotonic())
+
+    def _baseline(self, task: Hashable, latency: float) -> float:
+        baseline = self._baselines.get(task)
+        if baseline is None:
+            baseline = self._baselines[task] = _Baseline(latency)
+        baseline.window_min = min(baseline.window_min, latency)
+        baseline.window_count += 1
+        if baseline.window_count >= self.window:
+            # Let the baseline follow the task when it gets slower for good
+            baseline.value = baseline.window_min
+            baseline.window_min, baseline.window_count = float('inf'), 0
+        baseline.value = min(baseline.value, latency)
+        return max(baseline.value, 0.001)
+
+    def _update(self, latency: float, overloaded: bool, pause: float, task: Hashable = None) -> None:
+        now = time.monotonic()
+        # Only one decrease per round trip, so simultaneous failures count once
+        can_decrease = now - self._last_decrease > (self.smoothed or latency)
+
+        if overloaded:
+            if can_decrease:
+                self._decrease(0.5, now, 'rate limited or timed out')
+            self._paused_until = max(self._paused_until, now + (pause or self.smoothed or 1.0))
+            return
+
+        self.smoothed = latency if self.smoothed is None else 0.8 * self.smoothed + 0.2 * latency
+        ratio = latency / self._baseline(task, latency)
+        self.congestion = ratio if self.congestion is None else 0.8 * self.congestion + 0.2 * ratio
+
+        if self.congestion > self.latency_tolerance:
+            if can_decrease:
+                self._decrease(0.9, now, f'latency {self.congestion:.1f}x baseline')
+        elif self.in_flight + 1 >= int(self.limit):
+            # Only grow while the current limit is actually being used
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _decrease(self, factor: float, now: float, reason: str) -> None:
+        previous = self.limit
+        self.limit = max(self.min_limit, self.limit * factor)
+        self._last_decrease = now
+        if int(previous) != int(self.limit):
+            logger.info(f"{self.service} concurrency {int(previous)} -> {int(self.limit)} ({reason})")
+
+    @contextmanager
+    def slot(self, classify: Optional[Callable[[BaseException], Tuple[bool, float]]] = None, task: Hashable = None):
+        """
+        Hold a slot around a block that makes one call.
+
+        Args:
+            classify: Maps an exception from the block to (overloaded, pause
+                seconds); by default only timeouts count as overload
+            task: Kind of call the latency baseline is kept for (see release())
+        """
+        depth = getattr(self._held, 'depth', 0)
+        self._held.depth = depth + 1
+        try:
+            if depth:
+                yield
+                return
+            self.acquire()
+            start = time.monotonic()
+            try:
+                yield
+            except BaseException as e:
+                overloaded, pause = classify(e) if classify else (isinstance(e, TimeoutError), 0.0)
+                self.release(time.monotonic() - start, overloaded, pause, task)
+                raise
+            self.release(time.monotonic() - start, task=task)
+        finally:
+            self._held.depth -= 1
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(service: str) -> AdaptiveLimiter:
+    """Get (or create) the shared concurrency limiter for a service."""
+    with _limiters_lock:
+        if service not in _limiters:
+            _limiters[service] = AdaptiveLimiter(service)
+        return _limiters[service]
+
+
+class TokenBucket:
+    """
+    Request pacing for a per-minute quota.
+
+    Tokens refill continuously at `per_minute / 60` per second up to `burst`;
+    each call takes one, waiting until it is available. Unlike the adaptive
+    limiter, which bounds calls in flight, this bounds the request rate, so it
+    keeps even a single worker under the quota before the first 429.
+    """
+
+    def __init__(self, per_minute: float, burst: float = 1.0):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance is this caller's place in line
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            with profile_stage('rate limit wait'):
+                time.sleep(wait)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Merges identical calls that are in flight at the same time.
+
+    The first caller for a key runs the call; callers arriving with the same
+    key before it finishes wait and receive its result (or its exception).
+    Nothing is cached: once the call returns, the next caller runs it again.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.coalesced = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+_flights: Dict[str, SingleFlight] = {}
+
+
+def single_flight(name: str, key: Optional[Callable[..., Hashable]] = None):
+    """
+    Decorator that merges concurrent identical calls into one.
+
+    Put it outside any retry decorator, so the shared call retries once on
+    behalf of every waiter.
+
+    Args:
+        name: Name the coalesced-call count is reported under
+        key: Maps the call's arguments to what makes two calls identical
+            (defaults to all positional and keyword arguments)
+    """
+    flight = _flights.setdefault(name, SingleFlight(name))
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return flight.do(call_key, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def coalesced_counts() -> Dict[str, int]:
+    """Calls that were answered by another in-flight call, by name."""
+    return {name: flight.coalesced for name, flight in _flights.items() if flight.coalesced}
@@ -0,0 +1,246 @@
+"""Per-stage timing and profiling for pipeline runs."""
+import cProfile
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# The active profiler; None while profiling is off
+_profiler: Optional['StageProfiler'] = None
+
+
+class _Frame:
+    __slots__ = ('name', 'path', 'wall', 'cpu', 'cprofile')
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        self.cprofile: Optional[cProfile.Profile] = None
+
+
+class StageTimes:
+    """Totals for one stage path."""
+
+    __slots__ = ('calls', 'wall', 'cpu')
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+
+class StageProfiler:
+    """
+    Stage timers plus a sampling (and optionally deterministic) profiler.
+
+    Every stage records wall and thread CPU time, so the gap is time spent
+    waiting on the network, sleeps and locks. A background thread samples
+    the stacks of threads inside a stage about every 10ms; that only reads
+    frames, so it costs around a percent and can stay on in production runs.
+    stop() writes to output_dir:
+
+        stages.txt          wall/CPU table per stage path
+        all.collapsed       sampled stacks for flamegraph.pl, speedscope or inferno
+        <stage>.collapsed   the samples taken inside each stage (innermost stage)
+        <stage>.prof        with deterministic=True, cProfile stats per stage
+
+    Deterministic profiling slows the run several times over, so it is for
+    short diagnostic runs. Only one cProfile profiler can be active per
+    process, so a stage that starts while another is being profiled is only
+    timed and sampled; from Python 3.12 cProfile also records other threads,
+    so run with one worker for clean .prof files.
+
+    Use start_profiling()/stop_profiling() rather than creating one directly,
+    so profile_stage finds it.
+    """
+
+    def __init__(self, output_dir: str, interval: float = 0.01, deterministic: bool = False):
+        """
+        Args:
+            output_dir: Directory the profiles are written to
+            interval: Seconds between stack samples
+            deterministic: Also run cProfile over stages and write a .prof per stage
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self.deterministic = deterministic
+        self.times: Dict[str, StageTimes] = defaultdict(StageTimes)
+        self.samples: Counter = Counter()
+        self.stats: Dict[str, pstats.Stats] = {}
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self._stacks: Dict[int, List[_Frame]] = {}
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name='stage-profiler', daemon=True)
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def enter(self, name: str) -> None:
+        stack = self._stacks.setdefault(threading.get_ident(), [])
+        frame = _Frame(name, f"{stack[-1].path}/{name}" if stack else name)
+        if self.deterministic and self._cprofile_lock.acquire(blocking=False):
+            frame.cprofile = cProfile.Profile()
+            try:
+                frame.cprofile.enable()
+            except ValueError:  # Another tool (a debugger, coverage) owns the profiling hook
+                frame.cprofile = None
+                self._cprofile_lock.release()
+        stack.append(frame)
+
+    def exit(self) -> None:
+        stack = self._stacks.get(threading.get_ident())
+        if not stack:
+            return
+        frame = stack.pop()
+        wall = time.perf_counter() - frame.wall
+        cpu = time.thread_time() - frame.cpu
+        if frame.cprofile:
+            frame.cprofile.disable()
+            self._cprofile_lock.release()
+        with self._lock:
+            times = self.times[frame.path]
+            times.calls += 1
+            times.wall += wall
+            times.cpu += cpu
+            if frame.cprofile:
+                if frame.name in self.stats:
+                    self.stats[frame.name].add(frame.cprofile)
+                else:
+                    self.stats[frame.name] = pstats.Stats(frame.cprofile)
+
+    def _sample_loop(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, stack in list(self._stacks.items()):
+                # Copy first: the owning thread may pop its last stage at any point
+                stack = list(stack)
+                if thread_id == own or not stack or thread_id not in frames:
+                    continue
+                stages = [f"[{frame.name}]" for frame in stack]
+                code = []
+                frame = frames[thread_id]
+                while frame is not None:
+                    code.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[';'.join(stages + code[::-1])] += 1
+            del frames
+
+    def stop(self) -> None:
+        """Stop sampling and write the profiles."""
+        self._stop.set()
+        self._sampler.join()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        with open(os.path.join(self.output_dir, 'stages.txt'), 'w') as f:
+            f.write(self.format_report() + '\n')
+
+        by_stage: Dict[str, Counter] = defaultdict(Counter)
+        with open(os.path.join(self.output_dir, 'all.collapsed'), 'w') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+                stages = [part for part in stack.split(';') if part.startswith('[')]
+                if stages:
+                    by_stage[stages[-1][1:-1]][stack] = count
+        for name, samples in by_stage.items():
+            with open(os.path.join(self.output_dir, f"{_file_name(name)}.collapsed"), 'w') as f:
+                for stack, count in sorted(samples.items()):
+                    f.write(f"{stack} {count}\n")
+        for name, stats in self.stats.items():
+            stats.dump_stats(os.path.join(self.output_dir, f"{_file_name(name)}.prof"))
+
+    def format_report(self) -> str:
+        wall = time.perf_counter() - self.started
+        cpu = time.process_time() - self.cpu_started
+        lines = [
+            f"Run: {wall:.1f}s wall, {cpu:.1f}s CPU, {sum(self.samples.values())} stack samples",
+            f"{'stage':<48} {'calls':>7} {'wall s':>9} {'cpu s':>8} {'wait s':>9} {'cpu %':>6}",
+        ]
+        with self._lock:
+            times = sorted(self.times.items(), key=lambda item: -item[1].wall)
+        for path, t in times:
+            lines.append(f"{path:<48} {t.calls:>7} {t.wall:>9.2f} {t.cpu:>8.2f} {t.wall - t.cpu:>9.2f} "
+                         f"{100 * t.cpu / t.wall if t.wall else 0:>5.0f}%")
+        return '\n'.join(lines)
+
+
+def _file_name(stage: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', stage)
+
+
+class profile_stage:
+    """
+    Mark a stage of the pipeline for the profiler; a no-op while profiling is off.
+
+    Works as a context manager or a decorator:
+
+        @profile_stage('parse html')
+        def get_visible_text(...): ...
+
+        with profile_stage('openai'):
+            ...
+
+    Stages nest per thread, so a retry wait inside an OpenAI call inside a
+    game is reported as "game/openai/openai retry wait"; don't use it around
+    code that switches coroutines on the same thread. While no profiler is
+    running a stage costs one global lookup.
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        profiler = _profiler
+        if profiler is not None:
+            profiler.enter(self.name)
+        return self
+
+    def __exit__(self, *exc_info):
+        profiler = _profiler
+        if profiler is not None:
+            profiler.exit()
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def start_profiling(output_dir: str, interval: float = 0.01, deterministic: bool = False) -> StageProfiler:
+    """Start profiling stages; see StageProfiler for the arguments."""
+    global _profiler
+    if _profiler is not None:
+        raise RuntimeError("Profiling is already running")
+    _profiler = StageProfiler(output_dir, interval, deterministic)
+    _profiler.start()
+    return _profiler
+
+
+def stop_profiling() -> Optional[StageProfiler]:
+    """Stop profiling, write the profiles and log the stage table; returns the profiler, if one was running."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+    profiler.stop()
+    logger.info("\n" + profiler.format_report())
+    logger.info(f"Profiles written to {profiler.output_dir} (flame graph input: all.collapsed)")
+    return profiler
@@ -0,0 +1,353 @@
+import asyncio
+import inspect
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple, Type
+
+import requests
+from gspread.exceptions import APIError as SheetsAPIError
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    RateLimitError,
+)
+from utils.concurrency import AdaptiveLimiter, get_limiter
+from utils.profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes that are worth retrying
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Exceptions that indicate a transient network problem
+RETRYABLE_EXCEPTIONS: Tuple[Type[BaseException], ...] = (
+    ConnectionError,
+    TimeoutError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    APIConnectionError,
+    APITimeoutError,
+    RateLimitError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the service's circuit is open."""
+
+    def __init__(self, service: str, retry_in: float):
+        super().__init__(f"Circuit for {service} is open, retry in {retry_in:.1f}s")
+        self.service = service
+        self.retry_in = retry_in
+
+
+def _get_status_code(error: BaseException) -> Optional[int]:
+    """Extract an HTTP status code from a service exception, if any."""
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status
+    response = getattr(error, 'response', None)
+    if response is not None:
+        status = getattr(response, 'status_code', None)
+        if isinstance(status, int):
+            return status
+    if isinstance(error, SheetsAPIError):
+        code = getattr(error, 'code', None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Classify an exception as retryable (transient) or fatal.
+
+    Network failures, timeouts, rate limits and 5xx responses are retryable.
+    Everything else, including ValueError from the scraper and bugs in our own
+    code, is fatal and raised immediately.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, RETRYABLE_EXCEPTIONS):
+        return True
+    if isinstance(error, (SheetsAPIError, APIStatusError, requests.exceptions.HTTPError)):
+        return _get_status_code(error) in RETRYABLE_STATUS_CODES
+    return False
+
+
+def is_overload(error: BaseException) -> bool:
+    """Whether an error means the service is over capacity: a 429 or a timeout."""
+    if isinstance(error, (RateLimitError, TimeoutError, requests.exceptions.Timeout, APITimeoutError)):
+        return True
+    return _get_status_code(error) == 429
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Return the server's Retry-After hint in seconds, if the error carries one."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """
+    Per-service circuit breaker.
+
+    After `failure_threshold` consecutive retryable failures the circuit opens
+    and calls are rejected for `reset_timeout` seconds. After that a single
+    trial call is let through (half-open); success closes the circuit again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, service: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not be attempted."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if self._state == self.OPEN and elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.service, self.reset_timeout - elapsed)
+            if self._trial_in_flight:
+                raise CircuitOpenError(self.service, self.reset_timeout)
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def abandon_trial(self):
+        """End a call without a verdict (cancelled or interrupted), freeing a half-open trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit for {self.service} opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    Global retry budget shared by all services.
+
+    Every first attempt deposits `ratio` tokens and every retry withdraws one,
+    so retries are capped at roughly `ratio` of total traffic (plus a small
+    reserve of `min_tokens`). This stops a run from multiplying its load
+    against a service that is already failing.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 10.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """Retry settings and shared state for one external service."""
+
+    def __init__(
+        self,
+        service: str,
+        max_attempts: int = 3,
+        base_delay: float = 2.0,
+        max_delay: float = 60.0,
+        classifier: Callable[[BaseException], bool] = is_retryable,
+        breaker: Optional[CircuitBreaker] = None,
+        budget: Optional[RetryBudget] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ):
+        self.service = service
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.classifier = classifier
+        self.breaker = breaker or CircuitBreaker(service)
+        self.budget = budget or retry_budget
+        # Each attempt holds one of the service's adaptive concurrency slots; latency
+        # is judged against earlier calls of the same decorated function
+        self.limiter = limiter or get_limiter(service)
+
+    @staticmethod
+    def overload_feedback(error: BaseException) -> Tuple[bool, float]:
+        """Classify a failed attempt for the concurrency limiter."""
+        return is_overload(error), get_retry_after(error) or 0.0
+
+    def compute_delay(self, attempt: int, error: BaseException) -> float:
+        """Delay before the next attempt, honoring Retry-After when present."""
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        backoff = self.base_delay * (2 ** (attempt - 1))
+        return min(self.max_delay, backoff) + random.uniform(0, 1)
+
+    def next_delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """
+        Record a failed attempt and decide whether to retry.
+
+        Returns:
+            Seconds to wait before retrying, or None if the error should be raised
+        """
+        retryable = self.classifier(error)
+        if retryable:
+            self.breaker.record_failure()
+        else:
+            # The service answered; a fatal error is not evidence of an outage
+            self.breaker.record_success()
+        if not retryable or attempt >= self.max_attempts:
+            return None
+        if not self.budget.try_spend():
+            logger.warning(f"Retry budget exhausted, not retrying {self.service}: {error}")
+            return None
+        delay = self.compute_delay(attempt, error)
+        logger.info(f"{self.service} call failed ({error}), retrying in {delay:.1f}s "
+                    f"(attempt {attempt + 1}/{self.max_attempts})")
+        return delay
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                attempt = 0
+                self.budget.record_request()
+                while True:
+                    attempt += 1
+                    self.breaker.before_call()
+                    await self.limiter.acquire_async()
+                    start = time.monotonic()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except Exception as e:
+                        self.limiter.release(time.monotonic() - start, *self.overload_feedback(e), task=func.__name__)
+                        delay = self.next_delay(attempt, e)
+                        if delay is None:
+                            raise
+                        await asyncio.sleep(delay)
+                    except BaseException:
+                        # Cancelled: give the slot back without judging the service
+                        self.limiter.release(time.monotonic() - start, task=func.__name__)
+                        self.breaker.abandon_trial()
+                        raise
+                    else:
+                        self.limiter.release(time.monotonic() - start, task=func.__name__)
+                        self.breaker.record_success()
+                        return result
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            attempt = 0
+            self.budget.record_request()
+            while True:
+                attempt += 1
+                self.breaker.before_call()
+                try:
+                    with profile_stage(self.service), self.limiter.slot(self.overload_feedback, func.__name__):
+                        result = func(*args, **kwargs)
+                except Exception as e:
+                    delay = self.next_delay(attempt, e)
+                    if delay is None:
+                        raise
+                    with profile_stage(f"{self.service} retry wait"):
+                        time.sleep(delay)
+                except BaseException:
+                    # Interrupted: no verdict on the service
+                    self.breaker.abandon_trial()
+                    raise
+                else:
+                    self.breaker.record_success()
+                    return result
+        return wrapper
+
+
+# Shared across every service so one failing dependency can't monopolize retries
+retry_budget = RetryBudget()
+
+_policies: Dict[str, RetryPolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(service: str) -> RetryPolicy:
+    """Get (or create) the shared retry policy for a service."""
+    with _policies_lock:
+        if service not in _policies:
+            _policies[service] = RetryPolicy(service)
+        return _policies[service]
+
+
+def with_retry_policy(service: str = 'default'):
+    """
+    Decorator that retries a sync or async function using the service's policy.
+
+    Usage:
+        @with_retry_policy('openai')
+        def call_openai(...): ...
+    """
+    return get_policy(service)
@@ -0,0 +1,97 @@
+import difflib
+import re
+import unicodedata
+from typing import Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# Leading articles dropped during normalization ("The One Ring" == "One Ring")
+ARTICLES = ('the ', 'a ', 'an ')
+
+# Symbols that are spelled differently across sources
+REPLACEMENTS = {
+    '&': ' and ',
+    '+': ' plus ',
+}
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalize a game title for matching.
+
+    Folds Unicode (accents, smart quotes, ligatures) to ASCII, lowercases,
+    spells out '&' and '+', strips punctuation, collapses whitespace and drops
+    a leading or trailing article ("Sprawl, The").
+    """
+    text = unicodedata.normalize('NFKD', title)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    for symbol, replacement in REPLACEMENTS.items():
+        text = text.replace(symbol, replacement)
+    text = re.sub(r"['’]", '', text)
+    text = re.sub(r'[^a-z0-9]+', ' ', text).strip()
+    for article in ARTICLES:
+        if text.startswith(article) and len(text) > len(article):
+            text = text[len(article):]
+            break
+    for article in ARTICLES:
+        suffix = ' ' + article.strip()
+        if text.endswith(suffix) and len(text) > len(suffix):
+            text = text[:-len(suffix)]
+            break
+    return text
+
+
+class TitleIndex(Generic[T]):
+    """
+    Maps normalized titles to values (usually sheet row numbers).
+
+    Exact lookups on the normalized form are O(1); when `fuzzy` is enabled a
+    miss falls back to difflib's closest match above `cutoff`.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, T]] = (), cutoff: float = 0.9):
+        self.cutoff = cutoff
+        self._index: Dict[str, T] = {}
+        self._titles: Dict[str, str] = {}
+        for title, value in items:
+            self.add(title, value)
+
+    def add(self, title: str, value: T) -> None:
+        """Add a title; the first occurrence of a normalized title wins."""
+        key = normalize_title(title)
+        if key and key not in self._index:
+            self._index[key] = value
+            self._titles[key] = title
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, title: str) -> bool:
+        return normalize_title(title) in self._index
+
+    def get(self, title: str, fuzzy: bool = True) -> Optional[T]:
+        """Look up a title, falling back to the closest fuzzy match if enabled."""
+        match = self.match(title, fuzzy)
+        return self._index[match] if match is not None else None
+
+    def get_title(self, title: str, fuzzy: bool = True) -> Optional[str]:
+        """Return the title as stored in the index for the best match."""
+        match = self.match(title, fuzzy)
+        return self._titles[match] if match is not None else None
+
+    def match(self, title: str, fuzzy: bool = True) -> Optional[str]:
+        """Return the normalized key that best matches `title`, or None."""
+        key = normalize_title(title)
+        if key in self._index:
+            return key
+        if not fuzzy or not key:
+            return None
+        # Never fuzzy-match across editions or numbered sequels ("Mothership 1e" vs "2e")
+        numbers = re.findall(r'\d+', key)
+        for candidate in difflib.get_close_matches(key, self._index.keys(), n=3, cutoff=self.cutoff):
+            if re.findall(r'\d+', candidate) == numbers:
+                return candidate
+        return None
+
+    def titles(self) -> List[str]:
+        return list(self._titles.values())